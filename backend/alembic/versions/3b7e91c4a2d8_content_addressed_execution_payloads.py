@@ -0,0 +1,90 @@
+"""content-addressed execution payloads
+
+Revision ID: 3b7e91c4a2d8
+Revises: 802393de1673
+Create Date: 2026-10-16 10:12:41.318205
+
+"""
+from typing import Sequence, Union
+import hashlib
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7e91c4a2d8'
+down_revision: Union[str, Sequence[str], None] = '802393de1673'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+
+def _payload_hash(payload) -> str:
+    # Must stay identical to crud.payload_hash
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('execution_payloads',
+    sa.Column('hash', sa.String(length=64), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('hash')
+    )
+    op.add_column('rule_executions', sa.Column('payload_hash', sa.String(length=64), nullable=True))
+
+    # Move existing payloads in id order, BATCH_SIZE rows at a time, storing each distinct one once
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.text(
+                "SELECT id, input_payload FROM rule_executions "
+                "WHERE id > :last_id AND input_payload IS NOT NULL ORDER BY id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": BATCH_SIZE},
+        ).fetchall()
+        if not rows:
+            break
+        payloads = {}
+        updates = []
+        for row_id, payload in rows:
+            if isinstance(payload, str):
+                payload = json.loads(payload)
+            h = _payload_hash(payload)
+            payloads.setdefault(h, payload)
+            updates.append({"row_id": row_id, "hash": h})
+        bind.execute(
+            sa.text(
+                "INSERT INTO execution_payloads (hash, payload) VALUES (:hash, CAST(:payload AS json)) "
+                "ON CONFLICT (hash) DO NOTHING"
+            ),
+            [{"hash": h, "payload": json.dumps(p)} for h, p in payloads.items()],
+        )
+        bind.execute(
+            sa.text("UPDATE rule_executions SET payload_hash = :hash WHERE id = :row_id"),
+            updates,
+        )
+        last_id = rows[-1][0]
+
+    op.create_index(op.f('ix_rule_executions_payload_hash'), 'rule_executions', ['payload_hash'], unique=False)
+    op.create_foreign_key('rule_executions_payload_hash_fkey', 'rule_executions', 'execution_payloads', ['payload_hash'], ['hash'])
+    op.drop_column('rule_executions', 'input_payload')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('rule_executions', sa.Column('input_payload', sa.JSON(), nullable=True))
+    op.execute(
+        "UPDATE rule_executions SET input_payload = p.payload "
+        "FROM execution_payloads p WHERE p.hash = rule_executions.payload_hash"
+    )
+    op.drop_constraint('rule_executions_payload_hash_fkey', 'rule_executions', type_='foreignkey')
+    op.drop_index(op.f('ix_rule_executions_payload_hash'), table_name='rule_executions')
+    op.drop_column('rule_executions', 'payload_hash')
+    op.drop_table('execution_payloads')
@@ -0,0 +1,29 @@
+"""add claim_uid to rule_executions
+
+Revision ID: a6d3e18c42f9
+Revises: f5b18d3e7a62
+Create Date: 2026-10-17 09:14:52.118734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d3e18c42f9'
+down_revision: Union[str, Sequence[str], None] = 'f5b18d3e7a62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows keep NULL; crud.iter_recent_claims groups them by id order instead
+    op.add_column('rule_executions', sa.Column('claim_uid', sa.Uuid(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('rule_executions', 'claim_uid')
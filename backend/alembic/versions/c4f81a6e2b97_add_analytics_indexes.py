@@ -0,0 +1,52 @@
+"""add analytics indexes
+
+Revision ID: c4f81a6e2b97
+Revises: 7b2d4e9f1c35
+Create Date: 2026-10-16 15:27:08.431950
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f81a6e2b97'
+down_revision: Union[str, Sequence[str], None] = '7b2d4e9f1c35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction; it builds
+    # without blocking writes to rule_executions.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_rule_executions_rule_id_executed_at', 'rule_executions', ['rule_id', 'executed_at'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_rule_executions_executed_at', 'rule_executions', ['executed_at'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_rule_executions_flagged_rule_executed_at', 'rule_executions', ['rule_id', 'executed_at', 'id'],
+                        unique=False, postgresql_where=sa.text('execution_result'),
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_rule_executions_flagged_rule_amount', 'rule_executions', ['rule_id', 'amount', 'id'],
+                        unique=False, postgresql_where=sa.text('execution_result'),
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_rule_versions_rule_id_created_at', 'rule_versions', ['rule_id', 'created_at'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_rule_versions_rule_id_created_at', table_name='rule_versions',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_rule_executions_flagged_rule_amount', table_name='rule_executions',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_rule_executions_flagged_rule_executed_at', table_name='rule_executions',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_rule_executions_executed_at', table_name='rule_executions',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_rule_executions_rule_id_executed_at', table_name='rule_executions',
+                      postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,33 @@
+"""add reference list audit actions
+
+Revision ID: e2a7c5d91b40
+Revises: c4f81a6e2b97
+Create Date: 2026-10-16 21:42:17.305518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a7c5d91b40'
+down_revision: Union[str, Sequence[str], None] = 'c4f81a6e2b97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ALTER TYPE ... ADD VALUE cannot run inside a transaction block before Postgres 12
+    with op.get_context().autocommit_block():
+        for action in ('created_reference_list', 'updated_reference_list', 'deleted_reference_list'):
+            op.execute(f"ALTER TYPE auditaction ADD VALUE IF NOT EXISTS '{action}'")
+        op.execute("ALTER TYPE auditentitytype ADD VALUE IF NOT EXISTS 'reference_list'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Postgres cannot drop enum values; audit rows may still reference them
+    pass
@@ -0,0 +1,52 @@
+"""add rule_daily_stat_deltas
+
+Revision ID: f5b18d3e7a62
+Revises: e2a7c5d91b40
+Create Date: 2026-10-16 22:18:40.652301
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5b18d3e7a62'
+down_revision: Union[str, Sequence[str], None] = 'e2a7c5d91b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('rule_daily_stat_deltas',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('rule_id', sa.Integer(), nullable=False),
+    sa.Column('rule_version_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('flagged', sa.Integer(), nullable=False),
+    sa.Column('fraud', sa.Integer(), nullable=False),
+    sa.Column('legitimate', sa.Integer(), nullable=False),
+    sa.Column('flagged_high', sa.Integer(), nullable=False),
+    sa.Column('flagged_medium', sa.Integer(), nullable=False),
+    sa.Column('flagged_low', sa.Integer(), nullable=False),
+    sa.Column('flagged_pending', sa.Integer(), nullable=False),
+    sa.Column('flagged_fraud', sa.Integer(), nullable=False),
+    sa.Column('flagged_legitimate', sa.Integer(), nullable=False),
+    sa.Column('last_executed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['rule_id'], ['rules.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_rule_daily_stat_deltas_rule_id'), 'rule_daily_stat_deltas', ['rule_id'], unique=False)
+    # ALTER TYPE ... ADD VALUE cannot run inside a transaction block before Postgres 12
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE auditaction ADD VALUE IF NOT EXISTS 'updated_decision'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Postgres cannot drop enum values; audit rows may still reference updated_decision
+    op.drop_index(op.f('ix_rule_daily_stat_deltas_rule_id'), table_name='rule_daily_stat_deltas')
+    op.drop_table('rule_daily_stat_deltas')
@@ -0,0 +1,163 @@
+"""
+Per-request SQL query accounting.
+
+Cursor execute events on the engine are attributed to the QueryStats of the
+request being handled (a context variable set by QueryTrackingMiddleware and
+inherited by the threadpool that runs sync endpoints). At the end of each
+request:
+
+- statements whose SQL text ran N_PLUS_ONE_THRESHOLD or more times
+  (whatever the parameters) are logged as N+1 suspects, except INSERTs, which
+  a bulk insert splits into several statements of the same text;
+- with QUERY_DEBUG=1 the response carries X-DB-Query-Count and X-DB-Time-Ms.
+
+query_budget() applies the same accounting outside a request, for checking how
+many queries a code path issues; tests/test_query_budgets.py holds the budgets
+of the hot endpoints.
+"""
+import logging
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from .metrics import Histogram, registry
+
+logger = logging.getLogger(__name__)
+
+QUERY_DEBUG = os.getenv("QUERY_DEBUG", "").lower() in ("1", "true", "yes")
+N_PLUS_ONE_THRESHOLD = int(os.getenv("QUERY_N_PLUS_ONE_THRESHOLD", "5"))
+
+queries_per_request = registry.register(Histogram(
+    "db_queries_per_request", "SQL statements executed per request.", ("route",),
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+))
+
+
+class QueryStats:
+    __slots__ = ('count', 'seconds', 'statements')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Counter = Counter()
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> list[tuple[str, int]]:
+        return [
+            (sql, n) for sql, n in self.statements.most_common()
+            if n >= threshold and sql.lstrip()[:6].upper() != "INSERT"
+        ]
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+# Open query_budget() blocks; finished requests are added to each of them
+_budgets: list[QueryStats] = []
+
+
+def current_stats() -> QueryStats | None:
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    started = conn.info.get("query_started")
+    if started:
+        stats.seconds += time.perf_counter() - started.pop()
+    stats.count += 1
+    stats.statements[statement] += 1
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute
+    if context.connection is not None:
+        started = context.connection.info.get("query_started")
+        if started:
+            started.pop()
+
+
+def register(engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+@contextmanager
+def track_queries():
+    """Count the queries issued inside the block; yields the QueryStats."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def query_budget(max_queries: int):
+    """
+    Fail with AssertionError when the block issues more than max_queries
+    statements, listing the repeated ones:
+
+        with query_budget(3):
+            client.get("/api/rules/")
+
+    Requests finished while the block is open are counted too, whichever
+    thread or event loop served them.
+    """
+    with track_queries() as stats:
+        _budgets.append(stats)
+        try:
+            yield stats
+        finally:
+            _budgets.remove(stats)
+    if stats.count > max_queries:
+        repeated = "; ".join(f"{n}x {sql[:120]}" for sql, n in stats.repeated(2))
+        raise AssertionError(f"{stats.count} queries issued, budget is {max_queries}. Repeated: {repeated or 'none'}")
+
+
+class QueryTrackingMiddleware:
+    """ASGI middleware attaching a QueryStats to each HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_wrapper(message):
+            if QUERY_DEBUG and message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-query-count", str(stats.count).encode()))
+                headers.append((b"x-db-time-ms", f"{stats.seconds * 1000:.1f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            queries_per_request.observe(stats.count, route)
+            for budget in list(_budgets):
+                budget.count += stats.count
+                budget.seconds += stats.seconds
+                budget.statements.update(stats.statements)
+            for sql, n in stats.repeated():
+                logger.warning(
+                    "possible N+1: %s %s ran %d times in one request: %s",
+                    scope.get("method"), route, n, " ".join(sql.split())[:200],
+                )
@@ -1,7 +1,19 @@
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, desc, cast, Date, Integer, case
+from sqlalchemy import func, desc, cast, Date, insert, delete, select, union_all, or_, literal, literal_column, true, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from . import models, schemas
+from .services.rule_engine import condition_labels, expand_trigger_mask
+from .services.rule_network import network as rule_network
+from .services import rule_snapshot
+from .services.duplicate_index import duplicate_index
+from .services.velocity import velocity_store
+from .services.entity_counters import entity_counters
+from .services.reference_lists import reference_lists
 from datetime import datetime, timedelta
+import base64
+import hashlib
+import threading
+from collections import Counter
 import json
 
 # --- User CRUD ---
@@ -32,6 +44,39 @@ def get_rules(db: Session, skip: int = 0, limit: int = 100):
         joinedload(models.Rule.owner)
     ).offset(skip).limit(limit).all()
 
+def get_rules_with_stats(db: Session, skip: int = 0, limit: int = 100):
+    """
+    One page of rules for the list view in a single query: each row is
+    (rule, triggers in the last 24h, version string of the latest RuleVersion).
+    """
+    yesterday = datetime.now() - timedelta(days=1)
+    triggers = db.query(
+        models.RuleExecutionLog.rule_id.label("rule_id"),
+        func.count(models.RuleExecutionLog.id).filter(
+            models.RuleExecutionLog.execution_result == True
+        ).label("triggers_24h"),
+    ).filter(
+        models.RuleExecutionLog.executed_at >= yesterday
+    ).group_by(models.RuleExecutionLog.rule_id).subquery()
+
+    # Looked up per listed rule on (rule_id, created_at) rather than ranking every version
+    latest = select(models.RuleVersion.version).where(
+        models.RuleVersion.rule_id == models.Rule.id
+    ).order_by(
+        models.RuleVersion.created_at.desc(), models.RuleVersion.id.desc()
+    ).limit(1).correlate(models.Rule).scalar_subquery()
+
+    return db.query(
+        models.Rule,
+        func.coalesce(triggers.c.triggers_24h, 0),
+        latest,
+    ).options(
+        joinedload(models.Rule.creator),
+        joinedload(models.Rule.owner)
+    ).outerjoin(
+        triggers, triggers.c.rule_id == models.Rule.id
+    ).offset(skip).limit(limit).all()
+
 def get_rule(db: Session, rule_id: int):
     return db.query(models.Rule).options(
         joinedload(models.Rule.creator),
@@ -77,14 +122,19 @@ def update_rule(db: Session, rule_id: int, rule_update: schemas.RuleUpdate):
         setattr(db_rule, key, value)
         
     db.commit()
+    if 'status' in update_data:
+        rule_snapshot.bump_generation()
     db.refresh(db_rule)
     return db_rule
 
 def delete_rule(db: Session, rule_id: int):
     db_rule = db.query(models.Rule).filter(models.Rule.id == rule_id).first()
     if db_rule:
+        version_ids = [v.id for v in db_rule.versions]
         db.delete(db_rule)
         db.commit()
+        rule_network.remove_versions(version_ids)
+        rule_snapshot.bump_generation()
     return db_rule
 
 # --- Rule Version CRUD ---
@@ -97,11 +147,14 @@ def create_rule_version(
     notes: str = "",
     is_active: bool = False
 ):
+    replaced_ids = []
     if is_active:
-        db.query(models.RuleVersion).filter(
+        replaced = db.query(models.RuleVersion).filter(
             models.RuleVersion.rule_id == rule_id,
             models.RuleVersion.is_active == True
-        ).update({"is_active": False})
+        )
+        replaced_ids = [v.id for v in replaced.all()]
+        replaced.update({"is_active": False})
 
     db_version = models.RuleVersion(
         rule_id=rule_id,
@@ -115,6 +168,12 @@ def create_rule_version(
     db.add(db_version)
     db.commit()
     db.refresh(db_version)
+    if is_active:
+        rule_network.remove_versions(replaced_ids)
+        rule_network.add_version(db_version.id, db_version.rule_id, db_version.logic_snapshot)
+        rule_snapshot.bump_generation()
+        # Load claim history the new version reads here rather than in the next /execute
+        warm_claim_indexes(db)
     return db_version
 
 def get_rule_versions(db: Session, rule_id: int):
@@ -179,29 +238,208 @@ def get_active_rule_versions(db: Session):
         models.RuleVersion.is_active == True
     ).all()
 
+def get_active_rule_set(db: Session):
+    """In-memory snapshot of the active rule set; only queries when it is stale."""
+    rule_set = rule_snapshot.get_active_rule_set(lambda: get_active_rule_versions(db))
+    if duplicate_index.has_pending() or velocity_store.has_pending() or entity_counters.has_pending():
+        warm_claim_indexes(db)
+    if reference_lists.needs_refresh():
+        refresh_reference_lists(db)
+    return rule_set
+
+def iter_execution_payloads(db: Session, batch_size: int = 1000):
+    """Stream every stored claim payload without loading the table into memory."""
+    q = db.query(models.ExecutionPayload.payload).execution_options(yield_per=batch_size)
+    for (payload,) in q:
+        yield payload
+
+# Rows written before claim_uid that are consecutive by id, carry the same payload and
+# lie this close together are one claim logged once per rule
+LEGACY_CLAIM_GAP = timedelta(seconds=2)
+
+def iter_recent_claims(db: Session, since: datetime | None = None, until: datetime | None = None, batch_size: int = 1000):
+    """
+    (timestamp, payload) of every claim scored in [since, until) (unbounded if
+    None), oldest first, once per claim rather than once per rule row.
+
+    Claims are told apart by claim_uid, so identical claims in one batch are
+    each replayed. Rows without one, written one transaction per rule before it
+    existed, are merged while consecutive ids share a payload_hash within
+    LEGACY_CLAIM_GAP of each other.
+    """
+    log = models.RuleExecutionLog
+    window = [log.payload_hash != None]
+    if since is not None:
+        window.append(log.executed_at >= since)
+    if until is not None:
+        window.append(log.executed_at < until)
+
+    claims = select(
+        func.min(log.executed_at).label("executed_at"),
+        func.min(log.payload_hash).label("payload_hash"),
+    ).where(*window, log.claim_uid != None).group_by(log.claim_uid)
+
+    previous = {"order_by": log.id}
+    starts_claim = or_(
+        log.payload_hash.is_distinct_from(func.lag(log.payload_hash).over(**previous)),
+        func.coalesce(log.executed_at - func.lag(log.executed_at).over(**previous) > LEGACY_CLAIM_GAP, True),
+    )
+    legacy = select(
+        log.id, log.executed_at, log.payload_hash,
+        starts_claim.label("starts_claim"),
+    ).where(*window, log.claim_uid == None).subquery()
+    numbered = select(
+        legacy.c.executed_at,
+        legacy.c.payload_hash,
+        func.count().filter(legacy.c.starts_claim).over(order_by=legacy.c.id).label("claim"),
+    ).subquery()
+    legacy_claims = select(
+        func.min(numbered.c.executed_at),
+        func.min(numbered.c.payload_hash),
+    ).group_by(numbered.c.claim)
+
+    claims = claims.union_all(legacy_claims).subquery()
+    q = db.query(claims.c.executed_at, models.ExecutionPayload.payload).join(
+        models.ExecutionPayload, models.ExecutionPayload.hash == claims.c.payload_hash
+    ).order_by(claims.c.executed_at).execution_options(yield_per=batch_size)
+    for executed_at, payload in q:
+        yield executed_at.timestamp(), payload
+
+_warm_lock = threading.Lock()
+
+def warm_claim_indexes(db: Session) -> None:
+    """
+    Load history for fields newly used by is_duplicate conditions (all stored
+    payloads), within_time windows (claims inside the longest new window) and
+    count aggregates (the last COUNTER_HISTORY_DAYS days).
+
+    Runs when a version is activated and when the rule set is loaded (startup,
+    or another worker's activation). One thread loads at a time: the stores
+    stay pending until their replay finishes, so requests arriving meanwhile
+    wait here and then find nothing left to load.
+    """
+    with _warm_lock:
+        if duplicate_index.has_pending():
+            duplicate_index.load_history(iter_execution_payloads(db))
+        if velocity_store.has_pending():
+            since, until = velocity_store.pending_range()
+            velocity_store.load_history(iter_recent_claims(
+                db, datetime.fromtimestamp(since).astimezone(), datetime.fromtimestamp(until).astimezone()
+            ))
+        if entity_counters.has_pending():
+            since, until = entity_counters.pending_range()
+            entity_counters.load_history(iter_recent_claims(
+                db, datetime.fromtimestamp(since).astimezone(), datetime.fromtimestamp(until).astimezone()
+            ))
+
+# --- Reference List CRUD ---
+
+REFERENCE_LIST_INSERT_CHUNK = 5000
+
+def get_reference_lists(db: Session):
+    rows = db.query(models.ReferenceList, func.count(models.ReferenceListEntry.id)).outerjoin(
+        models.ReferenceListEntry, models.ReferenceListEntry.list_id == models.ReferenceList.id
+    ).group_by(models.ReferenceList.id).order_by(models.ReferenceList.name).all()
+    for ref_list, size in rows:
+        ref_list.size = size
+    return [ref_list for ref_list, _ in rows]
+
+def get_reference_list(db: Session, name: str):
+    ref_list = db.query(models.ReferenceList).filter(models.ReferenceList.name == name).first()
+    if ref_list:
+        ref_list.size = db.query(func.count(models.ReferenceListEntry.id)).filter(
+            models.ReferenceListEntry.list_id == ref_list.id
+        ).scalar() or 0
+    return ref_list
+
+def get_reference_list_values(db: Session, list_id: int, skip: int = 0, limit: int = 100):
+    rows = db.query(models.ReferenceListEntry.value).filter(
+        models.ReferenceListEntry.list_id == list_id
+    ).order_by(models.ReferenceListEntry.value).offset(skip).limit(limit).all()
+    return [value for (value,) in rows]
+
+def _insert_reference_list_values(db: Session, list_id: int, values) -> None:
+    unique = list(dict.fromkeys(v for v in values if v is not None))
+    for start in range(0, len(unique), REFERENCE_LIST_INSERT_CHUNK):
+        chunk = unique[start:start + REFERENCE_LIST_INSERT_CHUNK]
+        db.execute(
+            pg_insert(models.ReferenceListEntry)
+            .values([{"list_id": list_id, "value": v} for v in chunk])
+            .on_conflict_do_nothing(constraint="uq_reference_list_entries_list_value")
+        )
+
+def _reload_reference_list(db: Session, ref_list: models.ReferenceList, force: bool = False) -> None:
+    """Swap in the committed version of a list that conditions in this process use."""
+    if force or ref_list.name in reference_lists.tracked():
+        values = db.query(models.ReferenceListEntry.value).filter(
+            models.ReferenceListEntry.list_id == ref_list.id
+        ).execution_options(yield_per=10000)
+        reference_lists.replace(ref_list.name, ref_list.version, (v for (v,) in values))
+
+def create_reference_list(db: Session, ref_list: schemas.ReferenceListCreate):
+    db_list = models.ReferenceList(name=ref_list.name, description=ref_list.description, version=1)
+    db.add(db_list)
+    db.flush()
+    _insert_reference_list_values(db, db_list.id, ref_list.values)
+    db.commit()
+    db.refresh(db_list)
+    _reload_reference_list(db, db_list)
+    return get_reference_list(db, db_list.name)
+
+def update_reference_list_entries(db: Session, name: str, add=(), remove=(), replace: bool = False):
+    """Add and/or remove values (or replace all of them) and bump the list version."""
+    db_list = db.query(models.ReferenceList).filter(models.ReferenceList.name == name).first()
+    if not db_list:
+        return None
+    if replace:
+        db.query(models.ReferenceListEntry).filter(
+            models.ReferenceListEntry.list_id == db_list.id
+        ).delete(synchronize_session=False)
+    elif remove:
+        db.query(models.ReferenceListEntry).filter(
+            models.ReferenceListEntry.list_id == db_list.id,
+            models.ReferenceListEntry.value.in_(list(remove))
+        ).delete(synchronize_session=False)
+    _insert_reference_list_values(db, db_list.id, add)
+    db_list.version = db_list.version + 1
+    db.commit()
+    db.refresh(db_list)
+    _reload_reference_list(db, db_list)
+    return get_reference_list(db, name)
+
+def delete_reference_list(db: Session, name: str):
+    db_list = get_reference_list(db, name)
+    if db_list:
+        db.delete(db_list)
+        db.commit()
+        if name in reference_lists.tracked():
+            reference_lists.replace(name, 0, ())
+    return db_list
+
+def refresh_reference_lists(db: Session, extra_names=()) -> None:
+    """
+    Load tracked lists (and extra_names, for /test) that are missing here or
+    whose version changed in the database.
+    """
+    tracked = reference_lists.tracked()
+    names = tracked | set(extra_names)
+    if not extra_names:
+        # Lists loaded for an earlier /test that no active rule uses
+        for name in reference_lists.loaded() - names:
+            reference_lists.drop(name)
+    rows = db.query(models.ReferenceList).filter(models.ReferenceList.name.in_(names)).all()
+    for ref_list in rows:
+        if reference_lists.loaded_version(ref_list.name) != ref_list.version:
+            _reload_reference_list(db, ref_list, force=True)
+    # Unknown lists match nothing until they are created
+    for name in names - {r.name for r in rows}:
+        if reference_lists.loaded_version(name) != 0:
+            reference_lists.replace(name, 0, ())
+    reference_lists.mark_checked()
+
 # Performance analytics queries
 
-def get_rule_performance_kpis(db: Session, rule_id: int, days: int):
-    since = datetime.now() - timedelta(days=days)
-    total_claims = db.query(func.count(models.RuleExecutionLog.id)).filter(
-        models.RuleExecutionLog.rule_id == rule_id,
-        models.RuleExecutionLog.executed_at >= since
-    ).scalar() or 0
-    flags = db.query(func.count(models.RuleExecutionLog.id)).filter(
-        models.RuleExecutionLog.rule_id == rule_id,
-        models.RuleExecutionLog.executed_at >= since,
-        models.RuleExecutionLog.execution_result == True
-    ).scalar() or 0
-    confirmed_fraud = db.query(func.count(models.RuleExecutionLog.id)).filter(
-        models.RuleExecutionLog.rule_id == rule_id,
-        models.RuleExecutionLog.executed_at >= since,
-        models.RuleExecutionLog.decision == models.Decision.fraud
-    ).scalar() or 0
-    legitimate = db.query(func.count(models.RuleExecutionLog.id)).filter(
-        models.RuleExecutionLog.rule_id == rule_id,
-        models.RuleExecutionLog.executed_at >= since,
-        models.RuleExecutionLog.decision == models.Decision.legitimate
-    ).scalar() or 0
+def _kpis(total_claims: int, flags: int, confirmed_fraud: int, legitimate: int, last_eval_row) -> dict:
     false_positive_rate = 0.0
     if flags > 0:
         # False positive = flagged but later marked legitimate
@@ -209,112 +447,296 @@ def get_rule_performance_kpis(db: Session, rule_id: int, days: int):
     hit_rate = 0.0
     if total_claims > 0:
         hit_rate = round((flags / total_claims) * 100, 2)
-
-    last_eval_row = db.query(func.max(models.RuleExecutionLog.executed_at)).filter(
-        models.RuleExecutionLog.rule_id == rule_id
-    ).scalar()
-    last_evaluated = last_eval_row.isoformat() if last_eval_row else ""
-
     return {
         "totalClaimsEvaluated": total_claims,
         "flagsTriggered": flags,
         "confirmedFraud": confirmed_fraud,
         "falsePositiveRate": false_positive_rate,
         "hitRate": hit_rate,
-        "lastEvaluated": last_evaluated,
+        "lastEvaluated": last_eval_row.isoformat() if last_eval_row else "",
     }
 
-def get_trigger_trends(db: Session, rule_id: int, days: int):
-    since = datetime.now() - timedelta(days=days)
-    rows = db.query(
-        cast(models.RuleExecutionLog.executed_at, Date).label('day'),
-        func.count(models.RuleExecutionLog.id).label('totalClaims'),
-        func.sum(cast(models.RuleExecutionLog.execution_result, Integer)).label('flags'),
-        func.sum(case((models.RuleExecutionLog.decision == models.Decision.fraud, 1), else_=0)).label('fraud'),
-    ).filter(
-        models.RuleExecutionLog.rule_id == rule_id,
-        models.RuleExecutionLog.executed_at >= since
-    ).group_by('day').order_by('day').all()
-    # Build a full series for each day window
-    from datetime import date
-    day_map = {r.day: r for r in rows}
+def _last_evaluated_subquery(rule_id: int):
+    """Latest execution of a rule, from its rollup rows and the deltas not folded into them yet."""
+    return func.greatest(*(
+        select(func.max(table.last_executed_at)).where(table.rule_id == rule_id).scalar_subquery()
+        for table in (models.RuleDailyStat, models.RuleDailyStatDelta)
+    ))
+
+def _daily_stats(rule_id: int, days: int):
+    """
+    Daily counts of a rule for the last `days` calendar days, today included:
+    its rollup rows plus the deltas not folded into them yet, several rows per
+    day to be summed. Reads never fold; the DAILY_STATS_FOLD_INTERVAL thread
+    in app/main.py does.
+    """
+    # Days are the database's dates, as in record_daily_stats and rebuild_daily_stats
+    return union_all(*(
+        select(table.day, *(getattr(table, c) for c in DAILY_STAT_COUNTS)).where(
+            table.rule_id == rule_id,
+            table.day >= func.current_date() - (days - 1),
+        )
+        for table in (models.RuleDailyStat, models.RuleDailyStatDelta)
+    )).subquery("daily_stats")
+
+def get_rule_performance_kpis(db: Session, rule_id: int, days: int):
+    stats = _daily_stats(rule_id, days).c
+    total_claims, flags, confirmed_fraud, legitimate, last_eval_row = db.query(
+        func.coalesce(func.sum(stats.total), 0),
+        func.coalesce(func.sum(stats.flagged), 0),
+        func.coalesce(func.sum(stats.fraud), 0),
+        func.coalesce(func.sum(stats.legitimate), 0),
+        _last_evaluated_subquery(rule_id),
+    ).one()
+    return _kpis(int(total_claims), int(flags), int(confirmed_fraud), int(legitimate), last_eval_row)
+
+def _daily_series(days: int, day_map: dict, today) -> list[dict]:
+    """One entry per day of the window ending on the database's `today`, oldest first; day_map holds {date: (total, flags, fraud)}."""
     result = []
     for i in range(days):
-        d = (datetime.now() - timedelta(days=days-1-i)).date()
-        r = day_map.get(d)
+        d = today - timedelta(days=days-1-i)
+        total, flags, fraud = day_map.get(d, (0, 0, 0))
         result.append({
             'day': d.isoformat()[5:],
-            'totalClaims': int(getattr(r, 'totalClaims', 0) or 0),
-            'flags': int(getattr(r, 'flags', 0) or 0),
-            'fraud': int(getattr(r, 'fraud', 0) or 0),
+            'totalClaims': int(total or 0),
+            'flags': int(flags or 0),
+            'fraud': int(fraud or 0),
         })
     return result
 
+def get_trigger_trends(db: Session, rule_id: int, days: int):
+    stats = _daily_stats(rule_id, days).c
+    rows = db.query(
+        stats.day,
+        func.sum(stats.total),
+        func.sum(stats.flagged),
+        func.sum(stats.fraud),
+    ).group_by(stats.day).all()
+    today = db.query(func.current_date()).scalar()
+    # Build a full series for each day window
+    return _daily_series(days, {day: (total, flags, fraud) for day, total, flags, fraud in rows}, today)
+
+def get_rule_performance_summary(db: Session, rule_id: int, days: int):
+    """
+    KPIs, daily trends, severity and decision counts for the performance page
+    from one read of the window's daily rollup rows and pending deltas.
+    """
+    stats = _daily_stats(rule_id, days).c
+    rows = db.query(
+        stats.day,
+        *[func.sum(stats[c]).label(c) for c in DAILY_STAT_COUNTS],
+    ).group_by(stats.day).all()
+    last_evaluated, today = db.query(_last_evaluated_subquery(rule_id), func.current_date()).one()
+
+    sums = dict.fromkeys(DAILY_STAT_COUNTS, 0)
+    day_map = {}
+    for r in rows:
+        for c in DAILY_STAT_COUNTS:
+            sums[c] += getattr(r, c) or 0
+        day_map[r.day] = (r.total, r.flagged, r.fraud)
+
+    return {
+        'kpis': _kpis(sums['total'], sums['flagged'], sums['fraud'], sums['legitimate'], last_evaluated),
+        'trends': _daily_series(days, day_map, today),
+        'severity': {'high': sums['flagged_high'], 'medium': sums['flagged_medium'], 'low': sums['flagged_low']},
+        'decisions': {'fraud': sums['flagged_fraud'], 'legitimate': sums['flagged_legitimate'], 'pending': sums['flagged_pending']},
+    }
+
 
 def get_severity_distribution(db: Session, rule_id: int, days: int):
-    since = datetime.now() - timedelta(days=days)
-    counts = db.query(
-        models.RuleExecutionLog.severity,
-        func.count(models.RuleExecutionLog.id)
-    ).filter(
-        models.RuleExecutionLog.rule_id == rule_id,
-        models.RuleExecutionLog.executed_at >= since,
-        models.RuleExecutionLog.execution_result == True
-    ).group_by(models.RuleExecutionLog.severity).all()
-    res = {'high': 0, 'medium': 0, 'low': 0}
-    for sev, cnt in counts:
-        res[str(sev)] = cnt
-    return res
+    stats = _daily_stats(rule_id, days).c
+    high, medium, low = db.query(
+        func.coalesce(func.sum(stats.flagged_high), 0),
+        func.coalesce(func.sum(stats.flagged_medium), 0),
+        func.coalesce(func.sum(stats.flagged_low), 0),
+    ).one()
+    return {'high': int(high), 'medium': int(medium), 'low': int(low)}
+
+
+def _version_condition_labels(db: Session, version_ids) -> dict[int, list[str]]:
+    """Condition labels per rule version, for expanding trigger masks."""
+    ids = {v for v in version_ids if v is not None}
+    if not ids:
+        return {}
+    rows = db.query(models.RuleVersion.id, models.RuleVersion.logic_snapshot).filter(
+        models.RuleVersion.id.in_(ids)
+    ).all()
+    return {vid: condition_labels(logic) for vid, logic in rows}
+
+def _trigger_reasons(row: models.RuleExecutionLog, labels: dict[int, list[str]]) -> list[str]:
+    # Rows written before trigger masks carry explicit reasons
+    if row.trigger_reasons:
+        return row.trigger_reasons
+    return expand_trigger_mask(row.trigger_mask, labels.get(row.rule_version_id, []))
 
 
 def get_condition_hit_map(db: Session, rule_id: int, days: int):
     since = datetime.now() - timedelta(days=days)
+    log = models.RuleExecutionLog
     # trigger_reasons contains condition labels; compute percentage of flags that include each reason
-    flags_q = db.query(models.RuleExecutionLog).filter(
-        models.RuleExecutionLog.rule_id == rule_id,
-        models.RuleExecutionLog.executed_at >= since,
-        models.RuleExecutionLog.execution_result == True
+    flagged = (
+        log.rule_id == rule_id,
+        log.executed_at >= since,
+        log.execution_result == True
     )
+    flags_q = db.query(log).filter(*flagged)
     flags_total = flags_q.count()
     if flags_total == 0:
         return []
-    # Fetch all reasons arrays
-    reasons = []
-    for row in flags_q.all():
-        if row.trigger_reasons:
-            reasons.extend(row.trigger_reasons)
-    from collections import Counter
-    c = Counter(reasons)
+    has_reasons = func.cardinality(log.trigger_reasons) > 0
+    counts = Counter()
+    # Rows with explicit reasons: count labels in the database
+    reasons = func.unnest(log.trigger_reasons).table_valued("reason").render_derived().lateral("reasons")
+    reason_counts = db.query(reasons.c.reason, func.count()).select_from(log).join(reasons, true()).filter(
+        *flagged, has_reasons
+    ).group_by(reasons.c.reason)
+    for label, cnt in reason_counts:
+        counts[label] += cnt
+    # Rows with trigger masks: one row per distinct (version, mask), expanded here
+    masks = flags_q.filter(
+        or_(log.trigger_reasons == None, ~has_reasons),
+        log.trigger_mask != 0,
+    ).with_entities(log.rule_version_id, log.trigger_mask, func.count()).group_by(
+        log.rule_version_id, log.trigger_mask
+    ).all()
+    labels = _version_condition_labels(db, {version_id for version_id, _, _ in masks})
+    for version_id, mask, cnt in masks:
+        for label in expand_trigger_mask(mask, labels.get(version_id, [])):
+            counts[label] += cnt
     items = []
-    for cond, cnt in c.items():
+    for cond, cnt in counts.items():
         pct = round((cnt / flags_total) * 100, 2)
         items.append({'condition': cond, 'percentage': pct})
-    items.sort(key=lambda x: x['percentage'], reverse=True)
+    items.sort(key=lambda x: (-x['percentage'], x['condition']))
     return items
 
 
-def get_triggered_claims(db: Session, rule_id: int, days: int, severity: str|None, decision: str|None, skip: int, limit: int, sort: str|None):
+# Keyset order per sort: (column, descending); ties broken by id in the same direction
+CLAIM_SORTS = {
+    'date_desc': ('executed_at', True),
+    'date_asc': ('executed_at', False),
+    'amount_desc': ('amount', True),
+    'amount_asc': ('amount', False),
+}
+
+def encode_claims_cursor(sort: str, value, row_id: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps({"s": sort, "v": value, "id": row_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_claims_cursor(cursor: str, sort: str):
+    """(value, id) of the last row of the previous page; ValueError if the cursor is malformed or for another sort."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        value, row_id = data["v"], int(data["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if data.get("s") != sort:
+        raise ValueError("Cursor was issued for a different sort")
+    if CLAIM_SORTS[sort][0] == 'executed_at':
+        try:
+            value = datetime.fromisoformat(value)
+        except (ValueError, TypeError) as e:
+            raise ValueError("Invalid cursor") from e
+    return value, row_id
+
+def _after_cursor(column, row_id_column, value, row_id: int, descending: bool, nullable: bool) -> list:
+    """
+    Predicates selecting, in order, the rows after (value, row_id) in ORDER BY
+    column, id; query them one after the other until the page is full.
+
+    Each predicate is a single keyset range an index on (column, id) can
+    seek to. A nullable column is paged in two phases instead of one OR
+    with an IS NULL branch, which no index scan serves: Postgres sorts
+    NULLs first when descending and last when ascending, so a cursor in the
+    NULL rows (value None) continues by id among them, then (descending)
+    with the non-NULL rows from the start.
+    """
+    key = tuple_(column, row_id_column)
+    if not nullable:
+        bound = tuple_(literal(value, column.type), row_id)
+        return [key < bound if descending else key > bound]
+    if value is None:
+        after = (column == None) & ((row_id_column < row_id) if descending else (row_id_column > row_id))
+        return [after, column != None] if descending else [after]
+    bound = tuple_(literal(value, column.type), row_id)
+    after = (column != None) & (key < bound if descending else key > bound)
+    return [after] if descending else [after, column == None]
+
+def _estimated_claims_total(db: Session, rule_id: int, days: int, severity: str|None, decision: str|None):
+    """Flagged-claim count from the daily rollups; None when the filter combination is not rolled up."""
+    if severity and decision:
+        return None
+    column = f"flagged_{severity or decision}" if (severity or decision) else "flagged"
+    return int(db.query(
+        func.coalesce(func.sum(_daily_stats(rule_id, days).c[column]), 0)
+    ).scalar())
+
+def get_triggered_claims(
+    db: Session,
+    rule_id: int,
+    days: int,
+    severity: str|None,
+    decision: str|None,
+    skip: int,
+    limit: int,
+    sort: str|None,
+    cursor: str|None = None,
+    total: str = 'exact',
+):
+    """
+    One page of flagged executions. Pass the previous page's nextCursor to
+    page by keyset over (sort column, id), which costs the same on every page;
+    skip (OFFSET) is honoured only without a cursor. `total` is 'exact'
+    (COUNT over the window), 'estimate' (from daily rollups, whole days) or
+    'none'.
+    """
     since = datetime.now() - timedelta(days=days)
-    q = db.query(models.RuleExecutionLog).filter(
-        models.RuleExecutionLog.rule_id == rule_id,
-        models.RuleExecutionLog.executed_at >= since,
-        models.RuleExecutionLog.execution_result == True
+    log = models.RuleExecutionLog
+    q = db.query(log).filter(
+        log.rule_id == rule_id,
+        log.executed_at >= since,
+        log.execution_result == True
     )
-    if severity and severity != 'all':
-        q = q.filter(models.RuleExecutionLog.severity == getattr(models.Severity, severity))
-    if decision and decision != 'all':
-        q = q.filter(models.RuleExecutionLog.decision == getattr(models.Decision, decision))
+    # Unknown values raise ValueError, which the routers turn into a 400
+    severity = models.Severity(severity).value if severity and severity != 'all' else None
+    decision = models.Decision(decision).value if decision and decision != 'all' else None
+    if severity:
+        q = q.filter(log.severity == models.Severity(severity))
+    if decision:
+        q = q.filter(log.decision == models.Decision(decision))
+
+    count = None
+    if total == 'exact':
+        count = q.count()
+    elif total == 'estimate':
+        count = _estimated_claims_total(db, rule_id, days, severity, decision)
+
     # Sorting
-    if sort == 'date_desc':
-        q = q.order_by(desc(models.RuleExecutionLog.executed_at))
-    elif sort == 'date_asc':
-        q = q.order_by(models.RuleExecutionLog.executed_at)
-    elif sort == 'amount_desc':
-        q = q.order_by(desc(models.RuleExecutionLog.amount))
-    elif sort == 'amount_asc':
-        q = q.order_by(models.RuleExecutionLog.amount)
-    total = q.count()
-    rows = q.offset(skip).limit(limit).all()
+    sort = sort if sort in CLAIM_SORTS else 'date_desc'
+    column_name, descending = CLAIM_SORTS[sort]
+    column = getattr(log, column_name)
+    q = q.order_by(column.desc(), log.id.desc()) if descending else q.order_by(column.asc(), log.id.asc())
+    if cursor:
+        value, row_id = decode_claims_cursor(cursor, sort)
+        # executed_at is never NULL here (executed_at >= since)
+        rows = []
+        for after in _after_cursor(column, log.id, value, row_id, descending, nullable=column_name != 'executed_at'):
+            rows += q.filter(after).limit(limit + 1 - len(rows)).all()
+            if len(rows) > limit:
+                break
+    else:
+        if skip:
+            q = q.offset(skip)
+        rows = q.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_claims_cursor(sort, getattr(last, column_name), last.id)
+
+    labels = _version_condition_labels(db, {r.rule_version_id for r in rows if r.trigger_mask})
     data = []
     for r in rows:
         data.append({
@@ -322,33 +744,75 @@ def get_triggered_claims(db: Session, rule_id: int, days: int, severity: str|Non
             'claimId': r.claim_id,
             'date': r.executed_at.isoformat(),
             'severity': str(r.severity),
-            'triggerReasons': r.trigger_reasons or [],
+            'triggerReasons': _trigger_reasons(r, labels),
             'decision': str(r.decision),
             'amount': r.amount or 0.0,
         })
-    return {'total': total, 'items': data}
+    return {
+        'total': count,
+        'totalApproximate': total == 'estimate',
+        'items': data,
+        'nextCursor': next_cursor,
+    }
 
 
 def get_decision_counts(db: Session, rule_id: int, days: int):
-    since = datetime.now() - timedelta(days=days)
-    rows = db.query(
-        models.RuleExecutionLog.decision,
-        func.count(models.RuleExecutionLog.id)
-    ).filter(
-        models.RuleExecutionLog.rule_id == rule_id,
-        models.RuleExecutionLog.executed_at >= since,
-        models.RuleExecutionLog.execution_result == True,
-    ).group_by(models.RuleExecutionLog.decision).all()
-    res = {'fraud': 0, 'legitimate': 0, 'pending': 0}
-    for d, cnt in rows:
-        res[str(d)] = cnt
-    return res
+    stats = _daily_stats(rule_id, days).c
+    fraud, legitimate, pending = db.query(
+        func.coalesce(func.sum(stats.flagged_fraud), 0),
+        func.coalesce(func.sum(stats.flagged_legitimate), 0),
+        func.coalesce(func.sum(stats.flagged_pending), 0),
+    ).one()
+    return {'fraud': int(fraud), 'legitimate': int(legitimate), 'pending': int(pending)}
+
+
+def update_execution_decision(db: Session, exec_id: int, decision: str, actor_id: int | None = None, actor_email: str | None = None):
+    """
+    Record the review decision for an execution, queue the rollup count
+    changes as a delta and audit the change, all in one transaction.
+    """
+    row = db.query(models.RuleExecutionLog).filter(models.RuleExecutionLog.id == exec_id).first()
+    if not row:
+        return None
+    new = models.Decision(decision)
+    old = models.Decision(row.decision or models.Decision.pending)
+    if new != old:
+        row.decision = new
+        if row.rule_id is not None and row.executed_at is not None:
+            delta = Counter()
+            for d, sign in ((old, -1), (new, 1)):
+                if d != models.Decision.pending:
+                    delta[d.value] += sign
+                if row.execution_result:
+                    delta[f"flagged_{d.value}"] += sign
+            db.execute(insert(models.RuleDailyStatDelta).values(
+                rule_id=row.rule_id,
+                rule_version_id=row.rule_version_id or 0,
+                day=cast(row.executed_at, Date),
+                **{c: delta[c] for c in DAILY_STAT_COUNTS},
+            ))
+        db.add(build_audit_entry(
+            action=models.AuditAction.updated_decision,
+            entity_type=models.AuditEntityType.execution,
+            entity_id=row.id,
+            entity_label=row.claim_id,
+            metadata={"rule_id": row.rule_id, "from": old.value, "to": new.value},
+            actor_id=actor_id,
+            actor_email=actor_email,
+        ))
+        db.commit()
+        db.refresh(row)
+    return row
 
 
 def get_execution_by_id(db: Session, exec_id: int):
-    r = db.query(models.RuleExecutionLog).filter(models.RuleExecutionLog.id == exec_id).first()
-    if not r:
+    row = db.query(models.RuleExecutionLog, models.ExecutionPayload.payload).outerjoin(
+        models.ExecutionPayload, models.ExecutionPayload.hash == models.RuleExecutionLog.payload_hash
+    ).filter(models.RuleExecutionLog.id == exec_id).first()
+    if not row:
         return None
+    r, input_payload = row
+    labels = _version_condition_labels(db, [r.rule_version_id] if r.trigger_mask else [])
     return {
         'id': r.id,
         'ruleId': r.rule_id,
@@ -356,10 +820,10 @@ def get_execution_by_id(db: Session, exec_id: int):
         'claimId': r.claim_id,
         'executedAt': r.executed_at.isoformat() if r.executed_at else '',
         'severity': str(r.severity) if r.severity else 'low',
-        'triggerReasons': r.trigger_reasons or [],
+        'triggerReasons': _trigger_reasons(r, labels),
         'decision': str(r.decision) if r.decision else 'pending',
         'amount': r.amount or 0.0,
-        'inputPayload': r.input_payload or {},
+        'inputPayload': input_payload or {},
         'executionResult': bool(r.execution_result),
     }
 
@@ -391,30 +855,197 @@ def clone_rule(db: Session, rule_id: int, user_id: int):
         create_rule_version(db, db_rule.id, latest_version.version, latest_version.logic_snapshot, user_id, notes='Cloned from original', is_active=False)
     return db_rule
 
-def create_execution_log(
-    db: Session,
-    rule_id: int,
-    rule_version_id: int,
-    input_payload: dict,
-    execution_result: bool,
-    severity: str
-):
-    log = models.RuleExecutionLog(
-        rule_id=rule_id,
-        rule_version_id=rule_version_id,
-        input_payload=input_payload,
-        execution_result=execution_result,
-        severity=severity
+# --- Execution payloads ---
+
+def payload_hash(payload: dict) -> str:
+    """Content address of a claim payload: sha256 of its canonical JSON."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def store_payloads(db: Session, payloads: list[dict]) -> list[str]:
+    """
+    Insert payloads not stored yet (one statement, duplicates skipped) and
+    return their hashes in input order. Does not commit.
+    """
+    hashes = [payload_hash(p) for p in payloads]
+    unique = {h: p for h, p in zip(hashes, payloads)}
+    if unique:
+        db.execute(
+            pg_insert(models.ExecutionPayload)
+            .values([{"hash": h, "payload": p} for h, p in unique.items()])
+            .on_conflict_do_nothing(index_elements=["hash"])
+        )
+    return hashes
+
+def _attach_payload_hashes(db: Session, logs: list[dict]) -> None:
+    """Replace `input_payload` in log rows with `payload_hash`, storing each distinct payload once."""
+    payloads = {}
+    for row in logs:
+        payload = row.get("input_payload")
+        if payload is not None:
+            payloads.setdefault(id(payload), payload)
+    if not payloads:
+        return
+    hashes = dict(zip(payloads, store_payloads(db, list(payloads.values()))))
+    for row in logs:
+        payload = row.pop("input_payload", None)
+        row["payload_hash"] = hashes[id(payload)] if payload is not None else None
+
+def create_execution_logs(db: Session, logs: list[dict], audit: dict | None = None):
+    """
+    Insert all RuleExecutionLog rows of one request with a single multi-row
+    INSERT and commit them in one transaction together with the optional audit
+    entry (keyword arguments of log_audit). Rows may carry `input_payload`;
+    each distinct payload is stored once in execution_payloads. Rows are not
+    refreshed.
+    """
+    if logs:
+        _attach_payload_hashes(db, logs)
+        db.execute(insert(models.RuleExecutionLog), logs)
+        record_daily_stats(db, logs)
+    if audit:
+        db.add(build_audit_entry(**audit))
+    db.commit()
+    return len(logs)
+
+# --- Daily rollups ---
+#
+# rule_daily_stats holds per (rule, version, day) counts of rule_executions so
+# the performance page reads a few rows per day instead of every execution.
+# Writers never update those rows: the executions of a request and each
+# decision change insert rule_daily_stat_deltas rows in their own transaction,
+# and fold_daily_stats moves deltas into the rollup periodically (see
+# DAILY_STATS_FOLD_INTERVAL in app/main.py). Reads add a rule's pending deltas
+# to its rollup rows rather than folding them, so they never write.
+# Concurrent requests scoring claims for the same rule therefore do not queue
+# on the lock of today's rollup row. rebuild_daily_stats recomputes the rollup
+# from rule_executions (see app/rebuild_daily_stats.py).
+
+DAILY_STAT_COUNTS = ('total', 'flagged', 'fraud', 'legitimate', 'flagged_high', 'flagged_medium',
+                     'flagged_low', 'flagged_pending', 'flagged_fraud', 'flagged_legitimate')
+
+def record_daily_stats(db: Session, logs: list[dict]) -> None:
+    """
+    Queue execution rows being written as deltas to the rollups of their day.
+    The day is the database's date of the row's executed_at (today's
+    current_date when unset, like the column default), the same date
+    rebuild_daily_stats and decision changes use. Does not commit.
+    """
+    groups: dict[tuple, Counter] = {}
+    last_executed: dict[tuple, datetime] = {}
+    for row in logs:
+        if row.get("rule_id") is None:
+            continue
+        executed_at = row.get("executed_at")
+        # Rows within one minute share a date in any time zone: one delta per rule version for a request's rows
+        minute = executed_at.replace(second=0, microsecond=0) if executed_at else None
+        key = (row["rule_id"], row.get("rule_version_id") or 0, minute)
+        counts = groups.setdefault(key, Counter())
+        if executed_at and (key not in last_executed or executed_at > last_executed[key]):
+            last_executed[key] = executed_at
+        decision = models.Decision(row.get("decision") or models.Decision.pending)
+        counts["total"] += 1
+        if decision != models.Decision.pending:
+            counts[decision.value] += 1
+        if row.get("execution_result"):
+            counts["flagged"] += 1
+            counts[f"flagged_{decision.value}"] += 1
+            if row.get("severity"):
+                counts[f"flagged_{models.Severity(row['severity']).value}"] += 1
+    if not groups:
+        return
+    timestamp = models.RuleExecutionLog.executed_at.type
+    values = []
+    for (rule_id, version_id, minute), counts in groups.items():
+        values.append({
+            "rule_id": rule_id,
+            "rule_version_id": version_id,
+            "day": cast(literal(minute, timestamp), Date) if minute else func.current_date(),
+            "last_executed_at": last_executed.get((rule_id, version_id, minute), func.now()),
+            **{c: counts[c] for c in DAILY_STAT_COUNTS},
+        })
+    db.execute(insert(models.RuleDailyStatDelta).values(values))
+
+def fold_daily_stats(db: Session, rule_id: int | None = None) -> int:
+    """
+    Move pending rule_daily_stat_deltas (of one rule or all of them) into
+    rule_daily_stats and commit; returns the rollup rows touched. The deltas
+    are deleted and summed in one statement, so concurrent folds never count
+    a delta twice.
+    """
+    delta = models.RuleDailyStatDelta
+    moved = delete(delta)
+    if rule_id is not None:
+        moved = moved.where(delta.rule_id == rule_id)
+    moved = moved.returning(
+        delta.rule_id, delta.rule_version_id, delta.day, *(getattr(delta, c) for c in DAILY_STAT_COUNTS), delta.last_executed_at
+    ).cte("moved")
+    folded = select(
+        moved.c.rule_id,
+        moved.c.rule_version_id,
+        moved.c.day,
+        *(func.sum(moved.c[c]) for c in DAILY_STAT_COUNTS),
+        func.max(moved.c.last_executed_at),
+    ).group_by(moved.c.rule_id, moved.c.rule_version_id, moved.c.day)
+    stmt = pg_insert(models.RuleDailyStat).from_select(
+        ["rule_id", "rule_version_id", "day", *DAILY_STAT_COUNTS, "last_executed_at"], folded
     )
-    db.add(log)
+    stats = models.RuleDailyStat
+    result = db.execute(stmt.on_conflict_do_update(
+        index_elements=["rule_id", "rule_version_id", "day"],
+        set_={
+            **{c: getattr(stats, c) + getattr(stmt.excluded, c) for c in DAILY_STAT_COUNTS},
+            "last_executed_at": func.greatest(stats.last_executed_at, stmt.excluded.last_executed_at),
+        },
+    ))
     db.commit()
-    db.refresh(log)
-    return log
+    return result.rowcount
+
+def rebuild_daily_stats(db: Session, rule_id: int | None = None) -> int:
+    """Recompute rollup rows from rule_executions for one rule or all of them; returns rows written."""
+    log = models.RuleExecutionLog
+    flagged = log.execution_result == True
+    pending = or_(log.decision == models.Decision.pending, log.decision == None)
+    version_id = func.coalesce(log.rule_version_id, literal_column("0"))
+    day = cast(log.executed_at, Date)
+    rollup = select(
+        log.rule_id,
+        version_id,
+        day,
+        func.count(log.id),
+        func.count(log.id).filter(flagged),
+        func.count(log.id).filter(log.decision == models.Decision.fraud),
+        func.count(log.id).filter(log.decision == models.Decision.legitimate),
+        func.count(log.id).filter(flagged, log.severity == models.Severity.high),
+        func.count(log.id).filter(flagged, log.severity == models.Severity.medium),
+        func.count(log.id).filter(flagged, log.severity == models.Severity.low),
+        func.count(log.id).filter(flagged, pending),
+        func.count(log.id).filter(flagged, log.decision == models.Decision.fraud),
+        func.count(log.id).filter(flagged, log.decision == models.Decision.legitimate),
+        func.max(log.executed_at),
+    ).where(
+        log.rule_id != None,
+        log.executed_at != None,
+    ).group_by(log.rule_id, version_id, day)
+
+    existing = db.query(models.RuleDailyStat)
+    pending_deltas = db.query(models.RuleDailyStatDelta)
+    if rule_id is not None:
+        rollup = rollup.where(log.rule_id == rule_id)
+        existing = existing.filter(models.RuleDailyStat.rule_id == rule_id)
+        pending_deltas = pending_deltas.filter(models.RuleDailyStatDelta.rule_id == rule_id)
+    # rule_executions already holds what the deltas describe
+    pending_deltas.delete(synchronize_session=False)
+    existing.delete(synchronize_session=False)
+    result = db.execute(insert(models.RuleDailyStat).from_select(
+        ["rule_id", "rule_version_id", "day", *DAILY_STAT_COUNTS, "last_executed_at"], rollup
+    ))
+    db.commit()
+    return result.rowcount
 
 # --- Audit Log CRUD ---
 
-def log_audit(
-    db: Session,
+def build_audit_entry(
     action: models.AuditAction,
     entity_type: models.AuditEntityType,
     entity_id: str | int | None = None,
@@ -423,7 +1054,7 @@ def log_audit(
     actor_id: int | None = None,
     actor_email: str | None = None,
 ):
-    entry = models.AuditLog(
+    return models.AuditLog(
         action=action,
         entity_type=entity_type,
         entity_id=str(entity_id) if entity_id is not None else None,
@@ -432,6 +1063,18 @@ def log_audit(
         actor_id=actor_id,
         actor_email=actor_email,
     )
+
+def log_audit(
+    db: Session,
+    action: models.AuditAction,
+    entity_type: models.AuditEntityType,
+    entity_id: str | int | None = None,
+    entity_label: str | None = None,
+    metadata: dict | None = None,
+    actor_id: int | None = None,
+    actor_email: str | None = None,
+):
+    entry = build_audit_entry(action, entity_type, entity_id, entity_label, metadata, actor_id, actor_email)
     db.add(entry)
     db.commit()
     db.refresh(entry)
@@ -1,8 +1,17 @@
+import logging
+import os
+import threading
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from . import crud, database
+from .core.metrics import MetricsMiddleware, registry as metrics_registry
+from .core.query_tracking import QueryTrackingMiddleware
+from .services.rule_pool import pool as rule_pool
 from .routers import rules
 from .routers import auth
 from .routers import audit
+from .routers import reference_lists
 
 app = FastAPI(title="Fraud Detection API")
 
@@ -21,10 +30,54 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(QueryTrackingMiddleware)
 
 app.include_router(auth.router)
 app.include_router(rules.router)
 app.include_router(audit.router)
+app.include_router(reference_lists.router)
+
+@app.on_event("startup")
+def load_active_rule_set():
+    # Compile active rules and rebuild the duplicate/velocity indexes before the first claim
+    db = database.SessionLocal()
+    try:
+        crud.get_active_rule_set(db)
+    except Exception:
+        logging.getLogger(__name__).exception("Could not preload the active rule set")
+    finally:
+        db.close()
+
+# Seconds between folds of rule_daily_stat_deltas into rule_daily_stats; 0 disables
+# the background fold (reads still fold the rule they show)
+DAILY_STATS_FOLD_INTERVAL = float(os.getenv("DAILY_STATS_FOLD_INTERVAL", "60"))
+_fold_stop = threading.Event()
+
+def _fold_daily_stats_loop():
+    while not _fold_stop.wait(DAILY_STATS_FOLD_INTERVAL):
+        db = database.SessionLocal()
+        try:
+            crud.fold_daily_stats(db)
+        except Exception:
+            logging.getLogger(__name__).exception("Could not fold daily rollup deltas")
+        finally:
+            db.close()
+
+@app.on_event("startup")
+def start_daily_stats_fold():
+    if DAILY_STATS_FOLD_INTERVAL > 0:
+        threading.Thread(target=_fold_daily_stats_loop, name="daily-stats-fold", daemon=True).start()
+
+@app.on_event("shutdown")
+def stop_rule_pool():
+    rule_pool.shutdown()
+    _fold_stop.set()
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    """Prometheus text exposition of this worker's in-process metrics."""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/")
 def read_root():
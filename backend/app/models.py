@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Enum, JSON, Float, Text, ARRAY
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, ForeignKey, DateTime, Date, Enum, JSON, Float, Text, ARRAY, UniqueConstraint, Index, Uuid, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -40,12 +40,17 @@ class AuditAction(str, enum.Enum):
     tested_rule = "tested_rule"
     logged_in = "logged_in"
     logged_out = "logged_out"
+    created_reference_list = "created_reference_list"
+    updated_reference_list = "updated_reference_list"
+    deleted_reference_list = "deleted_reference_list"
+    updated_decision = "updated_decision"
 
 class AuditEntityType(str, enum.Enum):
     rule = "rule"
     rule_version = "rule_version"
     execution = "execution"
     user = "user"
+    reference_list = "reference_list"
 
 class User(Base):
     __tablename__ = "users"
@@ -90,6 +95,10 @@ class Rule(Base):
 
 class RuleVersion(Base):
     __tablename__ = "rule_versions"
+    __table_args__ = (
+        # Version history and latest-version lookups per rule
+        Index("ix_rule_versions_rule_id_created_at", "rule_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     rule_id = Column(Integer, ForeignKey("rules.id"))
@@ -106,6 +115,16 @@ class RuleVersion(Base):
 
 class RuleExecutionLog(Base):
     __tablename__ = "rule_executions"
+    __table_args__ = (
+        # Window scans per rule (rollup rebuilds, trigger counts) and across rules
+        Index("ix_rule_executions_rule_id_executed_at", "rule_id", "executed_at"),
+        Index("ix_rule_executions_executed_at", "executed_at"),
+        # Flagged executions only: triggered claims by date or amount, condition hit map
+        Index("ix_rule_executions_flagged_rule_executed_at", "rule_id", "executed_at", "id",
+              postgresql_where=text("execution_result")),
+        Index("ix_rule_executions_flagged_rule_amount", "rule_id", "amount", "id",
+              postgresql_where=text("execution_result")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     rule_id = Column(Integer, ForeignKey("rules.id"))
@@ -114,13 +133,71 @@ class RuleExecutionLog(Base):
     executed_at = Column(DateTime(timezone=True), server_default=func.now())
     severity = Column(Enum(Severity))
     trigger_reasons = Column(ARRAY(String))
+    # Bit i set = compiled condition i of the rule version fired (see rule_engine.condition_labels)
+    trigger_mask = Column(BigInteger)
     decision = Column(Enum(Decision), default=Decision.pending)
     amount = Column(Float)
-    input_payload = Column(JSON)
+    # Claim payloads are stored once in execution_payloads, keyed by content hash
+    payload_hash = Column(String(64), ForeignKey("execution_payloads.hash"), index=True)
+    # One per scored claim, shared by its rows across rules; NULL on rows written before it existed
+    claim_uid = Column(Uuid)
     execution_result = Column(Boolean)
 
     rule = relationship("Rule", back_populates="executions")
     rule_version = relationship("RuleVersion", back_populates="executions")
+    payload = relationship("ExecutionPayload")
+
+class RuleDailyStat(Base):
+    """Per-day rollup of rule_executions; rule_daily_stat_deltas are folded into it by crud."""
+    __tablename__ = "rule_daily_stats"
+
+    rule_id = Column(Integer, ForeignKey("rules.id", ondelete="CASCADE"), primary_key=True)
+    rule_version_id = Column(Integer, primary_key=True, default=0) # 0 = execution without a version
+    day = Column(Date, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    flagged = Column(Integer, nullable=False, default=0)
+    # All executions by decision
+    fraud = Column(Integer, nullable=False, default=0)
+    legitimate = Column(Integer, nullable=False, default=0)
+    # Flagged executions by severity and decision
+    flagged_high = Column(Integer, nullable=False, default=0)
+    flagged_medium = Column(Integer, nullable=False, default=0)
+    flagged_low = Column(Integer, nullable=False, default=0)
+    flagged_pending = Column(Integer, nullable=False, default=0)
+    flagged_fraud = Column(Integer, nullable=False, default=0)
+    flagged_legitimate = Column(Integer, nullable=False, default=0)
+    last_executed_at = Column(DateTime(timezone=True))
+
+class RuleDailyStatDelta(Base):
+    """
+    Insert-only changes to rule_daily_stats written with each batch of
+    executions or decision change. Concurrent writers never touch the same
+    row, so they do not queue on rollup row locks.
+    """
+    __tablename__ = "rule_daily_stat_deltas"
+
+    id = Column(BigInteger, primary_key=True)
+    rule_id = Column(Integer, ForeignKey("rules.id", ondelete="CASCADE"), nullable=False, index=True)
+    rule_version_id = Column(Integer, nullable=False, default=0)
+    day = Column(Date, nullable=False)
+    total = Column(Integer, nullable=False, default=0)
+    flagged = Column(Integer, nullable=False, default=0)
+    fraud = Column(Integer, nullable=False, default=0)
+    legitimate = Column(Integer, nullable=False, default=0)
+    flagged_high = Column(Integer, nullable=False, default=0)
+    flagged_medium = Column(Integer, nullable=False, default=0)
+    flagged_low = Column(Integer, nullable=False, default=0)
+    flagged_pending = Column(Integer, nullable=False, default=0)
+    flagged_fraud = Column(Integer, nullable=False, default=0)
+    flagged_legitimate = Column(Integer, nullable=False, default=0)
+    last_executed_at = Column(DateTime(timezone=True))
+
+class ExecutionPayload(Base):
+    __tablename__ = "execution_payloads"
+
+    hash = Column(String(64), primary_key=True) # sha256 of the canonical JSON
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
@@ -136,3 +213,25 @@ class AuditLog(Base):
     details = Column(JSON)
 
     actor = relationship("User")
+
+class ReferenceList(Base):
+    __tablename__ = "reference_lists"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True, nullable=False) # referenced from conditions as "list:<name>"
+    description = Column(Text)
+    version = Column(Integer, nullable=False, default=1) # bumped on every entry change
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    entries = relationship("ReferenceListEntry", back_populates="reference_list", cascade="all, delete-orphan", passive_deletes=True)
+
+class ReferenceListEntry(Base):
+    __tablename__ = "reference_list_entries"
+    __table_args__ = (UniqueConstraint("list_id", "value", name="uq_reference_list_entries_list_value"),)
+
+    id = Column(Integer, primary_key=True)
+    list_id = Column(Integer, ForeignKey("reference_lists.id", ondelete="CASCADE"), nullable=False)
+    value = Column(String, nullable=False)
+
+    reference_list = relationship("ReferenceList", back_populates="entries")
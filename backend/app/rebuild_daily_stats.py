@@ -0,0 +1,30 @@
+"""
+Recompute rule_daily_stats from rule_executions.
+
+Run after importing executions outside the API or to repair drift:
+
+    python -m app.rebuild_daily_stats            # every rule
+    python -m app.rebuild_daily_stats --rule-id 3
+"""
+import argparse
+
+from app.database import SessionLocal
+from app import crud
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rule-id", type=int, default=None, help="only rebuild this rule (rules.id)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        rows = crud.rebuild_daily_stats(db, args.rule_id)
+        scope = f"rule {args.rule_id}" if args.rule_id is not None else "all rules"
+        print(f"Rebuilt {rows} daily rollup rows for {scope}.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from typing import List
+from .. import crud, models, schemas, database
+
+router = APIRouter(
+    prefix="/api/reference-lists",
+    tags=["reference-lists"],
+)
+
+# Dependency
+
+def get_db():
+    db = database.SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _log_list_audit(db: Session, action: models.AuditAction, ref_list, metadata: dict) -> None:
+    try:
+        crud.log_audit(
+            db,
+            action=action,
+            entity_type=models.AuditEntityType.reference_list,
+            entity_id=ref_list.id,
+            entity_label=ref_list.name,
+            metadata={"version": ref_list.version, **metadata},
+            actor_email="system",
+        )
+    except Exception:
+        pass
+
+
+@router.get("/", response_model=List[schemas.ReferenceList])
+def list_reference_lists(db: Session = Depends(get_db)):
+    return crud.get_reference_lists(db)
+
+
+@router.post("/", response_model=schemas.ReferenceList)
+def create_reference_list(ref_list: schemas.ReferenceListCreate, db: Session = Depends(get_db)):
+    try:
+        created = crud.create_reference_list(db, ref_list)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Reference list already exists")
+    _log_list_audit(db, models.AuditAction.created_reference_list, created, {"size": created.size})
+    return created
+
+
+@router.get("/{name}", response_model=schemas.ReferenceList)
+def read_reference_list(name: str, db: Session = Depends(get_db)):
+    ref_list = crud.get_reference_list(db, name)
+    if ref_list is None:
+        raise HTTPException(status_code=404, detail="Reference list not found")
+    return ref_list
+
+
+@router.get("/{name}/entries", response_model=List[str])
+def read_reference_list_entries(name: str, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    ref_list = crud.get_reference_list(db, name)
+    if ref_list is None:
+        raise HTTPException(status_code=404, detail="Reference list not found")
+    return crud.get_reference_list_values(db, ref_list.id, skip=skip, limit=limit)
+
+
+@router.put("/{name}/entries", response_model=schemas.ReferenceList)
+def replace_reference_list_entries(name: str, entries: schemas.ReferenceListEntries, db: Session = Depends(get_db)):
+    ref_list = crud.update_reference_list_entries(db, name, add=entries.values, replace=True)
+    if ref_list is None:
+        raise HTTPException(status_code=404, detail="Reference list not found")
+    _log_list_audit(db, models.AuditAction.updated_reference_list, ref_list, {"operation": "replace", "values": len(entries.values), "size": ref_list.size})
+    return ref_list
+
+
+@router.post("/{name}/entries", response_model=schemas.ReferenceList)
+def add_reference_list_entries(name: str, entries: schemas.ReferenceListEntries, db: Session = Depends(get_db)):
+    ref_list = crud.update_reference_list_entries(db, name, add=entries.values)
+    if ref_list is None:
+        raise HTTPException(status_code=404, detail="Reference list not found")
+    _log_list_audit(db, models.AuditAction.updated_reference_list, ref_list, {"operation": "add", "values": len(entries.values), "size": ref_list.size})
+    return ref_list
+
+
+@router.delete("/{name}/entries", response_model=schemas.ReferenceList)
+def remove_reference_list_entries(name: str, entries: schemas.ReferenceListEntries, db: Session = Depends(get_db)):
+    ref_list = crud.update_reference_list_entries(db, name, remove=entries.values)
+    if ref_list is None:
+        raise HTTPException(status_code=404, detail="Reference list not found")
+    _log_list_audit(db, models.AuditAction.updated_reference_list, ref_list, {"operation": "remove", "values": len(entries.values), "size": ref_list.size})
+    return ref_list
+
+
+@router.delete("/{name}", response_model=schemas.ReferenceList)
+def delete_reference_list(name: str, db: Session = Depends(get_db)):
+    ref_list = crud.delete_reference_list(db, name)
+    if ref_list is None:
+        raise HTTPException(status_code=404, detail="Reference list not found")
+    _log_list_audit(db, models.AuditAction.deleted_reference_list, ref_list, {"size": ref_list.size})
+    return ref_list
@@ -1,9 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any
 import json
+import contextvars
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from .. import crud, models, schemas, database
-from ..services.rule_engine import evaluate_rule
+from ..services.rule_engine import condition_label, evaluate_rule, evaluate_rule_batch
+from ..services.duplicate_index import duplicate_index
+from ..services.velocity import velocity_store
+from ..services.entity_counters import entity_counters
+from ..services.rule_network import network
+from ..services.rule_pool import pool as rule_pool
+from ..services.rule_metrics import rule_metrics
+from ..services.reference_lists import reference_lists, referenced_lists
+from ..core.metrics import claims_scored, rules_triggered
 from datetime import datetime, timedelta
 from app.core.deps import require_admin
 from fastapi import Query
@@ -48,13 +61,13 @@ def create_rule(rule: schemas.RuleCreate, db: Session = Depends(get_db)):
 
 @router.get("/", response_model=List[schemas.Rule])
 def read_rules(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    rules = crud.get_rules(db, skip=skip, limit=limit)
-    
-    # Enrich with computed fields
-    for rule in rules:
-        stats = crud.get_rule_stats(db, rule.id)
-        rule.triggers24h = stats["triggers_24h"]
-        
+    # Rules, 24h trigger counts and latest versions in one query
+    rows = crud.get_rules_with_stats(db, skip=skip, limit=limit)
+
+    rules = []
+    for rule, triggers_24h, current_version in rows:
+        rule.triggers24h = triggers_24h
+
         # Mocking some computed fields for now as they require more complex logic/data
         rule.triggerDelta = 0 
         rule.lastUpdated = rule.updated_at.strftime("%Y-%m-%d %H:%M") if rule.updated_at else rule.created_at.strftime("%Y-%m-%d %H:%M")
@@ -63,17 +76,21 @@ def read_rules(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
             rule.createdBy = rule.creator.full_name or rule.creator.email
         if rule.owner:
             rule.ownerName = rule.owner.full_name or rule.owner.email
-            
-        # Get current version
-        latest_version = db.query(models.RuleVersion).filter(
-            models.RuleVersion.rule_id == rule.id
-        ).order_by(models.RuleVersion.created_at.desc()).first()
-        
-        if latest_version:
-            rule.currentVersion = latest_version.version
-            
+
+        if current_version:
+            rule.currentVersion = current_version
+
+        rules.append(rule)
     return rules
 
+@router.get("/evaluation-stats")
+def read_evaluation_stats(
+    sort: str = Query("slowest", pattern="^(slowest|errors)$"),
+    limit: int = Query(20, ge=1, le=500),
+):
+    """Rule versions ranked by p99 evaluation latency or by swallowed errors (this process only)."""
+    return rule_metrics.report(sort=sort, limit=limit)
+
 @router.get("/{rule_id}", response_model=schemas.Rule)
 def read_rule(rule_id: int, db: Session = Depends(get_db)):
     db_rule = crud.get_rule(db, rule_id=rule_id)
@@ -153,6 +170,20 @@ def update_rule_version(version_id: int, payload: Dict[str, Any], db: Session =
         raise HTTPException(status_code=404, detail="Rule version not found")
     return version
 
+@router.get("/versions/{version_id}/plan")
+def read_rule_version_plan(version_id: int):
+    """Order in which the active version's conditions are currently tested."""
+    groups = network.plan(version_id)
+    if groups is None:
+        raise HTTPException(status_code=404, detail="Rule version is not active")
+    return {"ruleVersionId": version_id, "groups": groups}
+
+def _load_test_reference_lists(db: Session, rule_logic: dict) -> None:
+    """Make the reference lists a tested rule points at current; /execute is not the only loader."""
+    names = referenced_lists(rule_logic)
+    if reference_lists.needs_refresh() or names - reference_lists.tracked():
+        crud.refresh_reference_lists(db, names)
+
 @router.post("/test")
 def test_rule(
     rule_data: Dict[str, Any],
@@ -176,6 +207,7 @@ def test_rule(
         }
 
         # Evaluate the rule
+        _load_test_reference_lists(db, rule_logic)
         result = evaluate_rule(rule_logic, test_payload, severity)
 
         try:
@@ -199,49 +231,259 @@ def test_rule(
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Test failed: {str(e)}")
 
-@router.post("/execute")
-def execute_rules(
-    payload: Dict[str, Any],
-    db: Session = Depends(get_db)
-):
-    active_versions = crud.get_active_rule_versions(db)
-    triggered_rules = []
-
-    for version in active_versions:
-        result = evaluate_rule(version.logic_snapshot, payload)
-
-        crud.create_execution_log(
-            db=db,
-            rule_id=version.rule_id,
-            rule_version_id=version.id,
-            input_payload=payload,
-            execution_result=result["result"],
-            severity=result["severity"]
-        )
-
-        if result["result"] is True:
-            triggered_rules.append({
-                "rule_id": version.rule_id,
-                "rule_version_id": version.id,
-                "severity": result["severity"]
-            })
+@router.post("/test/batch")
+def test_rule_batch(rule_data: Dict[str, Any], db: Session = Depends(get_db)):
+    """Evaluate a rule against many payloads at once ({"groups": [...], "payloads": [...]})."""
+    payloads = rule_data.get("payloads") or []
+    if not isinstance(payloads, list):
+        raise HTTPException(status_code=400, detail="payloads must be a list")
+
+    severity = rule_data.get("severity", "medium")
+    rule_logic = {
+        "severity": severity,
+        "groups": rule_data.get("groups", [])
+    }
+    try:
+        _load_test_reference_lists(db, rule_logic)
+        batch = evaluate_rule_batch(rule_logic, payloads, severity)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Test failed: {str(e)}")
 
+    results = batch["results"]
     try:
         crud.log_audit(
             db,
-            action=models.AuditAction.executed_rule,
+            action=models.AuditAction.tested_rule,
             entity_type=models.AuditEntityType.rule,
             entity_id=None,
             entity_label=None,
-            metadata={"total_active_rules": len(active_versions), "triggered": len(triggered_rules)},
+            metadata={"severity": severity, "groups": len(rule_logic["groups"]), "payloads": len(payloads), "triggered": int(results.sum()), "batch": True},
             actor_email="system",
         )
     except Exception:
         pass
 
+    return {
+        "total": len(payloads),
+        "triggered": int(results.sum()),
+        "results": results.tolist(),
+        "conditionHits": [
+            {"id": condition.id, "condition": condition_label(condition), "hits": int(mask.sum())}
+            for condition, mask in zip(batch["conditions"], batch["condition_masks"])
+        ],
+        "severity": severity,
+    }
+
+def _score_claim(payload: Dict[str, Any], rule_set, pooled=None):
+    """
+    Evaluate one claim against an ActiveRuleSet snapshot.
+    `pooled` is (version ids, outcomes) already computed by the process pool.
+    Returns the execution log rows and the triggered rules.
+    """
+    # Shared conditions are evaluated once per payload across all active rules
+    if pooled is None:
+        outcomes = rule_set.evaluate(payload)
+    else:
+        pooled_ids, outcomes = pooled
+        outcomes = {**outcomes, **rule_set.evaluate(payload, exclude=pooled_ids)}
+    # Later claims see this one's values as duplicates, in velocity windows and counters.
+    # executed_at is the recorded timestamp so history replays line up with live counts.
+    scored_at = datetime.now().astimezone()
+    # Identifies the claim among identical ones when its history is replayed
+    claim_uid = uuid.uuid4()
+    duplicate_index.record(payload)
+    velocity_store.record(payload, scored_at.timestamp())
+    entity_counters.record(payload, scored_at.timestamp())
+    logs = []
+    triggered_rules = []
+    for version_id, rule_id in rule_set.versions:
+        hit, trigger_mask = outcomes.get(version_id, (False, 0))
+        result = {"result": hit, "severity": "low"}
+
+        logs.append({
+            "rule_id": rule_id,
+            "rule_version_id": version_id,
+            "input_payload": payload,
+            "execution_result": result["result"],
+            "trigger_mask": trigger_mask,
+            "severity": result["severity"],
+            "executed_at": scored_at,
+            "claim_uid": claim_uid,
+        })
+
+        if result["result"] is True:
+            triggered_rules.append({
+                "rule_id": rule_id,
+                "rule_version_id": version_id,
+                "severity": result["severity"]
+            })
+    return logs, triggered_rules
+
+@router.post("/execute")
+def execute_rules(
+    payload: Dict[str, Any],
+    db: Session = Depends(get_db)
+):
+    rule_set = crud.get_active_rule_set(db)
+
+    # Large stateless rule sets are evaluated across the worker processes
+    pooled = rule_pool.evaluate(rule_set, [payload])
+    logs, triggered_rules = _score_claim(payload, rule_set, pooled and (pooled[0], pooled[1][0]))
+
+    # One INSERT and one commit for all rows plus the audit entry
+    crud.create_execution_logs(db, logs, audit={
+        "action": models.AuditAction.executed_rule,
+        "entity_type": models.AuditEntityType.rule,
+        "metadata": {"total_active_rules": len(rule_set.versions), "triggered": len(triggered_rules)},
+        "actor_email": "system",
+    })
+    claims_scored.inc(1, "execute")
+    rules_triggered.inc(len(triggered_rules), "execute")
+
     return triggered_rules
 
+# Claims evaluated (and execution rows written) per threadpool round trip
+EXECUTE_BATCH_CHUNK = 200
+
+async def _read_claims(request: Request) -> list:
+    """
+    Read the whole body into a list of claims: parsed objects for a JSON array,
+    raw lines for NDJSON (parsed per chunk while scoring).
+
+    The body must be consumed before the StreamingResponse starts: on servers
+    speaking ASGI < 2.4 it listens on receive() for disconnects and would
+    swallow body chunks still arriving.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        claims = []
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            claims.extend(line for line in lines if line.strip())
+        if buffer.strip():
+            claims.append(buffer)
+        return claims
+
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if not isinstance(body, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    return body
+
+def _score_chunk(db: Session, chunk: list, rule_set) -> tuple[list[str], int]:
+    lines = []
+    logs = []
+    triggered_total = 0
+    parsed = []
+    for index, claim in chunk:
+        if isinstance(claim, (bytes, str)):
+            try:
+                claim = json.loads(claim)
+            except ValueError as e:
+                parsed.append((index, None, f"Invalid JSON: {e}"))
+                continue
+        if not isinstance(claim, dict):
+            parsed.append((index, None, "Claim must be a JSON object"))
+            continue
+        parsed.append((index, claim, None))
+    # Stateless rules for the whole chunk go to the worker processes in one call
+    claims = [claim for _, claim, _ in parsed if claim is not None]
+    pooled = rule_pool.evaluate(rule_set, claims)
+    position = 0
+    for index, claim, error in parsed:
+        if error is not None:
+            lines.append(json.dumps({"index": index, "error": error}) + "\n")
+            continue
+        claim_logs, triggered = _score_claim(claim, rule_set, pooled and (pooled[0], pooled[1][position]))
+        position += 1
+        logs.extend(claim_logs)
+        triggered_total += len(triggered)
+        lines.append(json.dumps({"index": index, "claim_id": claim.get("claim_id"), "triggered": triggered}) + "\n")
+    crud.create_execution_logs(db, logs)
+    claims_scored.inc(position, "execute_batch")
+    rules_triggered.inc(triggered_total, "execute_batch")
+    return lines, triggered_total
+
+@router.post("/execute/batch")
+async def execute_rules_batch(request: Request):
+    """
+    Evaluate many claims against one snapshot of the active rule set.
+    Accepts a JSON array or an NDJSON body (Content-Type: application/x-ndjson)
+    and streams one NDJSON result line per claim as chunks are scored.
+    """
+    # Read before streaming starts; a malformed JSON array body is reported as a 400
+    claims = await _read_claims(request)
+
+    async def results():
+        db = database.SessionLocal()
+        try:
+            rule_set = await run_in_threadpool(crud.get_active_rule_set, db)
+            triggered_total = 0
+            for start in range(0, len(claims), EXECUTE_BATCH_CHUNK):
+                chunk = list(enumerate(claims[start:start + EXECUTE_BATCH_CHUNK], start))
+                lines, triggered = await run_in_threadpool(_score_chunk, db, chunk, rule_set)
+                triggered_total += triggered
+                for line in lines:
+                    yield line
+
+            await run_in_threadpool(crud.create_execution_logs, db, [], {
+                "action": models.AuditAction.executed_rule,
+                "entity_type": models.AuditEntityType.rule,
+                "metadata": {"total_active_rules": len(rule_set.versions), "claims": len(claims), "triggered": triggered_total, "batch": True},
+                "actor_email": "system",
+            })
+        finally:
+            db.close()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
 # --- Performance Endpoints ---
+# Sub-queries of the combined performance endpoint, each on its own pooled connection
+_performance_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="performance")
+
+def _with_session(fn, *args):
+    db = database.SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+def _submit(fn, *args):
+    # Run in a copy of the request context so its query accounting sees the sub-queries
+    return _performance_executor.submit(contextvars.copy_context().run, _with_session, fn, *args)
+
+@router.get("/{rule_id}/performance")
+def performance(
+    rule_id: int,
+    days: int = 30,
+    severity: str | None = None,
+    decision: str | None = None,
+    limit: int = 20,
+    sort: str | None = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Every panel of the performance page in one call: KPIs, trends, severity
+    and decisions come from one grouped scan; the condition hit map and the
+    first page of triggered claims run concurrently beside it.
+    """
+    rule = crud.get_rule(db, rule_id)
+    if not rule:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    conditions = _submit(crud.get_condition_hit_map, rule_id, days)
+    claims = _submit(crud.get_triggered_claims, rule_id, days, severity, decision, 0, limit, sort)
+    result = crud.get_rule_performance_summary(db, rule_id, days)
+    result["conditions"] = conditions.result()
+    try:
+        result["claims"] = claims.result()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return result
+
 @router.get("/{rule_id}/performance/kpis")
 def performance_kpis(rule_id: int, days: int = 30, db: Session = Depends(get_db)):
     rule = crud.get_rule(db, rule_id)
@@ -270,14 +512,30 @@ def performance_claims(
     skip: int = 0,
     limit: int = 20,
     sort: str | None = None,
+    cursor: str | None = None,
+    total: str = Query("exact", pattern="^(exact|estimate|none)$"),
     db: Session = Depends(get_db)
 ):
-    return crud.get_triggered_claims(db, rule_id, days, severity, decision, skip, limit, sort)
+    try:
+        return crud.get_triggered_claims(db, rule_id, days, severity, decision, skip, limit, sort, cursor, total)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/{rule_id}/performance/decisions")
 def performance_decisions(rule_id: int, days: int = 30, db: Session = Depends(get_db)):
     return crud.get_decision_counts(db, rule_id, days)
 
+@router.put("/executions/{execution_id}/decision")
+def update_execution_decision(execution_id: int, payload: Dict[str, Any], db: Session = Depends(get_db)):
+    decision = payload.get("decision")
+    if decision not in {d.value for d in models.Decision}:
+        raise HTTPException(status_code=400, detail="decision must be one of pending, fraud, legitimate")
+    user_id = 1 if crud.get_user(db, 1) else None
+    row = crud.update_execution_decision(db, execution_id, decision, actor_id=user_id, actor_email="system")
+    if not row:
+        raise HTTPException(status_code=404, detail="Execution not found")
+    return crud.get_execution_by_id(db, execution_id)
+
 @router.get("/executions/{execution_id}")
 def get_execution(execution_id: int, db: Session = Depends(get_db)):
     data = crud.get_execution_by_id(db, execution_id)
@@ -115,6 +115,27 @@ class RuleExecution(RuleExecutionBase):
     class Config:
         from_attributes = True
 
+# --- Reference List Schemas ---
+class ReferenceListBase(BaseModel):
+    name: str = Field(pattern=r'^[A-Za-z0-9_.-]+$')
+    description: Optional[str] = None
+
+class ReferenceListCreate(ReferenceListBase):
+    values: List[str] = []
+
+class ReferenceListEntries(BaseModel):
+    values: List[str]
+
+class ReferenceList(ReferenceListBase):
+    id: int
+    version: int
+    size: int = 0 # Computed field
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
 # --- Stats Schemas ---
 class TriggerTrend(BaseModel):
     day: str
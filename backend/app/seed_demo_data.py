@@ -86,6 +86,7 @@ def seed_executions(db, rule: models.Rule, version: models.RuleVersion, days: in
 
     now = datetime.now()
     total_inserted = 0
+    payloads = []
     for day_idx in range(days):
         day = now - timedelta(days=(days - 1 - day_idx))
         # Daily totals
@@ -113,6 +114,8 @@ def seed_executions(db, rule: models.Rule, version: models.RuleVersion, days: in
             )
             amount = round(random.uniform(100.0, 20000.0), 2)
             claim_id = f"CLM-DEMO-{day.strftime('%Y%m%d')}-{i:04d}"
+            payload = {"seed": True, "amount": amount}
+            payloads.append(payload)
 
             log = models.RuleExecutionLog(
                 rule_id=rule.id,
@@ -123,13 +126,16 @@ def seed_executions(db, rule: models.Rule, version: models.RuleVersion, days: in
                 trigger_reasons=reasons,
                 decision=decision_choice,
                 amount=amount,
-                input_payload={"seed": True, "amount": amount},
+                payload_hash=crud.payload_hash(payload),
                 execution_result=execution_result,
             )
             db.add(log)
             total_inserted += 1
 
+    crud.store_payloads(db, payloads)
     db.commit()
+    # Rows were added directly, so rebuild the rule's daily rollups from them
+    crud.rebuild_daily_stats(db, rule.id)
     print(f"Inserted {total_inserted} demo executions for rule {rule.rule_id}.")
     return total_inserted
 
@@ -0,0 +1,120 @@
+"""
+Bookkeeping shared by the stores that remember earlier claims: the duplicate
+index, velocity windows and entity aggregates.
+
+Each store holds entries (the values seen for a field, one window, one
+aggregate) keyed by what the conditions reading them have in common. The rule
+network tracks an entry while an active rule version uses it and untracks it
+when the version leaves; calls nest and the entry is dropped with the last
+untrack. The entry dict is replaced rather than mutated, so the request path
+reads it without taking the store lock.
+
+History is replayed into new entries by crud.warm_claim_indexes:
+
+- an entry is pending from the moment it is created until its replay finishes,
+  so a warm-up running concurrently (crud serialises them) never leaves a
+  request with a half-loaded entry, and one untracked and tracked again during
+  a replay is a new object that stays pending;
+- an entry counts live claims scored at or after its creation (`live_since`)
+  and the replay only adds claims scored before it, so a claim recorded live
+  and committed before the replay reads it is counted once.
+"""
+import json
+import math
+import threading
+import time
+from collections import Counter
+
+
+def value_key(value):
+    """Hashable key of a payload value: scalars as they are, anything else as canonical JSON."""
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+class HistoryEntry:
+    """One tracked entry of a ClaimHistoryStore."""
+    # Seconds of history before live_since a replay has to cover
+    history_seconds = math.inf
+
+    def __init__(self):
+        self.live_since = time.time()
+
+    def add_claim(self, payload: dict, timestamp: float) -> None:
+        """Fold one scored claim into the entry."""
+        raise NotImplementedError
+
+
+class ClaimHistoryStore:
+    """Reference-counted HistoryEntry objects with live recording and history replay."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: dict = {}
+        self._pending: set = set()
+        self._refs: Counter = Counter()
+
+    def _track(self, key, create) -> HistoryEntry:
+        """Reference the entry for `key`, creating it with create() on first use. Calls nest."""
+        with self._lock:
+            self._refs[key] += 1
+            entry = self._entries.get(key)
+            if entry is None:
+                entries = dict(self._entries)
+                entry = entries[key] = create()
+                self._entries = entries
+                self._pending.add(key)
+        return entry
+
+    def _untrack(self, key) -> None:
+        """Undo one _track(); the entry is dropped with the last one."""
+        with self._lock:
+            self._refs[key] -= 1
+            if self._refs[key] > 0:
+                return
+            del self._refs[key]
+            entries = dict(self._entries)
+            entries.pop(key, None)
+            self._entries = entries
+            self._pending.discard(key)
+
+    def record(self, payload: dict, timestamp: float | None = None) -> None:
+        """Fold a scored claim into every entry that was live when it was scored."""
+        timestamp = timestamp or time.time()
+        for entry in self._entries.values():
+            if timestamp >= entry.live_since:
+                entry.add_claim(payload, timestamp)
+
+    def has_pending(self) -> bool:
+        return bool(self._pending)
+
+    def pending_range(self) -> tuple[float, float]:
+        """(since, until) timestamps of the history needed to warm the pending entries."""
+        with self._lock:
+            entries = [self._entries[key] for key in self._pending]
+        if not entries:
+            return 0.0, 0.0
+        return (
+            min(e.live_since - e.history_seconds for e in entries),
+            max(e.live_since for e in entries),
+        )
+
+    def load_history(self, claims) -> int:
+        """
+        Replay (timestamp, payload) pairs, oldest first, into entries not warmed
+        yet; returns the number of claims read.
+        """
+        with self._lock:
+            loading = {key: self._entries[key] for key in self._pending}
+        count = 0
+        for timestamp, payload in claims:
+            for entry in loading.values():
+                # Later claims were counted live
+                if timestamp < entry.live_since:
+                    entry.add_claim(payload, timestamp)
+            count += 1
+        with self._lock:
+            # Not a key untracked and tracked again meanwhile
+            self._pending -= {key for key, entry in loading.items() if self._entries.get(key) is entry}
+        return count
@@ -0,0 +1,118 @@
+"""
+Duplicate-value index backing the `is_duplicate` operator.
+
+For every field referenced by an active `is_duplicate` condition (e.g.
+`document.hash`, `claimant.ip_address`) the index remembers the values seen in
+earlier claims. Each field keeps an exact set of up to DUPLICATE_EXACT_LIMIT
+values plus a Bloom filter over every value. While the exact set is complete
+lookups are exact; once it is full, new values only go into the Bloom filter
+and a Bloom hit is treated as a duplicate (false positive rate
+DUPLICATE_BLOOM_ERROR_RATE), so memory stays bounded.
+
+Fields are tracked while an active rule version in the rule network uses
+them and dropped with the last such version (see claim_history). History for
+newly tracked fields is loaded from execution_payloads by
+crud.warm_claim_indexes when the version is activated, and /execute records
+each claim after scoring it.
+"""
+import math
+import os
+import threading
+
+from .claim_history import ClaimHistoryStore, HistoryEntry, value_key
+
+EXACT_LIMIT = int(os.getenv("DUPLICATE_EXACT_LIMIT", "100000"))
+BLOOM_CAPACITY = int(os.getenv("DUPLICATE_BLOOM_CAPACITY", "1000000"))
+BLOOM_ERROR_RATE = float(os.getenv("DUPLICATE_BLOOM_ERROR_RATE", "0.001"))
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter using double hashing over Python's hash()."""
+    __slots__ = ('size', 'hashes', 'bits')
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        h1 = hash(key)
+        h2 = hash((key, 0x9E3779B9)) | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def add(self, key) -> None:
+        bits = self.bits
+        for pos in self._positions(key):
+            bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key) -> bool:
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class _FieldValues(HistoryEntry):
+    def __init__(self, get):
+        super().__init__()
+        self.get = get
+        self.exact = set()
+        self.bloom = BloomFilter(BLOOM_CAPACITY, BLOOM_ERROR_RATE)
+        self.saturated = False
+        self.lock = threading.Lock()
+
+    def add(self, value) -> None:
+        key = value_key(value)
+        with self.lock:
+            if key in self.exact:
+                return
+            self.bloom.add(key)
+            if len(self.exact) < EXACT_LIMIT:
+                self.exact.add(key)
+            else:
+                self.saturated = True
+
+    def add_claim(self, payload: dict, timestamp: float) -> None:
+        value = self.get(payload)
+        if value is not None:
+            self.add(value)
+
+    def __contains__(self, value) -> bool:
+        key = value_key(value)
+        if key in self.exact:
+            return True
+        if not self.saturated:
+            return False
+        return key in self.bloom
+
+
+class DuplicateIndex(ClaimHistoryStore):
+    def track(self, field: str, get) -> None:
+        """Start remembering values of `field`; get(payload) extracts it. Calls nest."""
+        self._track(field, lambda: _FieldValues(get))
+
+    def untrack(self, field: str) -> None:
+        """Undo one track(); the field's values are dropped with the last one."""
+        self._untrack(field)
+
+    def seen(self, field: str, value) -> bool:
+        if value is None:
+            return False
+        values = self._entries.get(field)
+        return values is not None and value in values
+
+    def load_history(self, payloads) -> int:
+        """
+        Feed stored payloads into fields that have not been warmed yet. They
+        carry no scoring time and are all replayed; remembering a value twice
+        is harmless.
+        """
+        return super().load_history((-math.inf, payload) for payload in payloads)
+
+    def stats(self) -> dict:
+        return {
+            field: {"exact": len(values.exact), "saturated": values.saturated}
+            for field, values in self._entries.items()
+        }
+
+
+duplicate_index = DuplicateIndex()
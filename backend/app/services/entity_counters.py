@@ -0,0 +1,143 @@
+"""
+Running per-entity aggregates backing the `count` operator.
+
+`count` used to compare the length of a history array sent in the payload. A
+condition on a scalar field now reads a server-side aggregate of earlier
+claims for that entity instead:
+
+    {"field": "claimant.ip_address", "operator": "count", "value": 5}
+        -> at least 5 earlier claims from this IP
+    {"field": "claimant.ip_address", "operator": "count", "value": "sum(claim.amount) >= 10000"}
+    {"field": "claimant.ip_address", "operator": "count", "value": "distinct(device.id) >= 3"}
+
+Aggregates exist while an active rule version in the rule network uses them
+and are kept incrementally: /execute records each scored claim, and newly
+tracked aggregates are replayed from rule_executions by
+crud.warm_claim_indexes. Each aggregate keeps at most COUNTER_MAX_ENTITIES
+entities (least recently seen evicted) and distinct sets are capped at
+COUNTER_MAX_DISTINCT values.
+
+The replay covers the COUNTER_HISTORY_DAYS days before the aggregate was
+tracked; claims scored from then on are recorded live (see claim_history).
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from .claim_history import ClaimHistoryStore, HistoryEntry, value_key
+
+MAX_ENTITIES = int(os.getenv("COUNTER_MAX_ENTITIES", "100000"))
+MAX_DISTINCT = int(os.getenv("COUNTER_MAX_DISTINCT", "1000"))
+HISTORY_DAYS = float(os.getenv("COUNTER_HISTORY_DAYS", "90"))
+
+AGGREGATES = ('count', 'sum', 'distinct')
+
+_SPEC_RE = re.compile(r'^\s*(count|sum|distinct)\s*\(\s*([\w.]*)\s*\)\s*>=\s*(-?\d+(?:\.\d+)?)\s*$')
+
+
+def parse_aggregate(value) -> tuple[str, str | None, float] | None:
+    """Parse a count condition value into (aggregate, measure_field, minimum)."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return 'count', None, value
+    text = str(value).strip()
+    try:
+        return 'count', None, float(text)
+    except ValueError:
+        pass
+    match = _SPEC_RE.match(text)
+    if not match:
+        return None
+    kind, measure, minimum = match.group(1), match.group(2) or None, float(match.group(3))
+    if kind != 'count' and measure is None:
+        return None
+    return kind, measure, minimum
+
+
+class EntityAggregate(HistoryEntry):
+    """One aggregate (count, sum or distinct of a measure) per value of a key field."""
+
+    def __init__(self, field: str, kind: str, measure: str | None, get, get_measure):
+        super().__init__()
+        self.field = field
+        self.kind = kind
+        self.measure = measure
+        self.get = get
+        self.get_measure = get_measure
+        self.values: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    @property
+    def history_seconds(self) -> float:
+        return HISTORY_DAYS * 86400
+
+    def value(self, entity) -> float:
+        if entity is None:
+            return 0
+        current = self.values.get(value_key(entity))
+        if current is None:
+            return 0
+        return len(current) if self.kind == 'distinct' else current
+
+    def add(self, payload: dict) -> None:
+        entity = self.get(payload)
+        if entity is None:
+            return
+        key = value_key(entity)
+        if self.kind == 'count':
+            delta = 1
+        else:
+            measured = self.get_measure(payload)
+            if measured is None:
+                return
+            if self.kind == 'sum':
+                if isinstance(measured, bool) or not isinstance(measured, (int, float)):
+                    try:
+                        measured = float(measured)
+                    except (TypeError, ValueError):
+                        return
+                delta = measured
+            else:
+                delta = value_key(measured)
+        with self.lock:
+            values = self.values
+            current = values.get(key)
+            if current is None:
+                current = set() if self.kind == 'distinct' else 0
+                if len(values) >= MAX_ENTITIES:
+                    values.popitem(last=False)
+            else:
+                values.move_to_end(key)
+            if self.kind == 'distinct':
+                if len(current) < MAX_DISTINCT:
+                    current.add(delta)
+            else:
+                current += delta
+            values[key] = current
+
+    def add_claim(self, payload: dict, timestamp: float) -> None:
+        self.add(payload)
+
+
+class EntityCounters(ClaimHistoryStore):
+    def track(self, field: str, kind: str, measure: str | None, get, get_measure=None) -> EntityAggregate:
+        """Start aggregating `measure` per value of `field`. Calls nest."""
+        return self._track((field, kind, measure), lambda: EntityAggregate(field, kind, measure, get, get_measure))
+
+    def untrack(self, field: str, kind: str, measure: str | None) -> None:
+        """Undo one track(); the aggregate is dropped with the last one."""
+        self._untrack((field, kind, measure))
+
+    def value(self, field: str, kind: str, measure: str | None, entity) -> float:
+        """Aggregate of earlier claims for the entity; 0 while no active rule tracks it."""
+        aggregate = self._entries.get((field, kind, measure))
+        return aggregate.value(entity) if aggregate is not None else 0
+
+    def stats(self) -> dict:
+        return {
+            f"{a.kind}({a.measure or ''}) by {a.field}": len(a.values)
+            for a in self._entries.values()
+        }
+
+
+entity_counters = EntityCounters()
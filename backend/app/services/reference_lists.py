@@ -0,0 +1,136 @@
+"""
+Managed reference lists (watchlists) for the `contains` operator.
+
+A condition such as `{"field": "claimant.ip_address", "operator": "contains",
+"value": "list:blocked_ips"}` checks the field against the reference list
+named `blocked_ips` instead of an inline value, so 100k-entry blocklists are
+not copied into every logic_snapshot. Each list version is loaded once into a
+frozenset and membership is O(1).
+
+Lists are tracked while an active rule version in the rule network references
+them and loaded by crud.refresh_reference_lists; edits through the API reload the list in this
+process and other processes notice the new version within
+RULE_SET_SNAPSHOT_TTL seconds. /test loads the lists a draft rule references
+on demand; lists no active rule tracks are unloaded at the next periodic
+refresh.
+"""
+import os
+import threading
+import time
+from collections import Counter
+
+# Same staleness bound as the active rule set snapshot
+REFRESH_INTERVAL = float(os.getenv("RULE_SET_SNAPSHOT_TTL", "30"))
+
+LIST_PREFIX = "list:"
+
+
+def list_name(value) -> str | None:
+    """Name of the reference list a condition value points at, if any."""
+    if isinstance(value, str) and value.startswith(LIST_PREFIX):
+        return value[len(LIST_PREFIX):].strip() or None
+    return None
+
+
+def referenced_lists(logic: dict) -> set[str]:
+    """Names of the reference lists a RuleLogic's contains conditions point at."""
+    names = set()
+    for group in (logic or {}).get('groups') or []:
+        for condition in group.get('conditions') or []:
+            if condition.get('operator') == 'contains' and (name := list_name(condition.get('value'))):
+                names.add(name)
+    return names
+
+
+def entry_key(value) -> str | None:
+    """Entries are stored as strings; scalar payload values are compared by their text."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (int, float)):
+        return str(value)
+    return None
+
+
+class _LoadedList:
+    __slots__ = ('version', 'values', 'loaded_at')
+
+    def __init__(self, version: int, values: frozenset):
+        self.version = version
+        self.values = values
+        self.loaded_at = time.monotonic()
+
+
+class ReferenceLists:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lists: dict[str, _LoadedList] = {}
+        self._tracked: set[str] = set()
+        self._refs: Counter = Counter()
+        self._checked_at = 0.0
+
+    def track(self, name: str) -> None:
+        """Keep `name` loaded and refreshed. Calls nest."""
+        with self._lock:
+            self._refs[name] += 1
+            if name not in self._tracked:
+                self._tracked = self._tracked | {name}
+
+    def untrack(self, name: str) -> None:
+        """Undo one track(); the list is unloaded with the last one."""
+        with self._lock:
+            self._refs[name] -= 1
+            if self._refs[name] > 0:
+                return
+            del self._refs[name]
+            self._tracked = self._tracked - {name}
+        self.drop(name)
+
+    def contains(self, name: str, value) -> bool:
+        loaded = self._lists.get(name)
+        if loaded is None:
+            return False
+        key = entry_key(value)
+        return key is not None and key in loaded.values
+
+    def needs_refresh(self) -> bool:
+        """True when a tracked list is not loaded yet or the versions are due for a check."""
+        if self._tracked - self._lists.keys():
+            return True
+        return bool(self._tracked) and time.monotonic() - self._checked_at >= REFRESH_INTERVAL
+
+    def tracked(self) -> set[str]:
+        return set(self._tracked)
+
+    def loaded(self) -> set[str]:
+        return set(self._lists)
+
+    def loaded_version(self, name: str) -> int | None:
+        loaded = self._lists.get(name)
+        return loaded.version if loaded else None
+
+    def mark_checked(self) -> None:
+        self._checked_at = time.monotonic()
+
+    def replace(self, name: str, version: int, values) -> None:
+        loaded = _LoadedList(version, frozenset(values))
+        with self._lock:
+            lists = dict(self._lists)
+            lists[name] = loaded
+            self._lists = lists
+
+    def drop(self, name: str) -> None:
+        with self._lock:
+            if name in self._lists:
+                lists = dict(self._lists)
+                del lists[name]
+                self._lists = lists
+
+    def stats(self) -> dict:
+        return {name: {"version": l.version, "size": len(l.values)} for name, l in self._lists.items()}
+
+
+reference_lists = ReferenceLists()
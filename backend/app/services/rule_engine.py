@@ -1,126 +1,478 @@
-import json_logic
+import logging
+import os
+import random
+import threading
+import time
 
-def convert_rule_logic_to_json_logic(rule_logic: dict) -> dict:
+import numpy as np
+
+from .duplicate_index import duplicate_index
+from .velocity import parse_window, velocity_store
+from .entity_counters import parse_aggregate, entity_counters
+from .reference_lists import list_name, reference_lists
+from .rule_metrics import rule_metrics
+
+logger = logging.getLogger(__name__)
+
+# --- Compiled evaluators ---
+#
+# Each RuleVersion snapshot is compiled once into closures and cached by
+# rule_version_id, instead of converting RuleLogic to a json-logic tree and
+# interpreting it again on every call. Snapshots are immutable, so entries
+# only need evicting when a version is deactivated, replaced or deleted.
+
+def to_number(value):
+    """
+    Coerce a payload or condition value to a number for comparisons: booleans
+    become 1.0 or 0.0, ints and floats are kept, strings are parsed as floats
+    after stripping whitespace. Anything else, and strings that do not parse,
+    give None, which no comparison matches.
+    """
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return float(value.strip())
+        except ValueError:
+            return None
+    return None
+
+def _loose_equals(a, b) -> bool:
+    if a == b:
+        return True
+    a_num = to_number(a)
+    return a_num is not None and a_num == to_number(b)
+
+def _field_getter(field: str):
+    """Build a getter for a dotted field path such as `claim.amount`; list items are addressed by index."""
+    keys = field.split('.')
+    if len(keys) == 1:
+        key = keys[0]
+        return lambda data: data.get(key) if isinstance(data, dict) else None
+
+    def getter(data):
+        for key in keys:
+            if isinstance(data, dict):
+                data = data.get(key)
+            elif isinstance(data, (list, tuple)) and key.lstrip('-').isdigit():
+                try:
+                    data = data[int(key)]
+                except IndexError:
+                    return None
+            else:
+                return None
+        return data
+    return getter
+
+def _compile_test(field: str, operator: str, value, unit: str | None = None):
+    """Return a predicate over the resolved field value, or None for unknown operators."""
+    if operator in ('greater', 'less'):
+        threshold = to_number(value)
+        if threshold is None:
+            # A threshold that is not a number never matches
+            return lambda actual: False
+        if operator == 'greater':
+            return lambda actual: (n := to_number(actual)) is not None and n > threshold
+        return lambda actual: (n := to_number(actual)) is not None and n < threshold
+    if operator == 'equals':
+        return lambda actual: _loose_equals(actual, value)
+    if operator == 'not_equals':
+        return lambda actual: not _loose_equals(actual, value)
+    if operator == 'contains':
+        name = list_name(value)
+        if name is not None:
+            # "list:<name>" checks membership in a managed reference list
+            return lambda actual: reference_lists.contains(name, actual)
+        if isinstance(value, str):
+            return lambda actual: isinstance(actual, str) and actual in value
+        if isinstance(value, (list, tuple)):
+            return lambda actual: actual in value
+        return lambda actual: False
+    if operator == 'is_duplicate':
+        # Seen in an earlier claim (values are recorded after each claim is scored)
+        return lambda actual: duplicate_index.seen(field, actual)
+    if operator == 'within_time':
+        window = parse_window(value, unit)
+        if window is None:
+            return None
+        more_than, seconds = window
+        # Earlier claims with the same field value inside the window
+        return lambda actual: velocity_store.count(field, seconds, actual) > more_than
+    if operator == 'count':
+        spec = parse_aggregate(value)
+        if spec is None:
+            return None
+        kind, measure, minimum = spec
+        # Running aggregate of earlier claims for this entity (see entity_counters)
+
+        def count_test(actual):
+            # Callers that still send the history array in the payload
+            if kind == 'count' and isinstance(actual, (list, tuple)):
+                return len(actual) >= minimum
+            if kind == 'count' and isinstance(actual, dict):
+                n = to_number(actual.get('length'))
+                return n is not None and n >= minimum
+            return entity_counters.value(field, kind, measure, actual) >= minimum
+        return count_test
+    return None
+
+def condition_key(field: str, operator: str, value, unit: str | None = None) -> tuple:
+    """Identity of a condition atom; conditions with equal keys always evaluate the same."""
+    if operator == 'within_time':
+        return (field, operator, f"{value} {unit or 'hours'}")
+    if operator in ('greater', 'less', 'count'):
+        number = to_number(value)
+        if number is not None:
+            return (field, operator, number)
+    if not isinstance(value, (str, int, float, bool)):
+        value = repr(value)
+    return (field, operator, value)
+
+class CompiledCondition:
+    """A single RuleCondition bound to a field getter and a predicate."""
+    __slots__ = ('id', 'field', 'operator', 'value', 'unit', 'key', 'get', 'test')
+
+    def __init__(self, condition: dict, test):
+        self.id = str(condition.get('id', ''))
+        self.field = condition.get('field', '')
+        self.operator = condition.get('operator', '')
+        self.value = condition.get('value', '')
+        self.unit = condition.get('unit')
+        self.key = condition_key(self.field, self.operator, self.value, self.unit)
+        self.get = _field_getter(self.field)
+        self.test = test
+
+    def __call__(self, payload) -> bool:
+        return self.test(self.get(payload))
+
+class CompiledRule:
+    """
+    Native evaluator for a RuleLogic snapshot.
+    `groups` is a list of (is_or, [CompiledCondition]); groups are ANDed.
+    """
+    __slots__ = ('groups',)
+
+    def __init__(self, groups):
+        self.groups = groups
+
+    def __call__(self, payload) -> bool:
+        if not self.groups:
+            return False
+        for is_or, conditions in self.groups:
+            if is_or:
+                for condition in conditions:
+                    if condition(payload):
+                        break
+                else:
+                    return False
+            else:
+                for condition in conditions:
+                    if not condition(payload):
+                        return False
+        return True
+
+def compile_condition(condition: dict):
+    """Compile a RuleCondition, or return None for one without a field or with an unknown operator (it is skipped)."""
+    if not condition.get('field') or not condition.get('operator'):
+        return None
+    test = _compile_test(condition['field'], condition['operator'], condition.get('value', ''), condition.get('unit'))
+    if test is None:
+        return None
+    return CompiledCondition(condition, test)
+
+def compile_rule_logic(rule_logic: dict) -> CompiledRule:
     """
-    Convert RuleLogic format to json-logic format.
-    RuleLogic has groups with logicOperator and conditions.
+    Compile RuleLogic into a CompiledRule: a single group is always an AND of
+    its conditions whatever its logicOperator, multiple groups are ANDed and
+    each honours its own OR. Rules without conditions never match.
     """
-    if not rule_logic or 'groups' not in rule_logic:
-        return {}
+    if not rule_logic or not rule_logic.get('groups'):
+        return CompiledRule([])
 
     groups = rule_logic['groups']
-    if not groups:
-        return {}
-
-    # For now, assume the first group is the main IF condition
-    # and subsequent groups are AND/OR conditions
-    main_group = groups[0]
-    conditions = []
-
-    # Convert conditions in the main group
-    for condition in main_group['conditions']:
-        json_logic_condition = convert_condition_to_json_logic(condition)
-        if json_logic_condition:
-            conditions.append(json_logic_condition)
-
-    # If there are more groups, combine them
-    if len(groups) > 1:
-        all_conditions = [convert_group_to_json_logic(group) for group in groups]
-        all_conditions = [c for c in all_conditions if c]
-        if len(all_conditions) > 1:
-            return {"and": all_conditions}
-        elif all_conditions:
-            return all_conditions[0]
-
-    # Single group
-    if len(conditions) > 1:
-        return {"and": conditions}
-    elif conditions:
-        return conditions[0]
-
-    return {}
-
-def convert_group_to_json_logic(group: dict) -> dict:
-    """Convert a ConditionGroup to json-logic"""
-    conditions = []
-    for condition in group['conditions']:
-        json_logic_condition = convert_condition_to_json_logic(condition)
-        if json_logic_condition:
-            conditions.append(json_logic_condition)
-
-    if not conditions:
-        return {}
-
-    operator = group.get('logicOperator', 'AND').lower()
-    if operator == 'or':
-        return {"or": conditions}
-    else:  # 'if' or 'and'
-        return {"and": conditions} if len(conditions) > 1 else conditions[0]
-
-def convert_condition_to_json_logic(condition: dict) -> dict:
-    """Convert a RuleCondition to json-logic"""
-    field = condition.get('field', '')
-    operator = condition.get('operator', '')
-    value = condition.get('value', '')
-
-    if not field or not operator:
-        return {}
-
-    # Map operators to json-logic
-    operator_map = {
-        'greater': '>',
-        'less': '<',
-        'equals': '==',
-        'not_equals': '!=',
-        'contains': 'in',
-    }
+    compiled = []
+    for group in groups:
+        conditions = [c for c in (compile_condition(cond) for cond in group['conditions']) if c]
+        if conditions:
+            is_or = len(groups) > 1 and group.get('logicOperator', 'AND').lower() == 'or'
+            compiled.append((is_or, conditions))
+    return CompiledRule(compiled)
 
-    if operator in operator_map:
-        return {operator_map[operator]: [{"var": field}, value]}
+# --- Claim history tracking ---
+#
+# Conditions that read claim history only see what an active rule version
+# registered. The rule network calls these when a condition node is added to
+# or removed from it; compiling a condition (for /test, labels, ...) has no
+# side effects.
+
+def track_condition(condition: CompiledCondition) -> None:
+    """Register the claim history or reference list a condition reads, if any."""
+    field, operator, value = condition.field, condition.operator, condition.value
+    if operator == 'contains' and list_name(value) is not None:
+        reference_lists.track(list_name(value))
+    elif operator == 'is_duplicate':
+        duplicate_index.track(field, condition.get)
+    elif operator == 'within_time' and (window := parse_window(value, condition.unit)):
+        velocity_store.track(field, window[1], condition.get)
+    elif operator == 'count' and (spec := parse_aggregate(value)):
+        kind, measure, _ = spec
+        entity_counters.track(field, kind, measure, condition.get, _field_getter(measure) if measure else None)
+
+def untrack_condition(condition: CompiledCondition) -> None:
+    """Undo track_condition for a condition leaving the rule network."""
+    field, operator, value = condition.field, condition.operator, condition.value
+    if operator == 'contains' and list_name(value) is not None:
+        reference_lists.untrack(list_name(value))
     elif operator == 'is_duplicate':
-        # For duplicate check, we'll assume it's checking if the field value exists in some list
-        # This is a simplification - in real implementation, you'd check against a database
-        return {"in": [{"var": field}, ["duplicate_value1", "duplicate_value2"]]}  # Mock duplicates
-    elif operator == 'within_time':
-        # This is complex - for now, assume it's always true for testing
-        return {"==": [1, 1]}  # Always true
-    elif operator == 'count':
-        return {">=": [{"var": f"{field}.length"}, value]}
-
-    return {}
-
-def evaluate_rule(logic: dict, payload: dict, severity: str = "low") -> dict:
+        duplicate_index.untrack(field)
+    elif operator == 'within_time' and (window := parse_window(value, condition.unit)):
+        velocity_store.untrack(field, window[1])
+    elif operator == 'count' and (spec := parse_aggregate(value)):
+        kind, measure, _ = spec
+        entity_counters.untrack(field, kind, measure)
+
+# --- Condition outcome masks ---
+#
+# Execution rows of triggered rules record which conditions fired as a bitmask
+# over the rule version's compiled conditions (groups in order, conditions in
+# order); rows of rules that did not trigger carry 0. Labels are derived from
+# the version's logic only when rows are read. Postgres BIGINT is signed, so
+# at most MAX_MASK_CONDITIONS conditions are tracked.
+
+MAX_MASK_CONDITIONS = 63
+
+_LABEL_SYMBOLS = {
+    'greater': '>',
+    'less': '<',
+    'equals': '=',
+    'not_equals': '!=',
+    'contains': 'in',
+    'count': 'count >=',
+    'within_time': 'within',
+}
+
+def condition_label(condition: CompiledCondition) -> str:
+    if condition.operator == 'is_duplicate':
+        return f"{condition.field} is duplicate"
+    symbol = _LABEL_SYMBOLS.get(condition.operator, condition.operator)
+    if condition.operator == 'within_time':
+        return f"{condition.field} {symbol} {condition.value} {condition.unit or 'hours'}"
+    return f"{condition.field} {symbol} {condition.value}"
+
+def condition_labels(logic: dict) -> list[str]:
+    """Labels of the conditions addressed by trigger mask bits, in bit order."""
+    compiled = compile_rule_logic(logic)
+    labels = [condition_label(c) for _, conditions in compiled.groups for c in conditions]
+    return labels[:MAX_MASK_CONDITIONS]
+
+def expand_trigger_mask(mask: int | None, labels: list[str]) -> list[str]:
+    if not mask:
+        return []
+    return [label for bit, label in enumerate(labels) if mask >> bit & 1]
+
+_compiled_rules: dict[int, CompiledRule] = {}
+_compiled_lock = threading.Lock()
+
+def get_compiled_rule(rule_version_id: int, logic: dict) -> CompiledRule:
+    """Return the cached evaluator for a rule version, compiling it on first use."""
+    compiled = _compiled_rules.get(rule_version_id)
+    if compiled is None:
+        compiled = compile_rule_logic(logic)
+        with _compiled_lock:
+            _compiled_rules[rule_version_id] = compiled
+    return compiled
+
+def evict_compiled_rules(rule_version_ids) -> None:
+    """Drop cached evaluators for versions that were deactivated, replaced or deleted."""
+    with _compiled_lock:
+        for version_id in rule_version_ids:
+            _compiled_rules.pop(version_id, None)
+
+def clear_compiled_rules() -> None:
+    with _compiled_lock:
+        _compiled_rules.clear()
+
+# --- Debug logging ---
+#
+# Per-rule debug records are off by default. They are enabled for specific
+# rule ids (RULE_ENGINE_DEBUG_RULES=12,40) or for a random sample of
+# evaluations (RULE_ENGINE_DEBUG_SAMPLE_RATE=0.01), and only when this logger
+# is enabled for DEBUG. Arguments are passed to the logger unformatted so the
+# payload is only serialized if a handler actually emits the record.
+
+def _parse_rule_ids(raw: str | None) -> frozenset:
+    if not raw:
+        return frozenset()
+    rule_ids = set()
+    for part in raw.split(','):
+        if not part.strip():
+            continue
+        try:
+            rule_ids.add(int(part))
+        except ValueError:
+            logger.warning("ignoring invalid rule id %r in RULE_ENGINE_DEBUG_RULES", part.strip())
+    return frozenset(rule_ids)
+
+def _parse_sample_rate(raw: str | None) -> float:
+    try:
+        return max(0.0, min(1.0, float(raw or 0)))
+    except ValueError:
+        logger.warning("ignoring invalid RULE_ENGINE_DEBUG_SAMPLE_RATE %r", raw)
+        return 0.0
+
+_debug_rule_ids = _parse_rule_ids(os.getenv("RULE_ENGINE_DEBUG_RULES"))
+_debug_sample_rate = _parse_sample_rate(os.getenv("RULE_ENGINE_DEBUG_SAMPLE_RATE"))
+
+def configure_debug_logging(rule_ids=None, sample_rate: float | None = None) -> None:
+    """Change which evaluations emit per-rule debug records at runtime."""
+    global _debug_rule_ids, _debug_sample_rate
+    if rule_ids is not None:
+        _debug_rule_ids = frozenset(int(r) for r in rule_ids)
+    if sample_rate is not None:
+        _debug_sample_rate = max(0.0, min(1.0, float(sample_rate)))
+
+def debug_enabled(rule_id: int | None) -> bool:
+    if not (_debug_rule_ids or _debug_sample_rate):
+        return False
+    if not logger.isEnabledFor(logging.DEBUG):
+        return False
+    if rule_id is not None and rule_id in _debug_rule_ids:
+        return True
+    return _debug_sample_rate > 0 and random.random() < _debug_sample_rate
+
+def log_evaluation(rule_id, rule_version_id, result, logic, payload) -> None:
+    """Emit a per-rule debug record; callers check debug_enabled(rule_id) first."""
+    logger.debug(
+        "rule evaluated rule_id=%s rule_version_id=%s result=%s logic=%s payload=%s",
+        rule_id, rule_version_id, result, logic, payload,
+        extra={"rule_id": rule_id, "rule_version_id": rule_version_id, "result": result},
+    )
+
+def evaluate_rule(
+    logic: dict,
+    payload: dict,
+    severity: str = "low",
+    rule_version_id: int | None = None,
+    rule_id: int | None = None,
+) -> dict:
     """
-    Evaluate rule logic against input payload using json-logic.
+    Evaluate rule logic against input payload.
+    When rule_version_id is given the compiled evaluator is cached for that version.
     Returns {"result": boolean, "severity": string}
     Never crashes on invalid logic or payload.
     """
+    started = time.perf_counter_ns()
     try:
-        # Convert RuleLogic to json-logic format
-        json_logic_rules = convert_rule_logic_to_json_logic(logic)
+        if rule_version_id is not None:
+            compiled = get_compiled_rule(rule_version_id, logic)
+        else:
+            compiled = compile_rule_logic(logic)
 
-        # Debug logging
-        print(f"Original logic: {logic}")
-        print(f"Converted json-logic: {json_logic_rules}")
-        print(f"Payload: {payload}")
+        result = compiled(payload)
+        if rule_version_id is not None:
+            rule_metrics.record(rule_version_id, rule_id, result, time.perf_counter_ns() - started)
 
-        # Evaluate the logic
-        result = json_logic.jsonLogic(json_logic_rules, payload)
-
-        # Ensure result is boolean
-        if not isinstance(result, bool):
-            result = bool(result)
-
-        print(f"Evaluation result: {result}")
+        if debug_enabled(rule_id):
+            log_evaluation(rule_id, rule_version_id, result, logic, payload)
 
         return {
             "result": result,
             "severity": severity
         }
     except Exception as e:
-        print(f"Error evaluating rule: {e}")
+        logger.warning(
+            "rule evaluation failed rule_id=%s rule_version_id=%s: %s",
+            rule_id, rule_version_id, e,
+            extra={"rule_id": rule_id, "rule_version_id": rule_version_id},
+        )
+        if rule_version_id is not None:
+            rule_metrics.record(rule_version_id, rule_id, False, time.perf_counter_ns() - started, error=True)
         # On any error, return false with low severity
         return {
             "result": False,
             "severity": "low"
         }
+
+# --- Vectorized batch evaluation ---
+#
+# For bulk rescoring the referenced fields are pulled out of every payload
+# once into NumPy columns and each condition becomes a boolean array
+# operation. Numeric comparisons run fully vectorized; operators without a
+# numeric form apply the compiled predicate over the extracted column.
+
+def _numeric_column(raw: list):
+    return np.fromiter(
+        ((n if (n := to_number(v)) is not None else np.nan) for v in raw),
+        dtype=float,
+        count=len(raw),
+    )
+
+def _condition_mask(condition: CompiledCondition, raw: list, numeric):
+    operator = condition.operator
+    threshold = to_number(condition.value)
+    if operator == 'greater' and threshold is not None:
+        return numeric() > threshold
+    if operator == 'less' and threshold is not None:
+        return numeric() < threshold
+    if operator in ('equals', 'not_equals') and threshold is not None and threshold == threshold:
+        equal = numeric() == threshold
+        return equal if operator == 'equals' else ~equal
+    test = condition.test
+    return np.fromiter((bool(test(v)) for v in raw), dtype=bool, count=len(raw))
+
+def evaluate_rule_batch(
+    logic: dict,
+    payloads: list,
+    severity: str = "low",
+    rule_version_id: int | None = None,
+) -> dict:
+    """
+    Evaluate one rule against many payloads at once.
+    Returns {"results": bool ndarray, "conditions": [CompiledCondition],
+    "condition_masks": [bool ndarray], "severity": string} where results[i]
+    matches evaluate_rule(logic, payloads[i])["result"] and condition_masks[k]
+    belongs to conditions[k]. Conditions are in trigger mask bit order
+    (groups in order, conditions in order); LogicBuilder ids are not unique
+    across groups, so they cannot key the masks.
+    """
+    if rule_version_id is not None:
+        compiled = get_compiled_rule(rule_version_id, logic)
+    else:
+        compiled = compile_rule_logic(logic)
+
+    n = len(payloads)
+    raw_columns = {}
+    numeric_columns = {}
+    flattened = []
+    condition_masks = []
+    results = np.full(n, bool(compiled.groups), dtype=bool)
+
+    for is_or, conditions in compiled.groups:
+        group_mask = np.zeros(n, dtype=bool) if is_or else np.ones(n, dtype=bool)
+        for condition in conditions:
+            field = condition.field
+            raw = raw_columns.get(field)
+            if raw is None:
+                get = condition.get
+                raw = raw_columns[field] = [get(p) for p in payloads]
+
+            def numeric(field=field, raw=raw):
+                column = numeric_columns.get(field)
+                if column is None:
+                    column = numeric_columns[field] = _numeric_column(raw)
+                return column
+
+            mask = _condition_mask(condition, raw, numeric)
+            flattened.append(condition)
+            condition_masks.append(mask)
+            group_mask = (group_mask | mask) if is_or else (group_mask & mask)
+        results &= group_mask
+
+    return {
+        "results": results,
+        "conditions": flattened,
+        "condition_masks": condition_masks,
+        "severity": severity,
+    }
@@ -0,0 +1,96 @@
+"""
+Per-rule-version evaluation counters kept in memory.
+
+Every evaluation of a rule version through the rule network or evaluate_rule
+records its outcome and wall time here: evaluations, triggers, errors (the
+exceptions evaluation swallows) and a fixed-bucket latency histogram. Updates
+are plain integer increments without a lock; a lost increment under
+contention is an acceptable price for staying off the hot path.
+
+Counters are per process and reset on restart. In process-pool mode
+(rule_pool) the stateless rules are timed inside the workers and are not
+reported here.
+"""
+from bisect import bisect_left
+
+# Upper bounds of the latency buckets in nanoseconds; the last bucket is open.
+BUCKETS_NS = (1_000, 2_500, 5_000, 10_000, 25_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 5_000_000)
+
+
+class RuleVersionMetrics:
+    __slots__ = ('rule_id', 'evaluations', 'triggers', 'errors', 'total_ns', 'max_ns', 'histogram')
+
+    def __init__(self, rule_id: int | None):
+        self.rule_id = rule_id
+        self.evaluations = 0
+        self.triggers = 0
+        self.errors = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.histogram = [0] * (len(BUCKETS_NS) + 1)
+
+    def quantile_ns(self, q: float) -> int | None:
+        """Upper bound of the bucket holding the q-th quantile (max_ns for the open bucket)."""
+        if not self.evaluations:
+            return None
+        rank = q * self.evaluations
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if seen >= rank and count:
+                return BUCKETS_NS[bucket] if bucket < len(BUCKETS_NS) else self.max_ns
+        return self.max_ns
+
+    def as_dict(self, rule_version_id: int) -> dict:
+        evaluations = self.evaluations
+        return {
+            "rule_id": self.rule_id,
+            "rule_version_id": rule_version_id,
+            "evaluations": evaluations,
+            "triggers": self.triggers,
+            "errors": self.errors,
+            "errorRate": round(self.errors / evaluations, 4) if evaluations else 0.0,
+            "avgUs": round(self.total_ns / evaluations / 1000, 2) if evaluations else None,
+            "p50Us": _us(self.quantile_ns(0.5)),
+            "p99Us": _us(self.quantile_ns(0.99)),
+            "maxUs": _us(self.max_ns) if evaluations else None,
+            "histogram": dict(zip([f"le_{b / 1000:g}us" for b in BUCKETS_NS] + ["inf"], self.histogram)),
+        }
+
+
+def _us(ns: int | None) -> float | None:
+    return None if ns is None else round(ns / 1000, 2)
+
+
+class RuleMetrics:
+    def __init__(self):
+        self._versions: dict[int, RuleVersionMetrics] = {}
+
+    def record(self, rule_version_id: int, rule_id: int | None, result: bool, elapsed_ns: int, error: bool = False) -> None:
+        metrics = self._versions.get(rule_version_id)
+        if metrics is None:
+            metrics = self._versions.setdefault(rule_version_id, RuleVersionMetrics(rule_id))
+        metrics.evaluations += 1
+        if result:
+            metrics.triggers += 1
+        if error:
+            metrics.errors += 1
+        metrics.total_ns += elapsed_ns
+        if elapsed_ns > metrics.max_ns:
+            metrics.max_ns = elapsed_ns
+        metrics.histogram[bisect_left(BUCKETS_NS, elapsed_ns)] += 1
+
+    def report(self, sort: str = "slowest", limit: int = 20) -> list[dict]:
+        """Rule versions ranked by p99 latency ("slowest") or error count ("errors")."""
+        rows = [m.as_dict(vid) for vid, m in list(self._versions.items())]
+        if sort == "errors":
+            rows.sort(key=lambda r: (r["errors"], r["errorRate"]), reverse=True)
+        else:
+            rows.sort(key=lambda r: (r["p99Us"] or 0, r["avgUs"] or 0), reverse=True)
+        return rows[:limit]
+
+    def reset(self) -> None:
+        self._versions = {}
+
+
+rule_metrics = RuleMetrics()
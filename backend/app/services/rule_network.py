@@ -0,0 +1,295 @@
+"""
+Shared-condition network over all active rule versions.
+
+Rules written in the LogicBuilder repeat the same atoms (`claim.amount greater
+5000`, `geo_distance greater 50`, ...). The network keeps one node per distinct
+(field, operator, value) condition and every active version refers to nodes by
+key, so evaluating a payload against the whole rule set tests each distinct
+condition at most once. Group AND/OR nodes combine the memoized results with
+the same short-circuiting as CompiledRule. Numeric threshold and equality
+nodes are answered from a ThresholdIndex with one bisect per field.
+
+The same pass records which conditions fired as a trigger mask per triggered
+rule (bit order as in rule_engine.condition_labels). Every condition of a
+triggered rule's AND groups held; OR groups short-circuit on the first
+satisfied condition, so once the rule has triggered the rest of each OR group
+is tested for the mask (mostly memo hits). Rules that did not trigger record
+an empty mask.
+
+Conditions inside a group are not necessarily tested in the order the author
+wrote them. A sample of evaluations is timed per condition node, and every
+REORDER_EVERY payloads each group is re-sorted by expected cost: AND groups put
+cheap, rarely-true conditions first, OR groups cheap, usually-true ones. AND and
+OR are commutative over side-effect free conditions, so results do not change;
+trigger mask bits stay tied to the authored position, and since masks hold
+every satisfied condition the bits set do not depend on the order either.
+
+The network is updated incrementally: create_rule_version adds the newly
+activated version and drops the one it replaced, delete_rule drops a rule's
+versions, and execute_rules syncs it against the active versions it loaded.
+Removing a version from the network also evicts its compiled evaluator.
+Condition nodes that read claim history (is_duplicate, within_time, count) or
+a reference list register it while they are in the network, so only active
+rules cause claims to be recorded or history to be warmed.
+"""
+import itertools
+import os
+import threading
+from collections import Counter
+from time import perf_counter_ns
+
+from .rule_engine import (
+    MAX_MASK_CONDITIONS,
+    condition_label,
+    get_compiled_rule,
+    debug_enabled,
+    evict_compiled_rules,
+    log_evaluation,
+    logger,
+    track_condition,
+    untrack_condition,
+)
+from .rule_metrics import rule_metrics
+from .threshold_index import ThresholdIndex
+
+# Time one payload in SAMPLE_EVERY; 0 disables sampling and reordering.
+SAMPLE_EVERY = int(os.getenv("RULE_ORDER_SAMPLE_EVERY", "32"))
+REORDER_EVERY = int(os.getenv("RULE_ORDER_REORDER_EVERY", "5000"))
+# Below this many timed evaluations a condition keeps its authored position.
+MIN_SAMPLES = 20
+
+
+class _Plan:
+    """Evaluation order of one rule version; shared by every state that holds the rule."""
+
+    __slots__ = ("authored", "groups")
+
+    def __init__(self, groups: tuple):
+        self.authored = groups
+        self.groups = groups
+
+
+def _rank(stats: list | None, is_or: bool) -> float:
+    """Expected cost per decisive outcome; lower ranks are tested first."""
+    if not stats or stats[0] < MIN_SAMPLES:
+        return float("inf")
+    samples, hits, cost = stats
+    decisive = hits / samples if is_or else 1 - hits / samples
+    return (cost / samples) / max(decisive, 1e-3)
+
+
+class RuleNetwork:
+    """
+    Copy-on-write network: writers rebuild the dicts under a lock and swap in a
+    new (rules, nodes, index) tuple, so evaluate() never sees a half-applied
+    update.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # rules: rule_version_id -> (rule_id, logic, _Plan of ((is_or, ((key, bit), ...)), ...))
+        # nodes: condition key -> representative CompiledCondition
+        self._state = ({}, {}, ThresholdIndex({}))
+        self._refs: Counter = Counter()
+        # condition key -> [timed evaluations, times true, total ns]
+        self._samples: dict[tuple, list[int]] = {}
+        self._counter = itertools.count(1)
+        self._reorder_lock = threading.Lock()
+
+    @property
+    def _rules(self) -> dict:
+        return self._state[0]
+
+    def _swap(self, rules: dict, nodes: dict) -> None:
+        self._state = (rules, nodes, ThresholdIndex(nodes))
+
+    def add_version(self, rule_version_id: int, rule_id: int, logic: dict) -> None:
+        compiled = get_compiled_rule(rule_version_id, logic)
+        groups = []
+        position = 0
+        for is_or, conditions in compiled.groups:
+            entries = []
+            for condition in conditions:
+                bit = 1 << position if position < MAX_MASK_CONDITIONS else 0
+                entries.append((condition.key, bit))
+                position += 1
+            groups.append((is_or, tuple(entries)))
+        groups = tuple(groups)
+        with self._lock:
+            if rule_version_id in self._rules:
+                return
+            rules, nodes = dict(self._state[0]), dict(self._state[1])
+            rules[rule_version_id] = (rule_id, logic, _Plan(groups))
+            for _, conditions in compiled.groups:
+                for condition in conditions:
+                    if condition.key not in nodes:
+                        nodes[condition.key] = condition
+                        track_condition(condition)
+                    self._refs[condition.key] += 1
+            self._swap(rules, nodes)
+
+    def remove_versions(self, rule_version_ids) -> None:
+        """Drop deactivated, replaced or deleted versions and their compiled evaluators."""
+        rule_version_ids = list(rule_version_ids)
+        evict_compiled_rules(rule_version_ids)
+        with self._lock:
+            stale = [vid for vid in rule_version_ids if vid in self._rules]
+            if not stale:
+                return
+            rules, nodes = dict(self._state[0]), dict(self._state[1])
+            for vid in stale:
+                _, _, plan = rules.pop(vid)
+                for _, entries in plan.authored:
+                    for key, _ in entries:
+                        self._refs[key] -= 1
+                        if self._refs[key] <= 0:
+                            del self._refs[key]
+                            untrack_condition(nodes.pop(key))
+                            self._samples.pop(key, None)
+            self._swap(rules, nodes)
+
+    def sync(self, versions) -> None:
+        """Bring the network in line with a list of active RuleVersion rows."""
+        active_ids = {v.id for v in versions}
+        stale = [vid for vid in self._rules if vid not in active_ids]
+        if stale:
+            self.remove_versions(stale)
+        for version in versions:
+            if version.id not in self._rules:
+                self.add_version(version.id, version.rule_id, version.logic_snapshot)
+
+    def snapshot(self) -> tuple:
+        """Current immutable state; pass it to evaluate() to pin a rule set across claims."""
+        return self._state
+
+    def evaluate(self, payload: dict, state: tuple | None = None, exclude=()) -> dict[int, tuple[bool, int]]:
+        """
+        Evaluate every rule in the network except the `exclude` version ids;
+        returns {rule_version_id: (result, trigger_mask)}.
+        """
+        rules, nodes, index = state or self._state
+        indexed = index.probe(payload)
+        memo = {}
+        results = {}
+        n = next(self._counter)
+        timed = SAMPLE_EVERY > 0 and n % SAMPLE_EVERY == 0
+        samples = self._samples
+        for vid, (rule_id, logic, plan) in rules.items():
+            if vid in exclude:
+                continue
+            groups = plan.groups
+            mask = 0
+            failed = False
+            rule_started = perf_counter_ns()
+            try:
+                result = bool(groups)
+                for is_or, entries in groups:
+                    group_result = not is_or
+                    for key, bit in entries:
+                        hit = memo.get(key)
+                        if hit is None:
+                            if timed:
+                                started = perf_counter_ns()
+                            if key in index:
+                                hit = memo[key] = indexed(key)
+                            else:
+                                hit = memo[key] = bool(nodes[key](payload))
+                            if timed:
+                                stats = samples.get(key)
+                                if stats is None:
+                                    stats = samples[key] = [0, 0, 0]
+                                stats[0] += 1
+                                stats[1] += hit
+                                stats[2] += perf_counter_ns() - started
+                        if hit:
+                            mask |= bit
+                        if hit is is_or:
+                            group_result = is_or
+                            break
+                    if not group_result:
+                        result = False
+                        break
+                if result:
+                    # Satisfied OR conditions after the one that decided the group
+                    for is_or, entries in groups:
+                        if is_or:
+                            for key, bit in entries:
+                                hit = memo.get(key)
+                                if hit is None:
+                                    hit = memo[key] = indexed(key) if key in index else bool(nodes[key](payload))
+                                if hit:
+                                    mask |= bit
+                else:
+                    mask = 0
+            except Exception as e:
+                logger.warning(
+                    "rule evaluation failed rule_id=%s rule_version_id=%s: %s",
+                    rule_id, vid, e,
+                    extra={"rule_id": rule_id, "rule_version_id": vid},
+                )
+                result = False
+                mask = 0
+                failed = True
+            rule_metrics.record(vid, rule_id, result, perf_counter_ns() - rule_started, failed)
+            if debug_enabled(rule_id):
+                log_evaluation(rule_id, vid, result, logic, payload)
+            results[vid] = (result, mask)
+        if SAMPLE_EVERY > 0 and REORDER_EVERY > 0 and n % REORDER_EVERY == 0:
+            self.reorder()
+        return results
+
+    def reorder(self) -> None:
+        """Re-sort every group by observed selectivity and cost, then decay the samples."""
+        if not self._reorder_lock.acquire(blocking=False):
+            return
+        try:
+            samples = self._samples
+            for _, _, plan in self._state[0].values():
+                plan.groups = tuple(
+                    (is_or, tuple(sorted(entries, key=lambda e: _rank(samples.get(e[0]), is_or))))
+                    for is_or, entries in plan.authored
+                )
+            # Halve the history so the order follows shifts in traffic.
+            for stats in list(samples.values()):
+                stats[0] //= 2
+                stats[1] //= 2
+                stats[2] //= 2
+        finally:
+            self._reorder_lock.release()
+
+    def plan(self, rule_version_id: int) -> list[dict] | None:
+        """Current evaluation order of a version's groups, with the samples behind it."""
+        rules, nodes, _ = self._state
+        entry = rules.get(rule_version_id)
+        if entry is None:
+            return None
+        authored = {
+            key: position
+            for position, (key, _) in enumerate(e for _, entries in entry[2].authored for e in entries)
+        }
+        groups = []
+        for is_or, entries in entry[2].groups:
+            conditions = []
+            for key, _ in entries:
+                samples, hits, cost = self._samples.get(key) or (0, 0, 0)
+                conditions.append({
+                    "condition": condition_label(nodes[key]),
+                    "authoredPosition": authored[key],
+                    "samples": samples,
+                    "passRate": round(hits / samples, 4) if samples else None,
+                    "avgCostNs": round(cost / samples) if samples else None,
+                })
+            groups.append({"operator": "OR" if is_or else "AND", "conditions": conditions})
+        return groups
+
+    def stats(self) -> dict:
+        rules, nodes, index = self._state
+        return {
+            "rules": len(rules),
+            "conditions": sum(len(entries) for _, _, plan in rules.values() for _, entries in plan.authored),
+            "distinctConditions": len(nodes),
+            "indexedConditions": len(index),
+        }
+
+
+network = RuleNetwork()
@@ -0,0 +1,182 @@
+"""
+Process-pool evaluation for large rule sets.
+
+Rule evaluation is pure Python, so one request thread uses one core no matter
+how many rules are active. With RULE_POOL_WORKERS > 0 the stateless active
+versions are sharded across that many worker processes; each worker builds its
+own RuleNetwork for its shard once per rule set and then only receives claims.
+Claims go out as one JSON document per call and results come back sparse:
+only versions that triggered (the only ones with a trigger mask) are returned.
+
+Versions with conditions that read in-process state (is_duplicate,
+within_time, count and reference-list contains) are always evaluated in the
+request process, in claim order, so duplicate/velocity/counter recording is
+unchanged. Below RULE_POOL_MIN_RULES stateless versions the pool is not used.
+Any worker failure falls back to in-process evaluation for that call.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from .reference_lists import list_name
+from .rule_engine import clear_compiled_rules, compile_rule_logic
+
+logger = logging.getLogger(__name__)
+
+POOL_WORKERS = int(os.getenv("RULE_POOL_WORKERS", "0"))
+POOL_MIN_RULES = int(os.getenv("RULE_POOL_MIN_RULES", "200"))
+
+STATEFUL_OPERATORS = frozenset({'is_duplicate', 'within_time', 'count'})
+
+
+def is_stateless(logic: dict) -> bool:
+    """True when every condition depends on the claim payload alone."""
+    for _, conditions in compile_rule_logic(logic).groups:
+        for condition in conditions:
+            if condition.operator in STATEFUL_OPERATORS:
+                return False
+            if condition.operator == 'contains' and list_name(condition.value):
+                return False
+    return True
+
+
+def _size(logic: dict) -> int:
+    return sum(len(group.get('conditions', [])) for group in logic.get('groups', [])) or 1
+
+
+class StaleShardError(RuntimeError):
+    """A worker was asked to evaluate against a rule set it no longer holds."""
+
+
+# --- Worker process side ---
+
+_worker_epoch = None
+_worker_network = None
+
+
+def _load_shard(epoch: int, versions: list) -> int:
+    """Replace this worker's network with the (rule_version_id, rule_id, logic) shard."""
+    global _worker_epoch, _worker_network
+    from .rule_network import RuleNetwork
+
+    clear_compiled_rules()
+    network = RuleNetwork()
+    for version_id, rule_id, logic in versions:
+        network.add_version(version_id, rule_id, logic)
+    _worker_network = network
+    _worker_epoch = epoch
+    return len(versions)
+
+
+def _evaluate_shard(epoch: int, claims: bytes) -> list:
+    """Evaluate a JSON array of claims; one sparse ((vid, result, mask), ...) tuple per claim."""
+    if epoch != _worker_epoch:
+        raise StaleShardError(f"worker holds rule set {_worker_epoch}, asked for {epoch}")
+    results = []
+    for payload in json.loads(claims):
+        outcomes = _worker_network.evaluate(payload)
+        results.append(tuple(
+            (vid, result, mask) for vid, (result, mask) in outcomes.items() if result
+        ))
+    return results
+
+
+# --- Request process side ---
+
+class RulePool:
+    """
+    One single-process executor per shard, so a shard's rules stay loaded in
+    the same worker between calls.
+    """
+
+    def __init__(self, workers: int = POOL_WORKERS, min_rules: int = POOL_MIN_RULES):
+        self.workers = workers
+        self.min_rules = min_rules
+        self._lock = threading.Lock()
+        self._executors: list[ProcessPoolExecutor] = []
+        self._versions = None
+        self._epoch = 0
+        self._pooled: frozenset = frozenset()
+
+    def _start(self) -> None:
+        context = multiprocessing.get_context("spawn")
+        self._executors = [
+            ProcessPoolExecutor(max_workers=1, mp_context=context) for _ in range(self.workers)
+        ]
+
+    def _prepare(self, rule_set) -> tuple[int, frozenset]:
+        """Load the rule set's stateless versions into the workers if it changed."""
+        with self._lock:
+            # Versions are immutable, so the same ids mean the same rules
+            if rule_set.versions == self._versions:
+                return self._epoch, self._pooled
+            rules = rule_set.state[0]
+            pooled = sorted(
+                (vid, rule_id, rules[vid][1])
+                for vid, rule_id in rule_set.versions
+                if vid in rules and is_stateless(rules[vid][1])
+            )
+            self._epoch += 1
+            self._versions = rule_set.versions
+            if len(pooled) < self.min_rules:
+                self._pooled = frozenset()
+                return self._epoch, self._pooled
+            if not self._executors:
+                self._start()
+            # Largest rules first onto the least loaded shard
+            shards = [[] for _ in self._executors]
+            loads = [0] * len(shards)
+            for version in sorted(pooled, key=lambda v: -_size(v[2])):
+                target = loads.index(min(loads))
+                shards[target].append(version)
+                loads[target] += _size(version[2])
+            futures = [
+                executor.submit(_load_shard, self._epoch, shard)
+                for executor, shard in zip(self._executors, shards)
+            ]
+            for future in futures:
+                future.result()
+            self._pooled = frozenset(vid for vid, _, _ in pooled)
+            return self._epoch, self._pooled
+
+    def evaluate(self, rule_set, payloads: list) -> tuple[frozenset, list[dict]] | None:
+        """
+        Evaluate the rule set's stateless versions for every payload in the
+        workers. Returns (pooled version ids, [{vid: (result, mask)}, ...]), or
+        None when the caller should evaluate everything in-process.
+        """
+        if self.workers <= 0 or not payloads:
+            return None
+        try:
+            epoch, pooled = self._prepare(rule_set)
+            if not pooled:
+                return None
+            claims = json.dumps(payloads, default=str).encode()
+            futures = [executor.submit(_evaluate_shard, epoch, claims) for executor in self._executors]
+            outcomes = [{} for _ in payloads]
+            for future in futures:
+                for merged, sparse in zip(outcomes, future.result()):
+                    for vid, result, mask in sparse:
+                        merged[vid] = (result, mask)
+            return pooled, outcomes
+        except StaleShardError:
+            # The rule set changed under this call; the next one reloads the workers
+            return None
+        except Exception as e:
+            logger.warning("process pool evaluation failed, evaluating in-process: %s", e)
+            self.shutdown()
+            return None
+
+    def shutdown(self) -> None:
+        with self._lock:
+            for executor in self._executors:
+                executor.shutdown(wait=False, cancel_futures=True)
+            self._executors = []
+            self._versions = None
+            self._pooled = frozenset()
+
+
+pool = RulePool()
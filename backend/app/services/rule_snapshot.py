@@ -0,0 +1,83 @@
+"""
+In-process snapshot of the active rule set.
+
+/execute used to reload every active RuleVersion and its logic_snapshot from
+Postgres on each request. The snapshot keeps the (rule_version_id, rule_id)
+pairs and the pinned rule network state in memory, tagged with a generation
+number. Writes that can change the active set (publishing or creating a
+version, rule status changes, deleting a rule) call bump_generation(); the
+next reader rebuilds the snapshot once and every other request reuses it
+without touching the database.
+
+Generations are per process. Other worker processes pick up changes after
+RULE_SET_SNAPSHOT_TTL seconds (default 30).
+"""
+import os
+import threading
+import time
+
+from .rule_network import network as rule_network
+
+SNAPSHOT_TTL = float(os.getenv("RULE_SET_SNAPSHOT_TTL", "30"))
+
+
+class ActiveRuleSet:
+    """Immutable view of the active rule versions at one generation."""
+    __slots__ = ('generation', 'versions', 'state', 'built_at')
+
+    def __init__(self, generation: int, versions: tuple, state: tuple):
+        self.generation = generation
+        # ((rule_version_id, rule_id), ...)
+        self.versions = versions
+        self.state = state
+        self.built_at = time.monotonic()
+
+    def evaluate(self, payload: dict, exclude=()) -> dict[int, tuple[bool, int]]:
+        return rule_network.evaluate(payload, self.state, exclude)
+
+    def is_current(self) -> bool:
+        return self.generation == _generation and time.monotonic() - self.built_at < SNAPSHOT_TTL
+
+
+_generation = 0
+_generation_lock = threading.Lock()
+_build_lock = threading.Lock()
+_snapshot: ActiveRuleSet | None = None
+
+
+def bump_generation() -> int:
+    """Invalidate the current snapshot; call after any change to the active rule set."""
+    global _generation
+    with _generation_lock:
+        _generation += 1
+        return _generation
+
+
+def current_generation() -> int:
+    return _generation
+
+
+def get_active_rule_set(load_versions) -> ActiveRuleSet:
+    """
+    Return the current snapshot, rebuilding it at most once per generation.
+    load_versions() must return the active RuleVersion rows.
+    """
+    global _snapshot
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.is_current():
+        return snapshot
+    with _build_lock:
+        # Another request may have rebuilt it while we waited
+        snapshot = _snapshot
+        if snapshot is not None and snapshot.is_current():
+            return snapshot
+        generation = _generation
+        active_versions = load_versions()
+        rule_network.sync(active_versions)
+        snapshot = ActiveRuleSet(
+            generation,
+            tuple((v.id, v.rule_id) for v in active_versions),
+            rule_network.snapshot(),
+        )
+        _snapshot = snapshot
+        return snapshot
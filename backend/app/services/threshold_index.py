@@ -0,0 +1,110 @@
+"""
+Sorted-threshold index for numeric comparison conditions.
+
+Most active rules are `greater` / `less` thresholds on a handful of fields. For
+each field the index keeps the distinct thresholds of every active condition in
+sorted arrays, so one bisect per (field, operator) decides all of them: for
+`greater` the satisfied conditions are a prefix of the array, for `less` a
+suffix. Numeric `equals` conditions become one hash lookup per field.
+
+Conditions whose values are not numeric (or NaN) are left to their compiled
+predicates.
+"""
+from bisect import bisect_left, bisect_right
+
+from .rule_engine import to_number
+
+INDEXED_OPERATORS = ('greater', 'less', 'equals')
+
+
+class _FieldIndex:
+    __slots__ = ('get', 'greater', 'greater_keys', 'less', 'less_keys', 'equals')
+
+    def __init__(self, get):
+        self.get = get
+        self.greater = []
+        self.greater_keys = []
+        self.less = []
+        self.less_keys = []
+        self.equals = {}
+
+    def cutoffs(self, payload):
+        """Return (greater_cutoff, less_cutoff, equal_keys) for the payload's field value."""
+        number = to_number(self.get(payload))
+        if number is None or number != number:
+            return (0, len(self.less), ())
+        return (
+            bisect_left(self.greater, number),
+            bisect_right(self.less, number),
+            self.equals.get(number, ()),
+        )
+
+
+class ThresholdIndex:
+    """Built from the network's condition nodes; rebuilt whenever they change."""
+
+    def __init__(self, nodes: dict):
+        self._fields: dict[str, _FieldIndex] = {}
+        # condition key -> (field, operator, rank in the sorted array)
+        self._entries: dict = {}
+
+        pending = {}
+        for key, condition in nodes.items():
+            if condition.operator not in INDEXED_OPERATORS:
+                continue
+            number = to_number(condition.value)
+            if number is None or number != number:
+                continue
+            pending.setdefault(condition.field, []).append((number, key, condition))
+
+        for field, items in pending.items():
+            index = self._fields[field] = _FieldIndex(items[0][2].get)
+            items.sort(key=lambda item: item[0])
+            for number, key, condition in items:
+                if condition.operator == 'greater':
+                    self._entries[key] = (field, 'greater', len(index.greater))
+                    index.greater.append(number)
+                    index.greater_keys.append(key)
+                elif condition.operator == 'less':
+                    self._entries[key] = (field, 'less', len(index.less))
+                    index.less.append(number)
+                    index.less_keys.append(key)
+                else:
+                    self._entries[key] = (field, 'equals', None)
+                    index.equals.setdefault(number, set()).add(key)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def probe(self, payload: dict):
+        """
+        Return a test(key) -> bool for indexed keys that bisects each field
+        at most once per payload.
+        """
+        fields, entries = self._fields, self._entries
+        cache = {}
+
+        def test(key) -> bool:
+            field, operator, rank = entries[key]
+            cut = cache.get(field)
+            if cut is None:
+                cut = cache[field] = fields[field].cutoffs(payload)
+            if operator == 'greater':
+                return rank < cut[0]
+            if operator == 'less':
+                return rank >= cut[1]
+            return key in cut[2]
+        return test
+
+    def satisfied(self, payload: dict) -> list:
+        """Every indexed condition key the payload satisfies."""
+        hits = []
+        for index in self._fields.values():
+            greater_cut, less_cut, equal_keys = index.cutoffs(payload)
+            hits.extend(index.greater_keys[:greater_cut])
+            hits.extend(index.less_keys[less_cut:])
+            hits.extend(equal_keys)
+        return hits
@@ -0,0 +1,147 @@
+"""
+Sliding-window velocity store backing the `within_time` operator.
+
+A `within_time` condition counts earlier claims carrying the same value of its
+field inside a time window, e.g. `{"field": "device.id", "operator":
+"within_time", "value": "3 in 24", "unit": "hours"}` fires when more than 3
+earlier claims from that device arrived in the last 24 hours. A bare number
+(`"value": 24`) fires on any earlier claim inside the window.
+
+Counts live in per-entity ring buffers of VELOCITY_BUCKETS time buckets with a
+running total, so reads and writes are O(1) and the window is exact to one
+bucket width. Each (field, window) keeps at most VELOCITY_MAX_ENTITIES
+entities, evicting the least recently seen. Windows exist while an active rule
+version in the rule network uses them. /execute records every scored claim;
+history for newly tracked windows is replayed from rule_executions by
+crud.warm_claim_indexes, which relies on /execute storing the timestamp it
+records a claim with as executed_at (see claim_history for the replay rules).
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from .claim_history import ClaimHistoryStore, HistoryEntry, value_key
+
+BUCKETS = int(os.getenv("VELOCITY_BUCKETS", "24"))
+MAX_ENTITIES = int(os.getenv("VELOCITY_MAX_ENTITIES", "100000"))
+
+UNIT_SECONDS = {
+    'second': 1, 'seconds': 1, 's': 1,
+    'minute': 60, 'minutes': 60, 'min': 60, 'm': 60,
+    'hour': 3600, 'hours': 3600, 'h': 3600,
+    'day': 86400, 'days': 86400, 'd': 86400,
+}
+
+_VALUE_RE = re.compile(r'^\s*(?:(\d+)\s+in\s+)?(\d+(?:\.\d+)?)\s*$')
+
+
+def parse_window(value, unit: str | None) -> tuple[int, float] | None:
+    """Parse a condition value into (more_than, window_seconds), or None if invalid."""
+    match = _VALUE_RE.match(str(value))
+    if not match:
+        return None
+    unit_seconds = UNIT_SECONDS.get((unit or 'hours').strip().lower())
+    if unit_seconds is None:
+        return None
+    seconds = float(match.group(2)) * unit_seconds
+    if seconds <= 0:
+        return None
+    return int(match.group(1) or 0), seconds
+
+
+class _Counter:
+    """Ring of per-bucket counts for one entity; `epoch` is the newest bucket index."""
+    __slots__ = ('counts', 'epoch', 'total')
+
+    def __init__(self, epoch: int):
+        self.counts = [0] * BUCKETS
+        self.epoch = epoch
+        self.total = 0
+
+    def advance(self, bucket: int) -> None:
+        gap = bucket - self.epoch
+        if gap <= 0:
+            return
+        if gap >= BUCKETS:
+            self.counts = [0] * BUCKETS
+            self.total = 0
+        else:
+            counts = self.counts
+            for i in range(1, gap + 1):
+                slot = (self.epoch + i) % BUCKETS
+                self.total -= counts[slot]
+                counts[slot] = 0
+        self.epoch = bucket
+
+
+class VelocityWindow(HistoryEntry):
+    """Counters for one (field, window) pair."""
+
+    def __init__(self, field: str, seconds: float, get):
+        super().__init__()
+        self.field = field
+        self.seconds = self.history_seconds = seconds
+        self.get = get
+        self.width = seconds / BUCKETS
+        self.entities: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    def count(self, value, now: float | None = None) -> int:
+        if value is None:
+            return 0
+        key = value_key(value)
+        bucket = int((now or time.time()) // self.width)
+        with self.lock:
+            counter = self.entities.get(key)
+            if counter is None:
+                return 0
+            counter.advance(bucket)
+            return counter.total
+
+    def add(self, value, timestamp: float) -> None:
+        if value is None:
+            return
+        key = value_key(value)
+        bucket = int(timestamp // self.width)
+        with self.lock:
+            counter = self.entities.get(key)
+            if counter is None:
+                counter = self.entities[key] = _Counter(bucket)
+                if len(self.entities) > MAX_ENTITIES:
+                    self.entities.popitem(last=False)
+            else:
+                self.entities.move_to_end(key)
+            if bucket < counter.epoch - BUCKETS + 1:
+                return  # older than the window
+            counter.advance(bucket)
+            counter.counts[bucket % BUCKETS] += 1
+            counter.total += 1
+
+    def add_claim(self, payload: dict, timestamp: float) -> None:
+        self.add(self.get(payload), timestamp)
+
+
+class VelocityStore(ClaimHistoryStore):
+    def track(self, field: str, seconds: float, get) -> VelocityWindow:
+        """Start counting claims per value of `field` over `seconds`. Calls nest."""
+        return self._track((field, seconds), lambda: VelocityWindow(field, seconds, get))
+
+    def untrack(self, field: str, seconds: float) -> None:
+        """Undo one track(); the window is dropped with the last one."""
+        self._untrack((field, seconds))
+
+    def count(self, field: str, seconds: float, value, now: float | None = None) -> int:
+        """Earlier claims with this value in the window; 0 while no active rule tracks it."""
+        window = self._entries.get((field, seconds))
+        return window.count(value, now) if window is not None else 0
+
+    def stats(self) -> dict:
+        return {
+            f"{window.field}/{int(window.seconds)}s": len(window.entities)
+            for window in self._entries.values()
+        }
+
+
+velocity_store = VelocityStore()
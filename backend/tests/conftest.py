@@ -0,0 +1,92 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Tests marked `postgres` run against TEST_DATABASE_URL, an empty database
+# whose tables they create, truncate after every test and drop at the end.
+# Without it (or when it cannot be reached) they are skipped.
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    # Before app.database builds its engine
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "postgres: needs the Postgres database in TEST_DATABASE_URL")
+
+
+def pytest_runtest_setup(item):
+    if item.get_closest_marker("postgres") and not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+
+
+@pytest.fixture(scope="session")
+def pg_engine():
+    from sqlalchemy.exc import OperationalError
+    from app import database, models
+
+    try:
+        with database.engine.connect():
+            pass
+    except OperationalError as e:
+        pytest.skip(f"Postgres is not reachable: {e}")
+    models.Base.metadata.drop_all(database.engine)
+    models.Base.metadata.create_all(database.engine)
+    yield database.engine
+    models.Base.metadata.drop_all(database.engine)
+
+
+@pytest.fixture
+def db(pg_engine):
+    from sqlalchemy import text
+    from app import database, models
+    from app.services import rule_snapshot
+    from app.services.rule_network import network
+
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        # Rules activated by the test leave the shared network, with the claim history they tracked
+        network.remove_versions(list(network.snapshot()[0]))
+        rule_snapshot.bump_generation()
+        tables = ", ".join(table.name for table in models.Base.metadata.sorted_tables)
+        with pg_engine.begin() as conn:
+            conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+
+
+@pytest.fixture
+def client(db):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    # Without the context manager startup hooks (rule set preload, rollup fold loop) do not run
+    return TestClient(app)
+
+
+@pytest.fixture
+def make_rule(db):
+    """Create a rule with an active v1.0 version through crud, as POST /api/rules/ does."""
+    from app import crud, schemas
+
+    def make_rule(rule_id: str, conditions: list, logic_operator: str = "IF", **fields):
+        rule = schemas.RuleCreate(
+            rule_id=rule_id,
+            name=fields.pop("name", rule_id),
+            category=fields.pop("category", "transaction"),
+            severity=fields.pop("severity", "high"),
+            status=fields.pop("status", "active"),
+            logic={"groups": [{
+                "id": "1",
+                "logicOperator": logic_operator,
+                "conditions": [{"id": str(i), **c} for i, c in enumerate(conditions)],
+            }]},
+            **fields,
+        )
+        return crud.create_rule(db, rule, None)
+
+    return make_rule
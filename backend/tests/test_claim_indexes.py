@@ -0,0 +1,272 @@
+"""In-memory claim history: Bloom/exact duplicate index and velocity ring buffers."""
+import random
+
+import pytest
+
+from app.services import duplicate_index as duplicate_module, velocity
+from app.services.duplicate_index import BloomFilter, DuplicateIndex
+from app.services.velocity import VelocityWindow, parse_window
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    values = [f"value-{i}" for i in range(1000)]
+    for value in values:
+        bloom.add(value)
+    assert all(value in bloom for value in values)
+    false_positives = sum(f"other-{i}" in bloom for i in range(10_000))
+    assert false_positives < 300
+
+
+def test_duplicate_index_exact_then_bloom(monkeypatch):
+    monkeypatch.setattr(duplicate_module, 'EXACT_LIMIT', 10)
+    monkeypatch.setattr(duplicate_module, 'BLOOM_CAPACITY', 1000)
+    index = DuplicateIndex()
+    index.track('doc', lambda payload: payload.get('doc'))
+    for i in range(10):
+        index.record({'doc': f"h{i}"})
+    assert index.seen('doc', 'h3')
+    assert not index.seen('doc', 'h10')
+    assert not index.seen('doc', None)
+    assert not index.seen('other', 'h3')
+
+    for i in range(10, 50):
+        index.record({'doc': f"h{i}"})
+    assert index.stats()['doc'] == {'exact': 10, 'saturated': True}
+    assert all(index.seen('doc', f"h{i}") for i in range(50))
+
+
+def test_parse_window():
+    assert parse_window('3 in 24', 'hours') == (3, 86400)
+    assert parse_window(30, 'minutes') == (0, 1800)
+    assert parse_window('abc', 'hours') is None
+    assert parse_window(5, 'fortnights') is None
+    assert parse_window(0, 'hours') is None
+
+
+def test_velocity_window_matches_brute_force(monkeypatch):
+    monkeypatch.setattr(velocity, 'BUCKETS', 24)
+    rng = random.Random(6)
+    seconds = 24 * 3600.0
+    window = VelocityWindow('device', seconds, lambda payload: payload['device'])
+    width = seconds / 24
+    events = []
+    now = 1_700_000_000.0
+    for _ in range(3000):
+        now += rng.expovariate(1 / 600)
+        device = rng.choice(['a', 'b', 'c'])
+        window.add(device, now)
+        events.append((now, device))
+        probe = rng.choice(['a', 'b', 'c', 'd'])
+        # Exact to one bucket: the window covers the current and BUCKETS - 1 previous buckets
+        oldest_bucket = int(now // width) - 23
+        expected = sum(1 for t, d in events if d == probe and int(t // width) >= oldest_bucket)
+        assert window.count(probe, now) == expected
+
+
+def test_history_is_tracked_only_for_versions_in_the_network():
+    from app.services.duplicate_index import duplicate_index
+    from app.services.entity_counters import entity_counters
+    from app.services.rule_engine import condition_labels, compile_rule_logic
+    from app.services.rule_network import RuleNetwork
+    from app.services.velocity import velocity_store
+
+    logic = {'groups': [{'logicOperator': 'AND', 'conditions': [
+        {'field': 'tracking.doc', 'operator': 'is_duplicate', 'value': ''},
+        {'field': 'tracking.device', 'operator': 'within_time', 'value': '2 in 1', 'unit': 'hours'},
+        {'field': 'tracking.device', 'operator': 'count', 'value': 'sum(amount) >= 10'},
+    ]}]}
+    compile_rule_logic(logic)
+    condition_labels(logic)
+    assert 'tracking.doc' not in duplicate_index.stats()
+    assert 'tracking.device/3600s' not in velocity_store.stats()
+
+    network = RuleNetwork()
+    network.add_version(800_001, 1, logic)
+    network.add_version(800_002, 2, logic)
+    assert 'tracking.doc' in duplicate_index.stats()
+    assert 'tracking.device/3600s' in velocity_store.stats()
+    assert 'sum(amount) by tracking.device' in entity_counters.stats()
+
+    network.remove_versions([800_001])
+    assert 'tracking.doc' in duplicate_index.stats()
+    network.remove_versions([800_002])
+    assert 'tracking.doc' not in duplicate_index.stats()
+    assert 'tracking.device/3600s' not in velocity_store.stats()
+    assert 'sum(amount) by tracking.device' not in entity_counters.stats()
+
+
+def test_velocity_replay_does_not_double_count_live_claims():
+    from app.services.velocity import VelocityStore
+
+    store = VelocityStore()
+    window = store.track('device', 3600.0, lambda payload: payload['device'])
+    live_since = window.live_since
+    old = (live_since - 60, {'device': 'a'})
+    in_flight = (live_since - 1, {'device': 'a'})
+    live = (live_since + 1, {'device': 'a'})
+    # Scored before the window went live but recorded after: left to the replay
+    store.record(in_flight[1], in_flight[0])
+    store.record(live[1], live[0])
+    assert store.has_pending()
+    # The replay sees every committed claim, including the live one
+    store.load_history([old, in_flight, live])
+    assert not store.has_pending()
+    assert store.count('device', 3600.0, 'a', live_since + 2) == 3
+    assert store.count('device', 60.0, 'a') == 0
+
+
+def test_entity_counter_replay_does_not_double_count_live_claims():
+    from app.services.entity_counters import EntityCounters
+
+    counters = EntityCounters()
+    aggregate = counters.track('ip', 'sum', 'amount', lambda p: p.get('ip'), lambda p: p.get('amount'))
+    live_since = aggregate.live_since
+    live = (live_since + 1, {'ip': 'x', 'amount': 10})
+    counters.record(live[1], live[0])
+    counters.load_history([(live_since - 100, {'ip': 'x', 'amount': 5}), live])
+    assert counters.value('ip', 'sum', 'amount', 'x') == 15
+    since, until = counters.pending_range()
+    assert (since, until) == (0.0, 0.0)
+
+
+def test_entry_tracked_again_during_replay_stays_pending():
+    from app.services.velocity import VelocityStore
+
+    store = VelocityStore()
+    get = lambda payload: payload['device']
+    first = store.track('device', 60.0, get)
+
+    def claims():
+        # The last rule using the window left and a new one brought it back mid-replay
+        store.untrack('device', 60.0)
+        store.track('device', 60.0, get)
+        yield first.live_since - 1, {'device': 'a'}
+
+    assert store.load_history(claims()) == 1
+    assert store.has_pending()
+    store.load_history([(first.live_since - 1, {'device': 'a'})])
+    assert not store.has_pending()
+
+
+def test_concurrent_warm_up_loads_history_once(monkeypatch):
+    import threading
+    import time
+    from app import crud
+    from app.services.duplicate_index import duplicate_index
+
+    loads = []
+
+    def slow_payloads(db):
+        loads.append(1)
+        # Requests arriving while the history streams still see the field pending
+        assert duplicate_index.has_pending()
+        time.sleep(0.2)
+        yield {'warm': {'doc': 'h1'}}
+
+    monkeypatch.setattr(crud, 'iter_execution_payloads', slow_payloads)
+    duplicate_index.track('warm.doc', lambda p: (p.get('warm') or {}).get('doc'))
+    try:
+        barrier = threading.Barrier(4)
+        seen = []
+
+        def request():
+            barrier.wait()
+            crud.warm_claim_indexes(None)
+            seen.append(duplicate_index.seen('warm.doc', 'h1'))
+
+        threads = [threading.Thread(target=request) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert loads == [1]
+        # Nobody went on with a half-loaded index
+        assert seen == [True] * 4
+        assert not duplicate_index.has_pending()
+    finally:
+        duplicate_index.untrack('warm.doc')
+
+
+@pytest.mark.postgres
+def test_duplicate_of_a_claim_scored_before_activation(client, db, make_rule):
+    from app.core.query_tracking import query_budget
+
+    make_rule("RL-ANY", [{"field": "claim.amount", "operator": "greater", "value": 0}])
+    client.post("/api/rules/execute", json={"claim": {"amount": 1}, "document": {"hash": "H1"}})
+
+    dup = make_rule("RL-DUP", [{"field": "document.hash", "operator": "is_duplicate", "value": ""}])
+    with query_budget(10) as stats:
+        triggered = client.post("/api/rules/execute", json={"claim": {"amount": 2}, "document": {"hash": "H1"}}).json()
+    assert dup.id in {r["rule_id"] for r in triggered}
+    # History was loaded when the rule was activated, not by the claim
+    assert not any("FROM execution_payloads" in sql for sql in stats.statements)
+
+    triggered = client.post("/api/rules/execute", json={"claim": {"amount": 3}, "document": {"hash": "H2"}}).json()
+    assert dup.id not in {r["rule_id"] for r in triggered}
+
+
+@pytest.mark.postgres
+def test_replay_counts_each_claim_once(client, db, make_rule):
+    from datetime import datetime, timedelta
+
+    from app import crud
+    from app.services.velocity import velocity_store
+
+    rules = [make_rule(f"RL-{i}", [{"field": "claim.amount", "operator": "greater", "value": i}]) for i in range(3)]
+    # Rows logged one transaction per rule before claims carried a claim_uid
+    start = datetime.now().astimezone() - timedelta(minutes=30)
+    legacy = []
+    for claim_at, device in [(start, "d1"), (start + timedelta(minutes=1), "d2"), (start + timedelta(minutes=2), "d1")]:
+        for n, rule in enumerate(rules):
+            legacy.append({
+                "rule_id": rule.id,
+                "input_payload": {"claim": {"amount": 5}, "device": device},
+                "execution_result": False,
+                "executed_at": claim_at + timedelta(milliseconds=150 * n),
+            })
+    crud.create_execution_logs(db, legacy)
+    # The same claim twice in one batch chunk
+    claims = [{"claim": {"amount": 5}, "device": "d1"}, {"claim": {"amount": 5}, "device": "d1"}, {"claim": {"amount": 5}, "device": "d3"}]
+    assert client.post("/api/rules/execute/batch", json=claims).status_code == 200
+
+    replayed = [payload["device"] for _, payload in crud.iter_recent_claims(db)]
+    assert sorted(replayed) == ["d1", "d1", "d1", "d1", "d2", "d3"]
+
+    # Activating a velocity rule replays that history into its window
+    make_rule("RL-VEL", [{"field": "device", "operator": "within_time", "value": "3 in 1", "unit": "hours"}])
+    assert velocity_store.count("device", 3600.0, "d1") == 4
+    assert velocity_store.count("device", 3600.0, "d2") == 1
+
+
+@pytest.mark.postgres
+def test_entity_aggregates_warm_once_per_claim(client, db, make_rule):
+    from datetime import datetime, timedelta
+
+    from app import crud
+    from app.services.entity_counters import entity_counters
+
+    rules = [make_rule(f"RL-{i}", [{"field": "claim.amount", "operator": "greater", "value": i}]) for i in range(4)]
+    # Legacy per-rule rows spread over the counters' history, one claim from an old device each
+    now = datetime.now().astimezone()
+    legacy = []
+    for days, (amount, device) in enumerate([(100, "a"), (250, "b"), (100, "a")]):
+        claim_at = now - timedelta(days=10 * days + 1)
+        legacy += [{
+            "rule_id": rule.id,
+            "input_payload": {"ip": "10.0.0.1", "claim": {"amount": amount}, "device": device},
+            "execution_result": False,
+            "executed_at": claim_at + timedelta(milliseconds=200 * n),
+        } for n, rule in enumerate(rules)]
+    crud.create_execution_logs(db, legacy)
+    claim = {"ip": "10.0.0.1", "claim": {"amount": 50}, "device": "c"}
+    assert client.post("/api/rules/execute/batch", json=[claim, claim]).status_code == 200
+
+    make_rule("RL-AGG", [
+        {"field": "ip", "operator": "count", "value": 100},
+        {"field": "ip", "operator": "count", "value": "sum(claim.amount) >= 100000"},
+        {"field": "ip", "operator": "count", "value": "distinct(device) >= 100"},
+    ])
+    assert entity_counters.value("ip", "count", None, "10.0.0.1") == 5
+    assert entity_counters.value("ip", "sum", "claim.amount", "10.0.0.1") == 100 + 250 + 100 + 50 + 50
+    assert entity_counters.value("ip", "distinct", "device", "10.0.0.1") == 3
@@ -0,0 +1,79 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import Column, DateTime, Float, Integer, MetaData, Table, create_engine, insert, select
+
+from app.crud import CLAIM_SORTS, _after_cursor, decode_claims_cursor, encode_claims_cursor
+
+
+def test_cursor_round_trip():
+    executed_at = datetime(2026, 3, 1, 12, 30, 15, 250, tzinfo=timezone.utc)
+    assert decode_claims_cursor(encode_claims_cursor('date_desc', executed_at, 42), 'date_desc') == (executed_at, 42)
+    assert decode_claims_cursor(encode_claims_cursor('amount_asc', 1250.5, 7), 'amount_asc') == (1250.5, 7)
+    assert decode_claims_cursor(encode_claims_cursor('amount_desc', None, 9), 'amount_desc') == (None, 9)
+
+
+@pytest.mark.parametrize('cursor, sort', [
+    ('not base64!', 'date_desc'),
+    ('e30', 'date_desc'),  # {}
+    (encode_claims_cursor('date_desc', datetime(2026, 1, 1), 1), 'date_asc'),
+    (encode_claims_cursor('date_desc', None, 1), 'date_desc'),
+    (encode_claims_cursor('date_desc', 'yesterday', 1), 'date_desc'),
+])
+def test_invalid_cursor(cursor, sort):
+    with pytest.raises(ValueError):
+        decode_claims_cursor(cursor, sort)
+
+
+def _postgres_order(rows, descending):
+    """id order of ORDER BY value, id on Postgres: NULLs first descending, last ascending."""
+    nulls = sorted((r for r in rows if r[1] is None), key=lambda r: r[0], reverse=descending)
+    values = sorted((r for r in rows if r[1] is not None), key=lambda r: (r[1], r[0]), reverse=descending)
+    ordered = nulls + values if descending else values + nulls
+    return [r[0] for r in ordered]
+
+
+@pytest.mark.parametrize('sort', sorted(CLAIM_SORTS))
+def test_keyset_pages_cover_every_row_once(sort):
+    column_name, descending = CLAIM_SORTS[sort]
+    nullable = column_name == 'amount'
+    table = Table(
+        'claims', MetaData(),
+        Column('id', Integer, primary_key=True),
+        Column('executed_at', DateTime),
+        Column('amount', Float),
+    )
+    engine = create_engine('sqlite://')
+    table.create(engine)
+    rnd = random.Random(sort)
+    start = datetime(2026, 1, 1)
+    rows = []
+    for row_id in range(1, 201):
+        # Few distinct values so ties are broken by id, a third of amounts NULL
+        amount = None if rnd.random() < 0.3 else float(rnd.randint(1, 8) * 100)
+        rows.append((row_id, start + timedelta(hours=rnd.randint(0, 9)), amount))
+    with engine.begin() as conn:
+        conn.execute(insert(table), [dict(id=i, executed_at=e, amount=a) for i, e, a in rows])
+
+    column = table.c[column_name]
+    order = (column.desc(), table.c.id.desc()) if descending else (column.asc(), table.c.id.asc())
+    position = {'executed_at': 1, 'amount': 2}[column_name]
+    expected = _postgres_order([(r[0], r[position]) for r in rows], descending)
+
+    page_size = 7
+    # The first page is a plain ORDER BY on Postgres; SQLite places NULLs the other way round
+    seen = expected[:page_size]
+    with engine.connect() as conn:
+        while True:
+            last = conn.execute(select(table).where(table.c.id == seen[-1])).one()
+            value, row_id = decode_claims_cursor(encode_claims_cursor(sort, last[position], last.id), sort)
+            page = []
+            for after in _after_cursor(column, table.c.id, value, row_id, descending, nullable):
+                page += conn.execute(select(table.c.id).where(after).order_by(*order).limit(page_size - len(page))).scalars().all()
+                if len(page) == page_size:
+                    break
+            if not page:
+                break
+            seen += page
+    assert seen == expected
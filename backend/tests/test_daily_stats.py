@@ -0,0 +1,124 @@
+"""Daily rollups against counts over the raw execution rows they summarise."""
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Date, cast, func
+
+from app import crud, models
+
+pytestmark = pytest.mark.postgres
+
+COLUMNS = ("rule_id", "rule_version_id", "day", *crud.DAILY_STAT_COUNTS, "last_executed_at")
+
+
+def _rollup(db):
+    stats = models.RuleDailyStat
+    return {
+        (r.rule_id, r.rule_version_id, r.day): tuple(getattr(r, c) for c in COLUMNS)
+        for r in db.query(stats)
+    }
+
+
+def _raw_counts(db):
+    """The rollup computed here from rule_executions, with the database's date of each row."""
+    log = models.RuleExecutionLog
+    rows = db.query(log, cast(log.executed_at, Date)).all()
+    counts, last = {}, {}
+    for r, day in rows:
+        key = (r.rule_id, r.rule_version_id or 0, day)
+        c = counts.setdefault(key, Counter())
+        decision = r.decision.value if r.decision else "pending"
+        c["total"] += 1
+        if decision != "pending":
+            c[decision] += 1
+        if r.execution_result:
+            c["flagged"] += 1
+            c[f"flagged_{decision}"] += 1
+            c[f"flagged_{r.severity.value}"] += 1
+        last[key] = max(last.get(key, r.executed_at), r.executed_at)
+    return {
+        key: (*key, *(c[n] for n in crud.DAILY_STAT_COUNTS), last[key])
+        for key, c in counts.items()
+    }
+
+
+@pytest.fixture
+def scored(db, make_rule):
+    rng = random.Random(22)
+    rules = [make_rule(f"RL-{i}", [{"field": "x", "operator": "equals", "value": i}]) for i in range(2)]
+    versions = {v.rule_id: v.id for v in crud.get_active_rule_versions(db)}
+    now = datetime.now().astimezone()
+    logs = []
+    for n in range(300):
+        rule = rng.choice(rules)
+        flagged = rng.random() < 0.5
+        row = {
+            "rule_id": rule.id,
+            "rule_version_id": rng.choice([versions[rule.id], None]),
+            "input_payload": {"n": n},
+            "execution_result": flagged,
+            "severity": rng.choice(["high", "medium", "low"]),
+            "decision": rng.choice(["pending", "pending", "fraud", "legitimate"]),
+        }
+        # Most rows from the last 40 days, some written now with the column default
+        if n % 10:
+            row["executed_at"] = now - timedelta(days=rng.randint(0, 40), minutes=rng.randint(0, 1439))
+        logs.append(row)
+    # One request's worth at a time, as /execute and /execute/batch write them
+    for start in range(0, len(logs), 50):
+        crud.create_execution_logs(db, logs[start:start + 50])
+
+    ids = [i for (i,) in db.query(models.RuleExecutionLog.id).order_by(models.RuleExecutionLog.id)]
+    for exec_id in rng.sample(ids, 80):
+        crud.update_execution_decision(db, exec_id, rng.choice(["pending", "fraud", "legitimate"]))
+    return rules
+
+
+def test_folded_rollups_match_raw_rows(db, scored):
+    crud.fold_daily_stats(db)
+    assert db.query(models.RuleDailyStatDelta).count() == 0
+    folded = _rollup(db)
+    assert folded == _raw_counts(db)
+    # Rows more than 30 days old make the rollup span more than the page window
+    assert len({day for _, _, day in folded}) > 30
+
+    crud.rebuild_daily_stats(db)
+    assert _rollup(db) == folded
+
+
+@pytest.mark.parametrize("folded", [False, True])
+def test_performance_summary_matches_raw_rows(client, db, scored, folded):
+    rule_id = scored[0].id
+    if folded:
+        # Rollup rows and deltas written after the fold, both read
+        crud.fold_daily_stats(db)
+        ids = [i for (i,) in db.query(models.RuleExecutionLog.id).filter(models.RuleExecutionLog.rule_id == rule_id)]
+        for exec_id in ids[:20]:
+            crud.update_execution_decision(db, exec_id, "fraud")
+    deltas = db.query(models.RuleDailyStatDelta).count()
+    response = client.get(f"/api/rules/{rule_id}/performance", params={"days": 30})
+    body = response.json()
+    # Reads leave folding to the background thread
+    assert db.query(models.RuleDailyStatDelta).count() == deltas > 0
+
+    log = models.RuleExecutionLog
+    day = cast(log.executed_at, Date)
+    today = db.query(func.current_date()).scalar()
+    rows = db.query(log, day).filter(log.rule_id == rule_id, day > today - timedelta(days=30)).all()
+    flagged = [r for r, _ in rows if r.execution_result]
+    decisions = Counter(r.decision.value for r, _ in rows)
+    assert body["kpis"]["totalClaimsEvaluated"] == len(rows)
+    assert body["kpis"]["flagsTriggered"] == len(flagged)
+    assert body["kpis"]["confirmedFraud"] == decisions["fraud"]
+    last = db.query(func.max(log.executed_at)).filter(log.rule_id == rule_id).scalar()
+    assert datetime.fromisoformat(body["kpis"]["lastEvaluated"]) == last
+    assert body["severity"] == {s: sum(r.severity.value == s for r in flagged) for s in ("high", "medium", "low")}
+    assert body["decisions"] == {d: sum(r.decision.value == d for r in flagged) for d in ("fraud", "legitimate", "pending")}
+
+    trends = body["trends"]
+    assert len(trends) == 30
+    assert trends[-1]["day"] == today.isoformat()[5:]
+    per_day = Counter(d for _, d in rows)
+    assert [t["totalClaims"] for t in trends] == [per_day[today - timedelta(days=29 - i)] for i in range(30)]
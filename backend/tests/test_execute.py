@@ -0,0 +1,73 @@
+"""/execute and /execute/batch against Postgres: rows written, statements issued, results returned."""
+import json
+
+import pytest
+
+from app import models
+from app.core.query_tracking import query_budget
+
+pytestmark = pytest.mark.postgres
+
+CLAIM = {"claim_id": "CLM-1", "claim": {"amount": 7500}, "geo_distance": 20}
+
+
+def _statements(stats, prefix: str) -> int:
+    return sum(n for sql, n in stats.statements.items() if sql.lstrip().startswith(prefix))
+
+
+def test_execute_writes_all_rows_with_one_insert(client, db, make_rule):
+    for i in range(5):
+        make_rule(f"RL-{i}", [{"field": "claim.amount", "operator": "greater", "value": 1000 * (i + 5)}])
+
+    # Active versions (creating rules invalidated the snapshot), then one INSERT each
+    # for payloads, executions, rollup deltas and the audit entry, whatever the rule count
+    with query_budget(5) as stats:
+        response = client.post("/api/rules/execute", json=CLAIM)
+    assert response.status_code == 200
+    assert sorted(r["rule_id"] for r in response.json()) == [1, 2, 3]
+
+    assert _statements(stats, "INSERT INTO rule_executions") == 1
+    rows = db.query(models.RuleExecutionLog).order_by(models.RuleExecutionLog.rule_id).all()
+    assert [r.execution_result for r in rows] == [True, True, True, False, False]
+    assert len({r.executed_at for r in rows}) == 1
+    audit = db.query(models.AuditLog).filter(models.AuditLog.action == models.AuditAction.executed_rule).one()
+    assert audit.details == {"total_active_rules": 5, "triggered": 3}
+
+
+def test_execute_batch_streams_one_line_per_claim(client, db, make_rule, monkeypatch):
+    from app.routers import rules as rules_router
+    monkeypatch.setattr(rules_router, "EXECUTE_BATCH_CHUNK", 2)
+    make_rule("RL-BIG", [{"field": "claim.amount", "operator": "greater", "value": 5000}])
+
+    body = "\n".join([
+        '{"claim_id": "A", "claim": {"amount": 9000}}',
+        '{"claim_id": "B", "claim": {"amount": 10}}',
+        "",
+        "not json",
+        "[1, 2]",
+        '{"claim_id": "C", "claim": {"amount": 6000}}',
+    ])
+    response = client.post("/api/rules/execute/batch", content=body, headers={"content-type": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["index"] for line in lines] == [0, 1, 2, 3, 4]
+    assert [line.get("claim_id") for line in lines] == ["A", "B", None, None, "C"]
+    assert [len(line.get("triggered", [])) for line in lines] == [1, 0, 0, 0, 1]
+    assert lines[2]["error"].startswith("Invalid JSON")
+    assert lines[3]["error"] == "Claim must be a JSON object"
+
+    flagged = db.query(models.RuleExecutionLog.execution_result).order_by(models.RuleExecutionLog.id).all()
+    assert [f for (f,) in flagged] == [True, False, True]
+    audit = db.query(models.AuditLog).filter(models.AuditLog.action == models.AuditAction.executed_rule).one()
+    assert audit.details == {"total_active_rules": 1, "claims": 5, "triggered": 2, "batch": True}
+
+
+def test_execute_batch_accepts_a_json_array(client, db, make_rule):
+    make_rule("RL-BIG", [{"field": "claim.amount", "operator": "greater", "value": 5000}])
+    response = client.post("/api/rules/execute/batch", json=[{"claim": {"amount": 9000}}, {"claim": {"amount": 1}}])
+    assert [len(json.loads(line)["triggered"]) for line in response.text.splitlines()] == [1, 0]
+
+    assert client.post("/api/rules/execute/batch", json={"claim": {}}).status_code == 400
+    assert client.post("/api/rules/execute/batch", content="{oops", headers={"content-type": "application/json"}).status_code == 400
+    assert db.query(models.RuleExecutionLog).count() == 2
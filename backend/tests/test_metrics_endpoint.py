@@ -0,0 +1,57 @@
+"""Prometheus text exposition of the in-process registry."""
+from fastapi.testclient import TestClient
+
+from app.core.metrics import Counter, Gauge, Histogram, Registry
+from app.main import app
+
+
+def test_registry_renders_text_format():
+    registry = Registry()
+    counter = registry.register(Counter("jobs_total", "Jobs run.", ("queue",)))
+    histogram = registry.register(Histogram("job_seconds", "Job time.", ("queue",), buckets=(0.1, 1.0)))
+    registry.register(Gauge("workers", "Live workers.", function=lambda: 3))
+    counter.inc(2, 'say "hi"\n')
+    for value in (0.05, 0.5, 0.5, 7):
+        histogram.observe(value, "a")
+
+    lines = registry.render().splitlines()
+    assert lines[:3] == [
+        "# HELP jobs_total Jobs run.",
+        "# TYPE jobs_total counter",
+        'jobs_total{queue="say \\"hi\\"\\n"} 2',
+    ]
+    assert lines[5:10] == [
+        'job_seconds_bucket{queue="a",le="0.1"} 1',
+        'job_seconds_bucket{queue="a",le="1.0"} 3',
+        'job_seconds_bucket{queue="a",le="+Inf"} 4',
+        'job_seconds_sum{queue="a"} 8.05',
+        'job_seconds_count{queue="a"} 4',
+    ]
+    assert lines[-1] == "workers 3"
+
+
+def _sample(text: str, prefix: str) -> float:
+    values = [float(line.rsplit(" ", 1)[1]) for line in text.splitlines() if line.startswith(prefix)]
+    return values[0] if values else 0.0
+
+
+def test_metrics_endpoint_labels_requests_by_route_template():
+    client = TestClient(app)
+    before = client.get("/metrics").text
+    client.get("/")
+    client.get("/no/such/path")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    for prefix, delta in [
+        ('http_requests_total{method="GET",route="/",status="200"}', 1),
+        ('http_requests_total{method="GET",route="unmatched",status="404"}', 1),
+        ('http_request_duration_seconds_count{method="GET",route="/"}', 1),
+        ('http_requests_total{method="GET",route="/metrics",status="200"}', 1),
+    ]:
+        assert _sample(text, prefix) - _sample(before, prefix) == delta, prefix
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/",le="+Inf"}' in text
+    assert "# TYPE db_queries_per_request histogram" in text
+    assert "# TYPE rule_execution_claims_total counter" in text
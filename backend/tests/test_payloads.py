@@ -0,0 +1,48 @@
+"""Claim payloads stored once per content hash."""
+import pytest
+
+from app import crud, models
+from app.crud import payload_hash
+
+
+def test_payload_hash_is_canonical():
+    a = {"claim": {"amount": 10, "id": "X"}, "device": "d1"}
+    b = {"device": "d1", "claim": {"id": "X", "amount": 10}}
+    assert payload_hash(a) == payload_hash(b)
+    assert len(payload_hash(a)) == 64
+    assert payload_hash(a) != payload_hash({**a, "device": "d2"})
+    assert payload_hash({"n": 1}) != payload_hash({"n": "1"})
+
+
+@pytest.mark.postgres
+def test_each_distinct_payload_is_stored_once(client, db, make_rule):
+    make_rule("RL-1", [{"field": "claim.amount", "operator": "greater", "value": 5}])
+    make_rule("RL-2", [{"field": "claim.amount", "operator": "less", "value": 5}])
+    claim = {"claim_id": "CLM-9", "claim": {"amount": 10}}
+    client.post("/api/rules/execute", json=claim)
+    # The same claim with its keys in another order
+    client.post("/api/rules/execute", json={"claim": {"amount": 10}, "claim_id": "CLM-9"})
+
+    rows = db.query(models.RuleExecutionLog).all()
+    assert len(rows) == 4
+    assert {r.payload_hash for r in rows} == {payload_hash(claim)}
+    stored = db.query(models.ExecutionPayload).one()
+    assert stored.payload == claim
+    assert crud.get_execution_by_id(db, rows[0].id)["inputPayload"] == claim
+
+
+@pytest.mark.postgres
+def test_create_execution_logs_attaches_hashes_in_order(db, make_rule):
+    rule = make_rule("RL-1", [{"field": "x", "operator": "equals", "value": 1}])
+    first, second = {"x": 1}, {"x": 2}
+    logs = [
+        {"rule_id": rule.id, "input_payload": first, "execution_result": True},
+        {"rule_id": rule.id, "input_payload": second, "execution_result": False},
+        {"rule_id": rule.id, "input_payload": first, "execution_result": True},
+        {"rule_id": rule.id, "input_payload": None, "execution_result": False},
+    ]
+    assert crud.create_execution_logs(db, logs) == 4
+
+    hashes = [h for (h,) in db.query(models.RuleExecutionLog.payload_hash).order_by(models.RuleExecutionLog.id)]
+    assert hashes == [payload_hash(first), payload_hash(second), payload_hash(first), None]
+    assert db.query(models.ExecutionPayload).count() == 2
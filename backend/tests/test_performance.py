@@ -0,0 +1,93 @@
+"""Rule performance endpoints: triggered claims filters and the condition hit map."""
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import crud, models
+from app.services.rule_engine import condition_labels, expand_trigger_mask
+
+pytestmark = pytest.mark.postgres
+
+
+@pytest.fixture
+def rule_id(db, make_rule):
+    rule = make_rule("RL-1", [{"field": "claim.amount", "operator": "greater", "value": 5}])
+    crud.create_execution_logs(db, [
+        {"rule_id": rule.id, "input_payload": {"n": n}, "execution_result": True,
+         "severity": severity, "decision": "pending", "claim_id": f"CLM-{n}"}
+        for n, severity in enumerate(["high", "high", "low"])
+    ])
+    return rule.id
+
+
+@pytest.mark.parametrize("path", ["performance", "performance/claims"])
+def test_claim_filters(client, rule_id, path):
+    response = client.get(f"/api/rules/{rule_id}/{path}", params={"severity": "high", "decision": "all"})
+    assert response.status_code == 200
+    claims = response.json()["claims"] if path == "performance" else response.json()
+    assert {c["claimId"] for c in claims["items"]} == {"CLM-0", "CLM-1"}
+
+
+@pytest.mark.parametrize("path", ["performance", "performance/claims"])
+@pytest.mark.parametrize("params", [{"severity": "critical"}, {"decision": "maybe"}])
+def test_unknown_filter_values_are_rejected(client, rule_id, path, params):
+    response = client.get(f"/api/rules/{rule_id}/{path}", params=params)
+    assert response.status_code == 400
+    assert "is not a valid" in response.json()["detail"]
+
+
+def test_unknown_rule(client, db):
+    assert client.get("/api/rules/999/performance").status_code == 404
+
+
+def test_condition_hit_map_matches_rows(db, make_rule):
+    rng = random.Random(23)
+    rule = make_rule("RL-1", [
+        {"field": "claim.amount", "operator": "greater", "value": 5},
+        {"field": "geo_distance", "operator": "greater", "value": 50},
+    ], logic_operator="OR")
+    other = make_rule("RL-2", [{"field": "claim.amount", "operator": "less", "value": 5}])
+    logic = {"groups": [{"id": "1", "logicOperator": "AND", "conditions": [
+        {"id": "0", "field": "device", "operator": "equals", "value": "d1"},
+        {"id": "1", "field": "claim.amount", "operator": "greater", "value": 5},
+        {"id": "2", "field": "ip", "operator": "contains", "value": "10."},
+    ]}]}
+    v2 = crud.create_rule_version(db, rule.id, "v2.0", logic, None, None, False)
+    versions = {v.version: v for v in db.query(models.RuleVersion).filter(models.RuleVersion.rule_id == rule.id)}
+    now = datetime.now().astimezone()
+    logs = []
+    for n in range(200):
+        version = rng.choice([versions["v1.0"], v2])
+        row = {
+            "rule_id": rng.choice([rule.id, rule.id, other.id]),
+            "rule_version_id": version.id,
+            "input_payload": {"n": n},
+            "execution_result": rng.random() < 0.7,
+            "trigger_mask": rng.randrange(1 << len(condition_labels(version.logic_snapshot))),
+            # Some rows older than the 30 day window
+            "executed_at": now - timedelta(days=rng.choice([0, 3, 12, 29, 45])),
+        }
+        # Rows written before trigger masks carry their reasons
+        if n % 4 == 0:
+            row["trigger_mask"] = 0
+            row["trigger_reasons"] = rng.sample(["Legacy A", "Legacy B", "Legacy C"], rng.randint(0, 2))
+        logs.append(row)
+    crud.create_execution_logs(db, logs)
+
+    labels = {v.id: condition_labels(v.logic_snapshot) for v in versions.values()}
+    since = now - timedelta(days=30)
+    flagged = [r for r in logs if r["rule_id"] == rule.id and r["execution_result"] and r["executed_at"] >= since]
+    counts = Counter()
+    for r in flagged:
+        counts.update(r.get("trigger_reasons") or expand_trigger_mask(r["trigger_mask"], labels[r["rule_version_id"]]))
+    expected = sorted(
+        ({"condition": c, "percentage": round(n / len(flagged) * 100, 2)} for c, n in counts.items()),
+        key=lambda x: (-x["percentage"], x["condition"]),
+    )
+
+    hit_map = crud.get_condition_hit_map(db, rule.id, 30)
+    assert hit_map == expected
+    assert {"Legacy A", *labels[v2.id]} <= {item["condition"] for item in hit_map}
+    assert crud.get_condition_hit_map(db, rule.id + 99, 30) == []
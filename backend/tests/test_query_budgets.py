@@ -0,0 +1,101 @@
+"""
+Query budgets for the hot endpoints on fixed seeded data. A budget failing
+means a request started issuing more statements, typically one per rule or
+per row (N+1); the message lists the repeated statements.
+"""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app import crud, database
+from app.core.query_tracking import QueryStats, query_budget, track_queries
+
+pytestmark = pytest.mark.postgres
+
+
+@pytest.fixture
+def seeded(db, make_rule):
+    """Five rules with two versions each and 60 scored claims per rule."""
+    rng = random.Random(19)
+    rules = []
+    for i in range(5):
+        rule = make_rule(f"RL-{i}", [
+            {"field": "claim.amount", "operator": "greater", "value": 1000 * (i + 1)},
+            {"field": "geo_distance", "operator": "greater", "value": 50},
+        ], logic_operator="OR")
+        crud.create_rule_version(db, rule.id, "v2.0", rule.logic, None, "Second version", True)
+        rules.append(rule)
+    versions = {v.rule_id: v.id for v in crud.get_active_rule_versions(db)}
+    now = datetime.now().astimezone()
+    logs = []
+    for rule in rules:
+        for n in range(60):
+            flagged = rng.random() < 0.4
+            logs.append({
+                "rule_id": rule.id,
+                "rule_version_id": versions[rule.id],
+                "input_payload": {"claim": {"amount": rng.randint(0, 9000)}, "n": n},
+                "execution_result": flagged,
+                "trigger_mask": rng.choice([1, 2, 3]) if flagged else 0,
+                "severity": rng.choice(["high", "medium", "low"]),
+                "decision": rng.choice(["pending", "fraud", "legitimate"]),
+                "amount": float(rng.randint(0, 9000)),
+                "claim_id": f"CLM-{rule.id}-{n}",
+                "executed_at": now - timedelta(minutes=n),
+            })
+    crud.create_execution_logs(db, logs)
+    return rules
+
+
+def test_rules_list_budget(client, seeded):
+    # Rules with creators, 24h trigger counts and latest versions
+    with query_budget(1):
+        response = client.get("/api/rules/")
+    assert len(response.json()) == 5
+
+
+def test_performance_budget(client, seeded):
+    rule_id = seeded[0].id
+    # Rule lookup; rollup window and last evaluation; hit map count, reasons,
+    # masks and labels; claims count, page and labels
+    with query_budget(10):
+        response = client.get(f"/api/rules/{rule_id}/performance", params={"days": 30})
+    body = response.json()
+    assert body["kpis"]["totalClaimsEvaluated"] == 60
+    assert body["conditions"] and body["claims"]["items"]
+
+
+def test_execute_budget(client, seeded):
+    # Loads the rule set snapshot
+    client.post("/api/rules/execute", json={"claim": {"amount": 1}})
+    # Payload, executions, rollup deltas and audit entry, one INSERT each
+    with query_budget(4):
+        response = client.post("/api/rules/execute", json={"claim": {"amount": 4500}, "geo_distance": 100})
+    assert len(response.json()) == 4
+
+
+def test_failed_statement_leaves_no_start_time(db):
+    with database.engine.connect() as conn, track_queries() as stats:
+        with pytest.raises(DBAPIError):
+            conn.execute(text("SELECT 1 / 0"))
+        conn.rollback()
+        assert not conn.info.get("query_started")
+        conn.execute(text("SELECT 1"))
+    assert stats.count == 1
+
+
+def test_repeated_inserts_are_not_n_plus_one():
+    stats = QueryStats()
+    stats.statements.update({"INSERT INTO rule_executions VALUES (...)": 8, "SELECT * FROM rules WHERE id = %s": 8})
+    assert stats.repeated() == [("SELECT * FROM rules WHERE id = %s", 8)]
+
+
+def test_batch_execute_logs_no_n_plus_one(client, seeded, caplog):
+    client.post("/api/rules/execute", json={"claim": {"amount": 1}})
+    claims = [{"claim": {"amount": 1000 * n}, "geo_distance": 10 * n} for n in range(40)]
+    with caplog.at_level("WARNING", logger="app.core.query_tracking"):
+        assert client.post("/api/rules/execute/batch", json=claims).status_code == 200
+    assert "possible N+1" not in caplog.text
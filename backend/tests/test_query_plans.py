@@ -0,0 +1,158 @@
+"""
+Query plans of the analytics queries in crud.py on a database large enough
+for the planner to choose between indexes and sequential scans on its own.
+
+Every SELECT an analytics function sends is EXPLAINed with the default
+planner settings; none may read rule_executions, rule_versions or
+rule_daily_stats with a Seq Scan. Writes are not analytics reads and are
+skipped.
+"""
+import json
+
+import pytest
+from sqlalchemy import event, text
+
+from app import crud, database, models
+
+pytestmark = pytest.mark.postgres
+
+# Tables whose access paths must be indexed
+CHECKED_TABLES = {"rule_executions", "rule_versions", "rule_daily_stats"}
+
+RULES = 200
+VERSIONS_PER_RULE = 25
+EXECUTIONS = 200_000
+
+
+@pytest.fixture(scope="module")
+def seeded(pg_engine):
+    """A year of executions for 200 rules, their version history and daily rollups."""
+    db = database.SessionLocal()
+    logic = {"groups": [{"id": "1", "logicOperator": "AND", "conditions": [
+        {"id": "1", "field": "claim.amount", "operator": "greater", "value": 5000},
+        {"id": "2", "field": "geo_distance", "operator": "greater", "value": 50},
+    ]}]}
+    try:
+        db.add_all(
+            models.Rule(rule_id=f"RL-{i}", name=f"Rule {i}", category="transaction", severity="high",
+                        status="active", logic=logic, tags=[])
+            for i in range(RULES)
+        )
+        db.flush()
+        db.execute(text("""
+            INSERT INTO rule_versions (rule_id, version, logic_snapshot, created_at, notes, is_active)
+            SELECT r.id, 'v' || n || '.0', CAST(:logic AS json), now() - (:versions - n) * interval '1 day',
+                   'Revision ' || n, n = :versions
+            FROM rules r, generate_series(1, :versions) n
+        """), {"logic": json.dumps(logic), "versions": VERSIONS_PER_RULE})
+        db.execute(text("""
+            INSERT INTO rule_executions (rule_id, rule_version_id, claim_id, executed_at, severity,
+                                         trigger_mask, decision, amount, execution_result)
+            SELECT v.rule_id, v.id, 'CLM-' || g, now() - random() * interval '365 days',
+                   (ARRAY['high', 'medium', 'low'])[1 + g % 3]::severity, CASE WHEN g % 10 < 3 THEN 1 + g % 3 ELSE 0 END,
+                   (ARRAY['pending', 'pending', 'fraud', 'legitimate'])[1 + g % 4]::decision,
+                   round((random() * 10000)::numeric, 2), g % 10 < 3
+            FROM generate_series(1, :executions) g
+            JOIN rule_versions v ON v.rule_id = 1 + g % :rules AND v.is_active
+        """), {"executions": EXECUTIONS, "rules": RULES})
+        db.commit()
+        crud.rebuild_daily_stats(db)
+        with pg_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("ANALYZE"))
+        rule_id = db.query(models.Rule.id).filter(models.Rule.rule_id == "RL-0").scalar()
+        execution_id = db.query(models.RuleExecutionLog.id).filter(models.RuleExecutionLog.rule_id == rule_id).limit(1).scalar()
+        yield rule_id, execution_id
+    finally:
+        db.close()
+        tables = ", ".join(table.name for table in models.Base.metadata.sorted_tables)
+        with pg_engine.begin() as conn:
+            conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+
+
+def _plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def _reads(fn, *args) -> list[tuple[str, dict]]:
+    """Run fn and return the SELECT statements it sent, with their parameters."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not (context.isinsert or context.isupdate or context.isdelete):
+            statements.append((statement, parameters))
+
+    event.listen(database.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        fn(*args)
+    finally:
+        event.remove(database.engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def _explain(statement: str, parameters) -> dict:
+    with database.engine.connect() as conn:
+        plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+    plan = plan if isinstance(plan, list) else json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def _claims_after_first_page(db, rule_id: int, sort: str):
+    first = crud.get_triggered_claims(db, rule_id, 30, None, None, 0, 20, sort, total='none')
+    crud.get_triggered_claims(db, rule_id, 30, None, None, 0, 20, sort, first['nextCursor'], 'none')
+
+
+ANALYTICS_CALLS = {
+    "get_rules_with_stats": lambda db, rule_id, _: crud.get_rules_with_stats(db),
+    "get_rule_stats": lambda db, rule_id, _: crud.get_rule_stats(db, rule_id),
+    "get_rule_versions": lambda db, rule_id, _: crud.get_rule_versions(db, rule_id),
+    "get_rule_performance_kpis": lambda db, rule_id, _: crud.get_rule_performance_kpis(db, rule_id, 30),
+    "get_trigger_trends": lambda db, rule_id, _: crud.get_trigger_trends(db, rule_id, 30),
+    "get_severity_distribution": lambda db, rule_id, _: crud.get_severity_distribution(db, rule_id, 30),
+    "get_decision_counts": lambda db, rule_id, _: crud.get_decision_counts(db, rule_id, 30),
+    "get_rule_performance_summary": lambda db, rule_id, _: crud.get_rule_performance_summary(db, rule_id, 30),
+    "get_condition_hit_map": lambda db, rule_id, _: crud.get_condition_hit_map(db, rule_id, 30),
+    "get_execution_by_id": lambda db, _, execution_id: crud.get_execution_by_id(db, execution_id),
+    **{
+        f"get_triggered_claims[{sort}]": (
+            lambda db, rule_id, _, sort=sort: crud.get_triggered_claims(db, rule_id, 30, None, None, 0, 20, sort)
+        )
+        for sort in crud.CLAIM_SORTS
+    },
+    **{
+        f"get_triggered_claims[{sort}, cursor]": (
+            lambda db, rule_id, _, sort=sort: _claims_after_first_page(db, rule_id, sort)
+        )
+        for sort in crud.CLAIM_SORTS
+    },
+}
+
+
+# Index some statement of the call must be read through
+EXPECTED_INDEXES = {
+    "get_rules_with_stats": "ix_rule_versions_rule_id_created_at",
+    "get_rule_performance_summary": "rule_daily_stats_pkey",
+    "get_condition_hit_map": "ix_rule_executions_flagged_rule_executed_at",
+    "get_triggered_claims[date_desc]": "ix_rule_executions_flagged_rule_executed_at",
+    "get_triggered_claims[date_desc, cursor]": "ix_rule_executions_flagged_rule_executed_at",
+}
+
+
+@pytest.mark.parametrize("name", ANALYTICS_CALLS)
+def test_analytics_reads_use_indexes(seeded, name):
+    rule_id, execution_id = seeded
+    db = database.SessionLocal()
+    try:
+        reads = _reads(ANALYTICS_CALLS[name], db, rule_id, execution_id)
+    finally:
+        db.close()
+    assert reads
+    indexes = set()
+    for statement, parameters in reads:
+        nodes = list(_plan_nodes(_explain(statement, parameters)))
+        scanned = {n["Relation Name"] for n in nodes if n["Node Type"] == "Seq Scan"} & CHECKED_TABLES
+        assert not scanned, f"sequential scan on {', '.join(sorted(scanned))}: {' '.join(statement.split())[:300]}"
+        indexes.update(n["Index Name"] for n in nodes if "Index Name" in n)
+    if name in EXPECTED_INDEXES:
+        assert EXPECTED_INDEXES[name] in indexes
@@ -0,0 +1,28 @@
+from app.services.reference_lists import ReferenceLists, referenced_lists
+
+
+def test_referenced_lists():
+    logic = {'groups': [
+        {'conditions': [
+            {'field': 'ip', 'operator': 'contains', 'value': 'list:blocked_ips'},
+            {'field': 'ip', 'operator': 'contains', 'value': 'list: '},
+            {'field': 'ip', 'operator': 'equals', 'value': 'list:other'},
+        ]},
+        {'conditions': [{'field': 'email', 'operator': 'contains', 'value': 'list:bad_emails'}]},
+    ]}
+    assert referenced_lists(logic) == {'blocked_ips', 'bad_emails'}
+    assert referenced_lists({}) == set()
+
+
+def test_lists_are_unloaded_with_the_last_tracking_rule():
+    lists = ReferenceLists()
+    lists.track('blocked')
+    lists.track('blocked')
+    lists.replace('blocked', 3, ['1.2.3.4', '10'])
+    assert lists.contains('blocked', '1.2.3.4')
+    assert lists.contains('blocked', 10.0)
+    lists.untrack('blocked')
+    assert lists.contains('blocked', '1.2.3.4')
+    lists.untrack('blocked')
+    assert not lists.contains('blocked', '1.2.3.4')
+    assert lists.tracked() == set()
@@ -0,0 +1,311 @@
+"""
+Compiled evaluators against the json-logic conversion they replace, and the
+network and batch evaluators against the compiled ones, over random rules.
+"""
+import random
+
+import pytest
+
+from app.services import rule_engine
+from app.services.rule_engine import (
+    clear_compiled_rules,
+    compile_rule_logic,
+    evaluate_rule_batch,
+    get_compiled_rule,
+)
+from app.services.rule_network import RuleNetwork
+
+FIELDS = ['claim.amount', 'geo_distance', 'x']
+OPERATORS = ['greater', 'less', 'equals', 'not_equals', 'contains']
+VALUES = [5000, '5000', 50, '50', 'abc', 0, '0', 1.5, '1.5', '', True]
+PAYLOAD_VALUES = [6000, '6000', 40, 'abc', 'ab', 0, None, 1.5, '5000', 5000, True, False, '', [1]]
+
+
+@pytest.fixture(autouse=True)
+def fresh_compiled_rules():
+    # Version ids are reused across tests with different logic
+    clear_compiled_rules()
+    yield
+    clear_compiled_rules()
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return float(value.strip())
+        except ValueError:
+            return None
+    return None
+
+
+def _loose_equals(a, b) -> bool:
+    return a == b or (_number(a) is not None and _number(a) == _number(b))
+
+
+def json_logic(tree, data):
+    """
+    Reference interpreter for the json-logic subset the converter emits, with
+    json-logic-js comparison coercion. (The json-logic package on PyPI does not
+    run on Python 3.)
+    """
+    if not isinstance(tree, dict):
+        return tree
+    if not tree:
+        return False
+    (op, args), = tree.items()
+    if op == 'var':
+        value = data
+        for key in args.split('.'):
+            value = value.get(key) if isinstance(value, dict) else None
+        return value
+    values = [json_logic(arg, data) for arg in args]
+    if op == 'and':
+        return all(values)
+    if op == 'or':
+        return any(values)
+    a, b = values
+    if op in ('>', '<'):
+        a, b = _number(a), _number(b)
+        return a is not None and b is not None and (a > b if op == '>' else a < b)
+    if op == '==':
+        return _loose_equals(a, b)
+    if op == '!=':
+        return not _loose_equals(a, b)
+    if op == 'in':
+        if isinstance(b, str):
+            return isinstance(a, str) and a in b
+        return isinstance(b, (list, tuple)) and a in b
+    raise ValueError(op)
+
+
+def convert_rule_logic_to_json_logic(rule_logic: dict) -> dict:
+    """
+    Convert RuleLogic format to json-logic format, as the engine did before
+    compiled evaluators; the reference their semantics are checked against.
+    """
+    if not rule_logic or 'groups' not in rule_logic:
+        return {}
+
+    groups = rule_logic['groups']
+    if not groups:
+        return {}
+
+    # For now, assume the first group is the main IF condition
+    # and subsequent groups are AND/OR conditions
+    main_group = groups[0]
+    conditions = []
+
+    # Convert conditions in the main group
+    for condition in main_group['conditions']:
+        json_logic_condition = convert_condition_to_json_logic(condition)
+        if json_logic_condition:
+            conditions.append(json_logic_condition)
+
+    # If there are more groups, combine them
+    if len(groups) > 1:
+        all_conditions = [convert_group_to_json_logic(group) for group in groups]
+        all_conditions = [c for c in all_conditions if c]
+        if len(all_conditions) > 1:
+            return {"and": all_conditions}
+        elif all_conditions:
+            return all_conditions[0]
+
+    # Single group
+    if len(conditions) > 1:
+        return {"and": conditions}
+    elif conditions:
+        return conditions[0]
+
+    return {}
+
+
+def convert_group_to_json_logic(group: dict) -> dict:
+    """Convert a ConditionGroup to json-logic"""
+    conditions = []
+    for condition in group['conditions']:
+        json_logic_condition = convert_condition_to_json_logic(condition)
+        if json_logic_condition:
+            conditions.append(json_logic_condition)
+
+    if not conditions:
+        return {}
+
+    operator = group.get('logicOperator', 'AND').lower()
+    if operator == 'or':
+        return {"or": conditions}
+    else:  # 'if' or 'and'
+        return {"and": conditions} if len(conditions) > 1 else conditions[0]
+
+
+def convert_condition_to_json_logic(condition: dict) -> dict:
+    """Convert a RuleCondition to json-logic"""
+    field = condition.get('field', '')
+    operator = condition.get('operator', '')
+    value = condition.get('value', '')
+
+    if not field or not operator:
+        return {}
+
+    # Map operators to json-logic
+    operator_map = {
+        'greater': '>',
+        'less': '<',
+        'equals': '==',
+        'not_equals': '!=',
+        'contains': 'in',
+    }
+
+    # Operators reading claim history had no json-logic equivalent and are not generated here
+    if operator in operator_map:
+        return {operator_map[operator]: [{"var": field}, value]}
+    return {}
+
+
+def random_logic(rng: random.Random) -> dict:
+    return {'groups': [
+        {
+            'id': str(g),
+            'logicOperator': rng.choice(['IF', 'AND', 'OR']),
+            'conditions': [
+                {'id': str(i), 'field': rng.choice(FIELDS), 'operator': rng.choice(OPERATORS), 'value': rng.choice(VALUES)}
+                for i in range(rng.randint(1, 3))
+            ],
+        }
+        for g in range(rng.randint(1, 3))
+    ]}
+
+
+def random_payload(rng: random.Random) -> dict:
+    payload = {'claim': {}}
+    if rng.random() < 0.9:
+        payload['claim']['amount'] = rng.choice(PAYLOAD_VALUES)
+    if rng.random() < 0.9:
+        payload['geo_distance'] = rng.choice(PAYLOAD_VALUES)
+    if rng.random() < 0.9:
+        payload['x'] = rng.choice(PAYLOAD_VALUES)
+    return payload
+
+
+def test_compiled_matches_json_logic():
+    rng = random.Random(1)
+    for _ in range(3000):
+        logic, payload = random_logic(rng), random_payload(rng)
+        expected = bool(json_logic(convert_rule_logic_to_json_logic(logic), payload))
+        assert compile_rule_logic(logic)(payload) == expected, (logic, payload)
+
+
+def test_network_and_batch_match_single_rule():
+    rng = random.Random(2)
+    for n in range(3000):
+        logic, payload = random_logic(rng), random_payload(rng)
+        expected = compile_rule_logic(logic)(payload)
+        network = RuleNetwork()
+        network.add_version(n, 1, logic)
+        assert network.evaluate(payload)[n][0] == expected, (logic, payload)
+        assert bool(evaluate_rule_batch(logic, [payload])['results'][0]) == expected, (logic, payload)
+
+
+def test_batch_matches_single_rule_over_many_payloads():
+    rng = random.Random(3)
+    for _ in range(200):
+        logic = random_logic(rng)
+        payloads = [random_payload(rng) for _ in range(50)]
+        compiled = compile_rule_logic(logic)
+        assert evaluate_rule_batch(logic, payloads)['results'].tolist() == [compiled(p) for p in payloads]
+
+
+def test_batch_condition_masks_are_positional():
+    # LogicBuilder ids repeat across groups, as in random_logic
+    logic = {'groups': [
+        {'id': 'a', 'logicOperator': 'IF', 'conditions': [
+            {'id': '0', 'field': 'x', 'operator': 'greater', 'value': 10},
+            {'id': '1', 'field': 'x', 'operator': 'less', 'value': 100},
+        ]},
+        {'id': 'b', 'logicOperator': 'OR', 'conditions': [
+            {'id': '0', 'field': 'geo_distance', 'operator': 'equals', 'value': 'abc'},
+            {'id': '1', 'field': 'x', 'operator': 'equals', 'value': 50},
+        ]},
+    ]}
+    payloads = [{'x': x, 'geo_distance': g} for x in (5, 50, 500) for g in ('abc', 1)]
+    batch = evaluate_rule_batch(logic, payloads)
+    compiled = compile_rule_logic(logic)
+    conditions = [c for _, group in compiled.groups for c in group]
+    assert [c.key for c in batch['conditions']] == [c.key for c in conditions]
+    assert len(batch['condition_masks']) == 4
+    for condition, mask in zip(conditions, batch['condition_masks']):
+        assert mask.tolist() == [condition(p) for p in payloads]
+
+
+def test_shared_network_with_reordering_and_churn(monkeypatch):
+    from app.services import rule_network
+    monkeypatch.setattr(rule_network, 'SAMPLE_EVERY', 1)
+    monkeypatch.setattr(rule_network, 'REORDER_EVERY', 50)
+    rng = random.Random(4)
+    network = RuleNetwork()
+    rules = {}
+    for vid in range(300):
+        rules[vid] = random_logic(rng)
+        network.add_version(vid, vid, rules[vid])
+    for n in range(1000):
+        payload = random_payload(rng)
+        outcomes = network.evaluate(payload)
+        for vid, logic in rules.items():
+            assert outcomes[vid][0] == compile_rule_logic(logic)(payload), (logic, payload)
+        if n % 200 == 0:
+            removed = rng.sample(sorted(rules), 20)
+            network.remove_versions(removed)
+            for vid in removed:
+                del rules[vid]
+            for k in range(20):
+                vid = 10_000 + n + k
+                rules[vid] = random_logic(rng)
+                network.add_version(vid, vid, rules[vid])
+    assert network.stats()['rules'] == len(rules)
+
+
+def test_trigger_masks_do_not_depend_on_test_order(monkeypatch):
+    from app.services import rule_network
+    monkeypatch.setattr(rule_network, 'SAMPLE_EVERY', 1)
+    monkeypatch.setattr(rule_network, 'REORDER_EVERY', 0)
+    rng = random.Random(5)
+    network = RuleNetwork()
+    rules = {vid: random_logic(rng) for vid in range(200)}
+    for vid, logic in rules.items():
+        network.add_version(vid, vid, logic)
+    payloads = [random_payload(rng) for _ in range(300)]
+
+    before = [network.evaluate(p) for p in payloads]
+    network.reorder()
+    assert any(plan.groups != plan.authored for _, _, plan in network.snapshot()[0].values())
+    after = [network.evaluate(p) for p in payloads]
+    assert after == before
+
+    # A triggered rule's mask holds every satisfied condition, other rules record none
+    for payload, outcomes in zip(payloads, before):
+        for vid, logic in rules.items():
+            conditions = [c for _, group in compile_rule_logic(logic).groups for c in group]
+            result, mask = outcomes[vid]
+            expected = sum(1 << i for i, c in enumerate(conditions) if c(payload)) if result else 0
+            assert mask == expected, (logic, payload)
+
+
+def test_remove_versions_evicts_compiled_rules():
+    logic = {'groups': [{'logicOperator': 'AND', 'conditions': [{'field': 'x', 'operator': 'greater', 'value': 1}]}]}
+    network = RuleNetwork()
+    network.add_version(900_001, 1, logic)
+    assert 900_001 in rule_engine._compiled_rules
+    network.remove_versions([900_001])
+    assert 900_001 not in rule_engine._compiled_rules
+    # Inactive versions cached by evaluate_rule are evicted too
+    get_compiled_rule(900_002, logic)
+    network.remove_versions([900_002])
+    assert 900_002 not in rule_engine._compiled_rules
+
+
+def test_debug_rule_ids_skip_invalid_entries(caplog):
+    assert rule_engine._parse_rule_ids("12, abc,,40") == frozenset({12, 40})
+    assert "abc" in caplog.text
@@ -0,0 +1,66 @@
+from app.services.rule_engine import evaluate_rule
+from app.services.rule_metrics import RuleMetrics, RuleVersionMetrics, rule_metrics
+from app.services.rule_network import RuleNetwork
+
+
+def test_quantiles_come_from_bucket_bounds():
+    metrics = RuleMetrics()
+    for elapsed in [800] * 98 + [30_000, 9_000_000]:
+        metrics.record(1, 10, elapsed > 1000, elapsed)
+    row = metrics.report()[0]
+    assert (row["evaluations"], row["triggers"], row["errors"]) == (100, 2, 0)
+    assert row["p50Us"] == 1.0
+    # The 99th evaluation falls in the 50us bucket, the slowest one beyond the last bound
+    assert row["p99Us"] == 50.0
+    assert row["maxUs"] == 9000.0
+    assert row["histogram"]["le_1us"] == 98 and row["histogram"]["inf"] == 1
+    assert RuleVersionMetrics(None).quantile_ns(0.5) is None
+
+
+def test_report_orders_by_p99_or_errors():
+    metrics = RuleMetrics()
+    metrics.record(1, 10, False, 2_000)
+    metrics.record(2, 20, False, 400_000)
+    metrics.record(3, 30, False, 900, error=True)
+    assert [r["rule_version_id"] for r in metrics.report()] == [2, 1, 3]
+    assert [r["rule_version_id"] for r in metrics.report(sort="errors", limit=1)] == [3]
+    assert metrics.report(sort="errors")[0]["errorRate"] == 1.0
+
+
+def test_evaluations_are_recorded_with_swallowed_errors():
+    rule_metrics.reset()
+    network = RuleNetwork()
+    logic = {'groups': [{'logicOperator': 'AND', 'conditions': [{'field': 'note', 'operator': 'contains', 'value': 'abc'}]}]}
+    network.add_version(600_001, 6, logic)
+    try:
+        network.evaluate({'note': 'b'})
+        (node,) = network.snapshot()[1].values()
+
+        def broken(actual):
+            raise TypeError("bad payload")
+        node.test = broken
+        assert network.evaluate({'note': 'b'}) == {600_001: (False, 0)}
+        evaluate_rule(logic, {'note': 'ab'}, rule_version_id=600_002, rule_id=6)
+
+        stats = {r["rule_version_id"]: r for r in rule_metrics.report(limit=10)}
+        assert (stats[600_001]["evaluations"], stats[600_001]["errors"]) == (2, 1)
+        assert (stats[600_002]["evaluations"], stats[600_002]["triggers"]) == (1, 1)
+        assert stats[600_001]["rule_id"] == 6
+    finally:
+        network.remove_versions([600_001, 600_002])
+        rule_metrics.reset()
+
+
+def test_evaluation_stats_endpoint():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    rule_metrics.reset()
+    rule_metrics.record(5, 50, True, 1_500)
+    try:
+        response = TestClient(app).get("/api/rules/evaluation-stats", params={"sort": "errors", "limit": 5})
+        assert response.status_code == 200
+        assert [r["rule_version_id"] for r in response.json()] == [5]
+        assert TestClient(app).get("/api/rules/evaluation-stats", params={"sort": "fastest"}).status_code == 422
+    finally:
+        rule_metrics.reset()
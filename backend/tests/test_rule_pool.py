@@ -0,0 +1,87 @@
+"""Process-pool evaluation against in-process evaluation of the same rule set."""
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import rule_pool
+from app.services.rule_network import RuleNetwork
+from app.services.rule_pool import RulePool, StaleShardError, is_stateless
+
+AMOUNT = {'groups': [{'logicOperator': 'AND', 'conditions': [{'field': 'amount', 'operator': 'greater', 'value': 10}]}]}
+DUPLICATE = {'groups': [{'logicOperator': 'AND', 'conditions': [{'field': 'doc', 'operator': 'is_duplicate', 'value': ''}]}]}
+
+
+def test_is_stateless():
+    assert is_stateless(AMOUNT)
+    assert not is_stateless(DUPLICATE)
+    assert not is_stateless({'groups': [{'conditions': [{'field': 'ip', 'operator': 'contains', 'value': 'list:blocked'}]}]})
+    assert is_stateless({'groups': [{'conditions': [{'field': 'ip', 'operator': 'contains', 'value': '10.0.0.1'}]}]})
+
+
+def test_stale_epoch_is_refused(monkeypatch):
+    monkeypatch.setattr(rule_pool, '_worker_epoch', 3)
+    with pytest.raises(StaleShardError):
+        rule_pool._evaluate_shard(4, b'[{}]')
+
+
+@pytest.fixture
+def rule_set():
+    rng = random.Random(8)
+    network = RuleNetwork()
+    versions = []
+    for vid in range(1, 41):
+        threshold = rng.randint(0, 100)
+        logic = {'groups': [
+            {'logicOperator': 'AND', 'conditions': [{'field': 'amount', 'operator': 'greater', 'value': threshold}]},
+            {'logicOperator': 'OR', 'conditions': [
+                {'field': 'country', 'operator': 'equals', 'value': rng.choice(['FR', 'DE'])},
+                {'field': 'amount', 'operator': 'less', 'value': threshold + 20},
+            ]},
+        ]}
+        network.add_version(vid, vid * 10, logic)
+        versions.append((vid, vid * 10))
+    network.add_version(99, 990, DUPLICATE)
+    versions.append((99, 990))
+    yield SimpleNamespace(versions=tuple(versions), state=network.snapshot(), network=network)
+    network.remove_versions([vid for vid, _ in versions])
+
+
+def test_pool_matches_in_process_evaluation(rule_set):
+    pool = RulePool(workers=2, min_rules=10)
+    try:
+        rng = random.Random(9)
+        payloads = [{'amount': rng.randint(0, 130), 'country': rng.choice(['FR', 'DE', 'US'])} for _ in range(50)]
+        pooled_ids, outcomes = pool.evaluate(rule_set, payloads)
+        # The stateful rule stays in the request process
+        assert pooled_ids == frozenset(range(1, 41))
+        for payload, pooled in zip(payloads, outcomes):
+            expected = rule_set.network.evaluate(payload, rule_set.state)
+            assert pooled == {vid: r for vid, r in expected.items() if vid in pooled_ids and r[0]}
+    finally:
+        pool.shutdown()
+
+
+def test_stale_shard_falls_back_without_restarting_workers(rule_set):
+    pool = RulePool(workers=2, min_rules=10)
+    try:
+        assert pool.evaluate(rule_set, [{'amount': 50}]) is not None
+        executors = list(pool._executors)
+        # Another request loaded a newer rule set after this one was prepared
+        pool._epoch += 1
+        assert pool.evaluate(rule_set, [{'amount': 50}]) is None
+        assert pool._executors == executors
+
+        # The next rule set reloads the shards and the pool is used again
+        newer = SimpleNamespace(versions=rule_set.versions[1:], state=rule_set.state)
+        pooled_ids, _ = pool.evaluate(newer, [{'amount': 50}])
+        assert pooled_ids == frozenset(range(2, 41))
+    finally:
+        pool.shutdown()
+
+
+def test_small_rule_sets_are_evaluated_in_process(rule_set):
+    pool = RulePool(workers=2, min_rules=100)
+    assert pool.evaluate(rule_set, [{'amount': 50}]) is None
+    assert pool._executors == []
+    assert RulePool(workers=0).evaluate(rule_set, [{'amount': 50}]) is None
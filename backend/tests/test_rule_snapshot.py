@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import rule_snapshot
+from app.services.rule_network import network
+
+
+def _version(version_id: int, rule_id: int, threshold: int):
+    logic = {'groups': [{'logicOperator': 'AND', 'conditions': [
+        {'field': 'amount', 'operator': 'greater', 'value': threshold},
+    ]}]}
+    return SimpleNamespace(id=version_id, rule_id=rule_id, logic_snapshot=logic)
+
+
+@pytest.fixture
+def active_versions():
+    versions = [_version(700_001, 1, 100), _version(700_002, 2, 1000)]
+    rule_snapshot.bump_generation()
+    yield versions
+    network.remove_versions([700_001, 700_002, 700_003])
+    rule_snapshot.bump_generation()
+
+
+def test_snapshot_is_rebuilt_once_per_generation(active_versions):
+    loads = []
+
+    def load():
+        loads.append(1)
+        return list(active_versions)
+
+    first = rule_snapshot.get_active_rule_set(load)
+    assert rule_snapshot.get_active_rule_set(load) is first
+    assert len(loads) == 1
+    assert first.versions == ((700_001, 1), (700_002, 2))
+    assert {vid: hit for vid, (hit, _) in first.evaluate({'amount': 500}).items()} == {700_001: True, 700_002: False}
+
+    # Publishing a version replaces one and bumps the generation
+    active_versions[1] = _version(700_003, 2, 200)
+    rule_snapshot.bump_generation()
+    second = rule_snapshot.get_active_rule_set(load)
+    assert len(loads) == 2
+    assert second.versions == ((700_001, 1), (700_003, 2))
+    assert {vid: hit for vid, (hit, _) in second.evaluate({'amount': 500}).items()} == {700_001: True, 700_003: True}
+    # A request still holding the old snapshot keeps evaluating the rules it started with
+    assert set(first.evaluate({'amount': 500})) == {700_001, 700_002}
+
+
+def test_snapshot_expires_after_ttl(active_versions, monkeypatch):
+    loads = []
+
+    def load():
+        loads.append(1)
+        return active_versions
+
+    rule_snapshot.get_active_rule_set(load)
+    monkeypatch.setattr(rule_snapshot, 'SNAPSHOT_TTL', 0.0)
+    rule_snapshot.get_active_rule_set(load)
+    assert len(loads) == 2
@@ -0,0 +1,91 @@
+"""GET /api/rules/ against the per-rule lookups it replaced."""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import crud, models, schemas
+from app.core.query_tracking import query_budget
+
+pytestmark = pytest.mark.postgres
+
+
+def _per_rule_read_rules(db):
+    """The list endpoint as it was: one stats count and one version lookup per rule."""
+    rules = crud.get_rules(db)
+    for rule in rules:
+        rule.triggers24h = crud.get_rule_stats(db, rule.id)["triggers_24h"]
+        rule.triggerDelta = 0
+        rule.lastUpdated = rule.updated_at.strftime("%Y-%m-%d %H:%M") if rule.updated_at else rule.created_at.strftime("%Y-%m-%d %H:%M")
+        if rule.creator:
+            rule.createdBy = rule.creator.full_name or rule.creator.email
+        if rule.owner:
+            rule.ownerName = rule.owner.full_name or rule.owner.email
+        latest_version = db.query(models.RuleVersion).filter(
+            models.RuleVersion.rule_id == rule.id
+        ).order_by(models.RuleVersion.created_at.desc()).first()
+        if latest_version:
+            rule.currentVersion = latest_version.version
+    return [schemas.Rule.model_validate(rule).model_dump(mode="json") for rule in rules]
+
+
+def _seed(db, make_rule, count, seed=20):
+    rng = random.Random(seed)
+    users = [
+        models.User(email="ana@example.com", hashed_password="x", full_name="Ana Ruiz"),
+        models.User(email="bo@example.com", hashed_password="x"),
+    ]
+    db.add_all(users)
+    db.commit()
+    now = datetime.now().astimezone()
+    logs = []
+    for i in range(count):
+        rule = make_rule(f"RL-{i}", [{"field": "claim.amount", "operator": "greater", "value": i}])
+        rule.created_by_id = rng.choice([None, users[0].id, users[1].id])
+        rule.owner_id = rng.choice([None, users[0].id, users[1].id])
+        if i % 2:
+            rule.description = "Edited"
+        db.commit()
+        for n, hours in enumerate(rng.sample(range(-24, 24), i % 3)):
+            version = crud.create_rule_version(db, rule.id, f"v{n + 2}.0", rule.logic, None, None, n == 0)
+            # Versions created out of order: the latest by created_at is not the last inserted
+            version.created_at = now - timedelta(hours=hours)
+        if i == count - 1:
+            db.query(models.RuleVersion).filter(models.RuleVersion.rule_id == rule.id).delete()
+        db.commit()
+        for n in range(rng.randint(0, 12)):
+            logs.append({
+                "rule_id": rule.id,
+                "input_payload": {"n": n},
+                "execution_result": rng.random() < 0.5,
+                # Some just inside the 24h window, some well outside it
+                "executed_at": now - timedelta(hours=rng.choice([1, 12, 23, 25, 72])),
+            })
+    crud.create_execution_logs(db, logs)
+
+
+def test_list_matches_per_rule_path(client, db, make_rule):
+    _seed(db, make_rule, 12)
+    response = client.get("/api/rules/")
+    assert response.status_code == 200
+    listed = {r["id"]: r for r in response.json()}
+
+    db.expire_all()
+    expected = {r["id"]: r for r in _per_rule_read_rules(db)}
+    assert listed.keys() == expected.keys()
+    for rule_id, rule in expected.items():
+        for field, value in rule.items():
+            assert listed[rule_id][field] == value, (rule_id, field)
+    # The seed covers every branch of the computed fields
+    assert {r["currentVersion"] for r in listed.values()} >= {"", "v1.0", "v2.0", "v3.0"}
+    assert {r["createdBy"] for r in listed.values()} == {"", "Ana Ruiz", "bo@example.com"}
+    assert any(r["triggers24h"] for r in listed.values())
+
+
+@pytest.mark.parametrize("count", [3, 15])
+def test_list_query_count_does_not_grow_with_rules(client, db, make_rule, count):
+    _seed(db, make_rule, count)
+    with query_budget(1) as stats:
+        response = client.get("/api/rules/")
+    assert len(response.json()) == count
+    assert stats.count == 1
@@ -0,0 +1,31 @@
+import random
+
+from app.services.rule_engine import compile_condition
+from app.services.threshold_index import ThresholdIndex
+
+
+def test_satisfied_matches_predicates():
+    rng = random.Random(5)
+    nodes = {}
+    for i in range(300):
+        condition = compile_condition({
+            'id': str(i),
+            'field': rng.choice(['amount', 'claim.distance']),
+            'operator': rng.choice(['greater', 'less', 'equals']),
+            'value': rng.choice([rng.randint(0, 50), str(rng.randint(0, 50)), rng.random() * 50, 'abc', 'nan']),
+        })
+        if condition is not None:
+            nodes.setdefault(condition.key, condition)
+    index = ThresholdIndex(nodes)
+    indexed = [key for key in nodes if key in index]
+    assert indexed
+
+    for _ in range(500):
+        payload = {
+            'amount': rng.choice([rng.randint(-5, 55), str(rng.randint(0, 50)), rng.random() * 50, None, 'x', True]),
+            'claim': {'distance': rng.choice([rng.randint(0, 50), None, 'nan'])},
+        }
+        probe = index.probe(payload)
+        expected = {key for key in indexed if nodes[key](payload)}
+        assert {key for key in indexed if probe(key)} == expected, payload
+        assert set(index.satisfied(payload)) == expected, payload
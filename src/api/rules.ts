@@ -63,9 +63,32 @@ export const testRule = async (ruleData: any, payload: any): Promise<any> => {
 };
 
 // Performance API
+export type RuleKpis = { totalClaimsEvaluated: number; flagsTriggered: number; confirmedFraud: number; falsePositiveRate: number; hitRate: number; lastEvaluated: string };
+export type TriggeredClaimsPage = { total: number | null; totalApproximate: boolean; items: TriggeredClaim[]; nextCursor: string | null };
+export type DecisionCounts = { fraud: number; legitimate: number; pending: number };
+
+// Every panel of the performance page, with the first page of triggered claims, in one request
+export const getRulePerformance = async (
+  ruleId: string,
+  opts: { days: number; severity?: string; decision?: string; pageSize?: number; sort?: string }
+) => {
+  const { days, severity, decision, pageSize = 20, sort } = opts;
+  const { data } = await axios.get(`${API_URL}/${ruleId}/performance`, {
+    params: { days, severity, decision, limit: pageSize, sort },
+  });
+  return data as {
+    kpis: RuleKpis;
+    trends: TriggerTrend[];
+    severity: SeverityDistribution;
+    decisions: DecisionCounts;
+    conditions: ConditionHit[];
+    claims: TriggeredClaimsPage;
+  };
+};
+
 export const getRuleKpis = async (ruleId: string, days: number) => {
   const { data } = await axios.get(`${API_URL}/${ruleId}/performance/kpis`, { params: { days } });
-  return data as { totalClaimsEvaluated: number; flagsTriggered: number; confirmedFraud: number; falsePositiveRate: number; hitRate: number; lastEvaluated: string };
+  return data as RuleKpis;
 };
 
 export const getRuleTrends = async (ruleId: string, days: number) => {
@@ -85,19 +108,29 @@ export const getRuleConditions = async (ruleId: string, days: number) => {
 
 export const getTriggeredClaims = async (
   ruleId: string,
-  opts: { days: number; severity?: string; decision?: string; page?: number; pageSize?: number; sort?: string }
+  opts: {
+    days: number;
+    severity?: string;
+    decision?: string;
+    page?: number;
+    pageSize?: number;
+    sort?: string;
+    // nextCursor of the previous page; when set, page is ignored
+    cursor?: string;
+    total?: 'exact' | 'estimate' | 'none';
+  }
 ) => {
-  const { days, severity, decision, page = 1, pageSize = 20, sort } = opts;
-  const skip = (page - 1) * pageSize;
+  const { days, severity, decision, page = 1, pageSize = 20, sort, cursor, total } = opts;
+  const skip = cursor ? 0 : (page - 1) * pageSize;
   const { data } = await axios.get(`${API_URL}/${ruleId}/performance/claims`, {
-    params: { days, severity, decision, skip, limit: pageSize, sort },
+    params: { days, severity, decision, skip, limit: pageSize, sort, cursor, total },
   });
-  return data as { total: number; items: TriggeredClaim[] };
+  return data as TriggeredClaimsPage;
 };
 
 export const getDecisionCounts = async (ruleId: string, days: number) => {
   const { data } = await axios.get(`${API_URL}/${ruleId}/performance/decisions`, { params: { days } });
-  return data as { fraud: number; legitimate: number; pending: number };
+  return data as DecisionCounts;
 };
 
 export const getExecution = async (executionId: string | number) => {
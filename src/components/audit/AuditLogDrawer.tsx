@@ -18,9 +18,13 @@ const actionOptions = [
   'tested_rule',
   'logged_in',
   'logged_out',
+  'created_reference_list',
+  'updated_reference_list',
+  'deleted_reference_list',
+  'updated_decision',
 ];
 
-const entityOptions = ['rule', 'rule_version', 'execution', 'user'];
+const entityOptions = ['rule', 'rule_version', 'execution', 'user', 'reference_list'];
 
 export function AuditLogDrawer({ open, onOpenChange }: { open: boolean; onOpenChange: (o: boolean) => void }) {
   const [page, setPage] = useState(1);
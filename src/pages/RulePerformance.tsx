@@ -32,7 +32,7 @@ import {
   TableRow,
 } from '@/components/ui/table';
 import { TriggeredClaim } from '@/types/fraud';
-import { getRule, getRuleConditions, getRuleKpis, getRuleSeverity, getRuleTrends, getTriggeredClaims, getDecisionCounts, cloneRule } from '@/api/rules';
+import { getRule, getRulePerformance, getTriggeredClaims, cloneRule } from '@/api/rules';
 
 import { cn } from '@/lib/utils';
 import { generateRulePerformancePDF, exportAnalyticsCSV } from '@/lib/pdfExport';
@@ -58,41 +58,55 @@ export default function RulePerformance() {
   const [severityFilter, setSeverityFilter] = useState('all');
   const [decisionFilter, setDecisionFilter] = useState('all');
   const [page, setPage] = useState(1);
+  // nextCursor that fetches each page after the first; reset whenever the claim query changes
+  const [pageCursors, setPageCursors] = useState<Record<number, string>>({});
+  // Result count of the claim query, counted with its first page only
+  const [claimsTotal, setClaimsTotal] = useState<number | null>(null);
 
   const { data: rule } = useQuery({
     queryKey: ['rule', ruleId],
     queryFn: () => getRule(ruleId),
   });
 
-  const { data: kpis } = useQuery({
-    queryKey: ['kpis', ruleId, timePeriod],
-    queryFn: () => getRuleKpis(ruleId, parseInt(timePeriod)),
+  // KPIs, trends, severity, decisions, condition hits and the first page of claims in one request
+  const { data: performance } = useQuery({
+    queryKey: ['performance', ruleId, timePeriod],
+    queryFn: () => getRulePerformance(ruleId, { days: parseInt(timePeriod), pageSize: 20, sort: 'date_desc' }),
   });
+  const kpis = performance?.kpis;
+  const trends = performance?.trends;
+  const severity = performance?.severity;
+  const conditions = performance?.conditions;
+  const decisions = performance?.decisions;
 
-  const { data: trends } = useQuery({
-    queryKey: ['trends', ruleId, timePeriod],
-    queryFn: () => getRuleTrends(ruleId, parseInt(timePeriod)),
-  });
-
-  const { data: severity } = useQuery({
-    queryKey: ['severity', ruleId, timePeriod],
-    queryFn: () => getRuleSeverity(ruleId, parseInt(timePeriod)),
-  });
+  useEffect(() => {
+    setPageCursors({});
+    setClaimsTotal(null);
+  }, [ruleId, timePeriod, severityFilter, decisionFilter]);
 
-  const { data: conditions } = useQuery({
-    queryKey: ['conditions', ruleId, timePeriod],
-    queryFn: () => getRuleConditions(ruleId, parseInt(timePeriod)),
+  // Filtered views and later pages are fetched on their own, by keyset cursor when one is known.
+  // Only first pages are counted; later pages skip the COUNT and reuse it.
+  const firstUnfilteredPage = severityFilter === 'all' && decisionFilter === 'all' && page === 1;
+  const cursor = pageCursors[page];
+  const { data: pagedClaims } = useQuery({
+    queryKey: ['claims', ruleId, timePeriod, severityFilter, decisionFilter, page, cursor],
+    queryFn: () => getTriggeredClaims(ruleId, {
+      days: parseInt(timePeriod), severity: severityFilter, decision: decisionFilter, page, pageSize: 20, sort: 'date_desc', cursor,
+      total: page === 1 ? 'exact' : 'none',
+    }),
+    enabled: !firstUnfilteredPage,
   });
+  const claims = firstUnfilteredPage ? performance?.claims : pagedClaims;
 
-  const { data: claims } = useQuery({
-    queryKey: ['claims', ruleId, timePeriod, severityFilter, decisionFilter, page],
-    queryFn: () => getTriggeredClaims(ruleId, { days: parseInt(timePeriod), severity: severityFilter, decision: decisionFilter, page, pageSize: 20, sort: 'date_desc' }),
-  });
+  useEffect(() => {
+    if (page === 1 && claims?.total != null) setClaimsTotal(claims.total);
+  }, [page, claims]);
 
-  const { data: decisions } = useQuery({
-    queryKey: ['decisionCounts', ruleId, timePeriod],
-    queryFn: () => getDecisionCounts(ruleId, parseInt(timePeriod)),
-  });
+  const goToNextPage = () => {
+    const next = claims?.nextCursor;
+    if (next) setPageCursors((cursors) => ({ ...cursors, [page + 1]: next }));
+    setPage((p) => p + 1);
+  };
 
   const perf = useMemo(() => {
     const total = kpis?.totalClaimsEvaluated ?? 0;
@@ -601,11 +615,11 @@ export default function RulePerformance() {
           </Table>
           <div className="flex items-center justify-between pt-4">
             <div className="text-sm text-muted-foreground">
-              Page {page} • {claims?.total ?? 0} results
+              Page {page} • {claims?.total ?? claimsTotal ?? 0} results
             </div>
             <div className="flex items-center gap-2">
               <Button variant="outline" size="sm" disabled={page <= 1} onClick={() => setPage((p) => Math.max(1, p - 1))}>Prev</Button>
-              <Button variant="outline" size="sm" disabled={(page * 20) >= (claims?.total ?? 0)} onClick={() => setPage((p) => p + 1)}>Next</Button>
+              <Button variant="outline" size="sm" disabled={!claims?.nextCursor} onClick={goToNextPage}>Next</Button>
             </div>
           </div>
         </CardContent>
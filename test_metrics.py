@@ -124,18 +124,18 @@ def create_sample_data():
                 should_trigger = True
 
             # Create execution log
-            crud.create_execution_log(
-                db=db,
-                rule_id=rule.id,
-                rule_version_id=1,  # Assume version 1
-                input_payload=payload,
-                execution_result=should_trigger,
-                severity=rule.severity,
-                trigger_reasons=["amount > 5000"] if should_trigger and rule.rule_id == "RL-TEST-001" else ["geo_distance > 100"] if should_trigger else [],
-                amount=payload["claim"]["amount"],
-                claim_id=payload["claim_id"],
-                decision=random.choice(["pending", "fraud", "legitimate"])
-            )
+            crud.create_execution_logs(db, [{
+                "rule_id": rule.id,
+                "rule_version_id": 1,  # Assume version 1
+                "input_payload": payload,
+                "execution_result": should_trigger,
+                "severity": rule.severity,
+                "trigger_reasons": ["amount > 5000"] if should_trigger and rule.rule_id == "RL-TEST-001" else ["geo_distance > 100"] if should_trigger else [],
+                "amount": payload["claim"]["amount"],
+                "claim_id": payload["claim_id"],
+                "decision": random.choice(["pending", "fraud", "legitimate"]),
+                "executed_at": execution_time,
+            }])
 
         print("✅ Sample data created successfully!")
         print(f"Created {len(created_rules)} rules")